@@ -3,10 +3,11 @@
 Quick script to add training examples to improve email generation
 """
 
-import json
 import os
 from datetime import datetime
 
+from serialization import read_json, write_json
+
 def add_example():
     print("\n=== ADD TRAINING EXAMPLE ===")
     print("This will help improve the model by adding good examples\n")
@@ -40,8 +41,7 @@ def add_example():
     # Load existing examples
     examples_file = "training_examples.json"
     if os.path.exists(examples_file):
-        with open(examples_file, 'r') as f:
-            examples = json.load(f)
+        examples = read_json(examples_file)
     else:
         examples = []
     
@@ -49,10 +49,10 @@ def add_example():
     examples.append(example)
     
     # Save
-    with open(examples_file, 'w') as f:
-        json.dump(examples, f, indent=2)
+    write_json(examples_file, examples)
     
     print(f"\n✅ Example saved! Total examples: {len(examples)}")
+    print("Restart the app to pick up new examples (they are loaded once at startup)")
     
     # Also append to a markdown file for easy reading
     with open("TRAINING_EXAMPLES.md", 'a') as f:
@@ -82,8 +82,7 @@ def view_examples():
         print("No training examples found yet!")
         return
     
-    with open(examples_file, 'r') as f:
-        examples = json.load(f)
+    examples = read_json(examples_file)
     
     print(f"\n=== TRAINING EXAMPLES ({len(examples)} total) ===\n")
     
@@ -111,8 +110,7 @@ def export_for_prompt():
         print("No training examples found yet!")
         return
     
-    with open(examples_file, 'r') as f:
-        examples = json.load(f)
+    examples = read_json(examples_file)
     
     print("\n=== EXAMPLES FOR GPT-4 PROMPT ===")
     print("Copy and paste these into your prompt:\n")
@@ -5,15 +5,42 @@ from bs4 import BeautifulSoup
 import re
 import time
 import urllib.parse
-from typing import Dict, Optional, Any
+import logging
+from typing import Dict, Optional, Any, Set, Tuple
 import os
 from dotenv import load_dotenv
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
 import functools
-from gmail_service import GmailService
+import hmac
+from app_logging import configure_logging, get_logger, request_debug
 
-# Load environment variables
+# Load environment variables and set up logging before the modules below read their settings and log
 load_dotenv()
+configure_logging()
+log = get_logger(__name__)
+
+from gmail_service import GmailService
+from credential_store import DEFAULT_USER, user_from_token
+from send_queue import SendQueue, parse_send_at
+from prompt_builder import TokenUsage
+from deadline import Deadline, DeadlineExceeded, unbounded
+from enrichment_merge import (SourceMerger, known_enrichment, is_sufficient, stale_fields, sources_for,
+                              VOLATILE_FIELDS, KNOWLEDGE_GRAPH_CONFIDENCE, SERIES_FUNDING_CONFIDENCE)
+from company_names import COMPANY_INDEX
+from company_record import CompanyRecord
+from serialization import JSONProvider
+from metrics import (timed, submit, collect_timings, rounded as rounded_timings, record_status,
+                     render as render_metrics, CACHE_LOOKUPS, REQUEST_SECONDS)
+from tracing import trace, current_request_id, new_request_id, http_attributes, llm_usage
+from enrichment_cache import EnrichmentCache, STALE
+from cache_warmer import CacheWarmer
+from knowledge_base import KNOWLEDGE_BASE, ENTRY_FIELDS
+from local_intro import render_intro
+from speculation import SpeculativeDraft, speculation_stats
+from enhancement_schema import (FUNCTION_NAME as ENHANCEMENT_FUNCTION_NAME, enhancement_function,
+                                parse_arguments, validate_enhancement, repair_instructions)
+from prompt_templates import (EXAMPLE_INDEX, ENHANCE_SYSTEM_PROMPT, INTRO_SYSTEM_PROMPT,
+                              build_enhance_prompt, build_intro_prompt, prompt_hash)
 
 # API Keys
 OPENAI_API_KEY = os.getenv('OPENAI_API_KEY')
@@ -21,6 +48,14 @@ SPECTER_API_KEY = os.getenv('SPECTER_API_KEY')
 HOF_API_KEY = os.getenv('HOF_API_KEY', 'your-secure-api-key-here')
 SERPER_API_KEY = os.getenv('SERPER_API_KEY')
 
+# Upstream endpoints - point these at upstream_simulator.py to load test without spending API credits
+SERPER_BASE_URL = os.getenv('SERPER_BASE_URL', 'https://google.serper.dev').rstrip('/')
+SPECTER_BASE_URL = os.getenv('SPECTER_BASE_URL', 'https://app.tryspecter.com/api/v1').rstrip('/')
+OPENAI_API_BASE = os.getenv('OPENAI_API_BASE', 'https://api.openai.com/v1').rstrip('/')
+GOOGLE_SEARCH_URL = os.getenv('GOOGLE_SEARCH_URL', 'https://www.google.com/search')
+# When set, company websites are fetched from here: https://www.acme.com/about -> {WEBSITE_BASE_URL}/www.acme.com/about
+WEBSITE_BASE_URL = os.getenv('WEBSITE_BASE_URL', '').rstrip('/')
+
 # Model Configuration - Easy to switch between models
 MODEL_CONFIG = {
     # Current: Fast and cost-effective
@@ -50,19 +85,61 @@ MODEL_CONFIG = {
 }
 
 # Select which model to use
-ACTIVE_MODEL = "gpt-3.5-turbo"  # Switched back to GPT-3.5 for 3x faster responses
+ACTIVE_MODEL = "current"  # gpt-3.5-turbo - switched back to GPT-3.5 for 3x faster responses
+
+# Intro drafting modes: 'llm' uses OpenAI, 'local' renders templates (see local_intro.py)
+DRAFT_MODES = ('llm', 'local')
+
+# Start the intro as soon as minimal facts are known (see speculation.py)
+SPECULATIVE_DRAFTING = os.getenv('SPECULATIVE_DRAFTING', 'true').lower() == 'true'
+
+# Request deadline shared by all pipeline stages - keeps us well inside Render's 30s limit
+REQUEST_DEADLINE_SECONDS = float(os.getenv('REQUEST_DEADLINE_SECONDS', '20'))
+MAX_DEADLINE_SECONDS = 28
+
+# Minimum seconds an optional stage needs to be worth starting
+STAGE_MIN_SECONDS = {
+    'enhance': 4,
+    'enhance_repair': 2,
+    'email_lookup': 2,
+    'intro': 2
+}
 
 app = Flask(__name__)
+app.json = JSONProvider(app)
 CORS(app, origins=["http://localhost:3000", "http://127.0.0.1:3000", "*"])  # Enable CORS for all origins for API access
 
 # Check if OpenAI API key is available
-print(f"OpenAI API Key configured: {'Yes' if OPENAI_API_KEY else 'No'}")
-print(f"Specter API Key configured: {'Yes' if SPECTER_API_KEY else 'No'}")
+log.info("OpenAI API key configured: %s", 'yes' if OPENAI_API_KEY else 'no')
+log.info("Specter API key configured: %s", 'yes' if SPECTER_API_KEY else 'no')
+if WEBSITE_BASE_URL:
+    log.warning("Company websites are fetched from %s - simulated upstreams, not for production", WEBSITE_BASE_URL)
+
+# In-memory cache for recent searches - served instantly until the soft TTL, served and
+# refreshed in the background until the hard TTL (see enrichment_cache.py). Entries are
+# serialized CompanyRecords of a couple of KB each, so the cache holds tens of thousands
+CACHE_MAX_SIZE = int(os.getenv('CACHE_MAX_SIZE', '20000'))
+CACHE_SOFT_TTL_SECONDS = float(os.getenv('CACHE_SOFT_TTL_SECONDS', str(6 * 3600)))
+CACHE_HARD_TTL_SECONDS = float(os.getenv('CACHE_HARD_TTL_SECONDS', str(7 * 24 * 3600)))
+SEARCH_CACHE = EnrichmentCache(CACHE_MAX_SIZE, CACHE_SOFT_TTL_SECONDS, CACHE_HARD_TTL_SECONDS,
+                               encode=CompanyRecord.to_bytes, decode=CompanyRecord.from_bytes)
+# Refreshes re-fetch funding/news after the soft TTL, names and descriptions only after this
+STABLE_FIELD_TTL_SECONDS = float(os.getenv('STABLE_FIELD_TTL_SECONDS', str(30 * 24 * 3600)))
+
+# Caller-supplied X-Request-Id values used as trace IDs
+REQUEST_ID_RE = re.compile(r'^[A-Za-z0-9_.-]{1,64}$')
+
+# Pre-enhancement values kept per cached company so a refresh can tell whether enhancement inputs changed
+RAW_FIELDS = ('description', 'ceo_name', 'founder_name', 'technology_focus', 'recent_news', 'impressive_metric')
+
+
+def website_fetch_url(url: str) -> str:
+    """Where to fetch a company website URL from - the site itself, or its path under WEBSITE_BASE_URL"""
+    if not WEBSITE_BASE_URL:
+        return url
+    parsed = urllib.parse.urlsplit(url)
+    return f"{WEBSITE_BASE_URL}/{parsed.netloc}{parsed.path}" + (f"?{parsed.query}" if parsed.query else '')
 
-# Simple in-memory cache for recent searches (last 100 companies)
-from collections import OrderedDict
-SEARCH_CACHE = OrderedDict()
-CACHE_MAX_SIZE = 100
 
 class CompanyDataScraper:
     def __init__(self):
@@ -71,12 +148,30 @@ class CompanyDataScraper:
             'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
         })
         # Thread pool for concurrent API calls
-        self.executor = ThreadPoolExecutor(max_workers=3)
+        self.executor = ThreadPoolExecutor(max_workers=3, thread_name_prefix='search')
+    
+    def _request(self, stage: str, upstream: str, method: str, url: str, **kwargs) -> requests.Response:
+        """HTTP call timed as a stage, counting exceptions and 4xx/5xx against the upstream
+
+        A zero timeout means the deadline is spent or cancelled, so the call is skipped.
+        """
+        if kwargs.get('timeout') == 0:
+            raise DeadlineExceeded(f"{stage} skipped - deadline spent or cancelled")
+        with timed(stage, upstream) as span:
+            response = self.session.request(method, url, **kwargs)
+            span.set(**http_attributes(method, url, response))
+        record_status(upstream, response.status_code)
+        return response
     
-    def search_company_info(self, company_name: str) -> Dict[str, Optional[str]]:
-        """Search for company information using multiple sources - OPTIMIZED WITH CONCURRENT CALLS"""
+    def search_company_info(self, company_name: str, deadline: Deadline = None,
+                            sources: Optional[Set[str]] = None) -> Dict[str, Optional[str]]:
+        """Search for company information using multiple sources - OPTIMIZED WITH CONCURRENT CALLS
+
+        sources limits the search to those branches (incremental refresh) and bypasses the knowledge base.
+        """
+        deadline = deadline or unbounded()
         start_time = time.time()
-        print(f"\n⏱️ Starting search for {company_name} at {time.strftime('%H:%M:%S')}")
+        log.info("Starting search for %s", company_name)
         
         result = {
             'company_name': company_name,
@@ -85,177 +180,80 @@ class CompanyDataScraper:
             'ceo_name': None
         }
         
-        # Common company data (expanded cache to reduce API calls)
-        known_companies = {
-            'openai': {
-                'ceo_name': 'Sam Altman',
-                'description': 'OpenAI is an AI research and deployment company that develops and deploys safe and beneficial artificial general intelligence.',
-                'technology_focus': 'large language models and AI safety',
-                'recent_news': 'launching GPT-4o and securing a $6.6 billion funding round at $157 billion valuation',
-                'impressive_metric': 'over 100 million weekly active users on ChatGPT'
-            },
-            'stripe': {
-                'ceo_name': 'Patrick Collison',
-                'founder_name': 'Patrick and John Collison',
-                'description': 'Stripe is a technology company that builds economic infrastructure for the internet, enabling businesses to accept payments and manage their operations online.',
-                'technology_focus': 'payment processing and financial APIs',
-                'recent_news': 'reaching $1 trillion in total payment volume processed and launching embedded finance products',
-                'impressive_metric': 'processing payments for millions of businesses in over 120 countries'
-            },
-            'anthropic': {
-                'ceo_name': 'Dario Amodei',
-                'founder_name': 'Dario Amodei and Daniela Amodei',
-                'description': 'Anthropic is an AI safety company that develops reliable, interpretable, and steerable AI systems, including the Claude AI assistant.',
-                'technology_focus': 'AI safety and constitutional AI',
-                'recent_news': 'raising $2 billion from Google and launching Claude 3 with improved reasoning capabilities',
-                'impressive_metric': 'Claude processing billions of tokens daily across enterprise customers'
-            },
-            'notion': {
-                'ceo_name': 'Ivan Zhao',
-                'founder_name': 'Ivan Zhao and Simon Last',
-                'description': 'Notion is an all-in-one workspace platform that combines notes, databases, kanban boards, wikis, and documents.',
-                'technology_focus': 'collaborative productivity software',
-                'recent_news': 'introducing Notion AI and surpassing 100 million users globally',
-                'impressive_metric': 'over 100 million users across 190+ countries'
-            },
-            'databricks': {
-                'ceo_name': 'Ali Ghodsi',
-                'founder_name': 'Ali Ghodsi, Matei Zaharia',
-                'description': 'Databricks is a unified analytics platform that provides a cloud-based platform for big data processing and AI workloads.',
-                'technology_focus': 'unified data analytics and AI platform',
-                'recent_news': 'raising $500M at a $43B valuation and launching Databricks AI to democratize enterprise AI',
-                'impressive_metric': 'over 10,000 customers processing exabytes of data daily'
-            },
-            'canva': {
-                'ceo_name': 'Melanie Perkins',
-                'founder_name': 'Melanie Perkins, Cliff Obrecht',
-                'description': 'Canva is a graphic design platform that enables users to create visual content with drag-and-drop tools and templates.',
-                'technology_focus': 'democratizing design through intuitive web-based tools',
-                'recent_news': 'achieving $2.3B ARR and launching Magic Studio AI suite for enterprise customers',
-                'impressive_metric': 'over 170 million monthly active users creating 250+ designs per second'
-            },
-            'figma': {
-                'ceo_name': 'Dylan Field',
-                'founder_name': 'Dylan Field and Evan Wallace',
-                'description': 'Figma is a collaborative design platform that enables teams to design, prototype, and gather feedback in one place.',
-                'technology_focus': 'browser-based collaborative design and prototyping',
-                'recent_news': 'Adobe acquisition blocked by regulators, continuing independent growth with Dev Mode launch',
-                'impressive_metric': 'used by over 4 million designers and developers worldwide'
-            },
-            'discord': {
-                'ceo_name': 'Jason Citron',
-                'founder_name': 'Jason Citron and Stan Vishnevskiy',
-                'description': 'Discord is a communication platform designed for creating communities, offering voice, video, and text chat.',
-                'technology_focus': 'real-time communication infrastructure for communities',
-                'recent_news': 'expanding beyond gaming with $15B valuation and launching AI-powered features',
-                'impressive_metric': 'over 200 million monthly active users across 19 million active servers'
-            },
-            'plaid': {
-                'ceo_name': 'Zach Perret',
-                'founder_name': 'Zach Perret and William Hockey',
-                'description': 'Plaid is a financial technology company that provides APIs connecting applications to users bank accounts.',
-                'technology_focus': 'financial data connectivity and open banking APIs',
-                'recent_news': 'powering over 8,000 digital finance apps after Visa acquisition fell through',
-                'impressive_metric': 'connecting 12,000+ financial institutions to fintech applications'
-            },
-            'airtable': {
-                'ceo_name': 'Howie Liu',
-                'founder_name': 'Howie Liu, Andrew Ofstad, Emmett Nicholas',
-                'description': 'Airtable is a cloud-based platform that combines the simplicity of a spreadsheet with the power of a database.',
-                'technology_focus': 'low-code database and app development platform',
-                'recent_news': 'reaching $11.7B valuation and launching AI-powered workflows for enterprises',
-                'impressive_metric': 'over 450,000 organizations building custom applications'
-            },
-            'whering': {
-                'ceo_name': 'Bianca Rangecroft',
-                'founder_name': 'Bianca Rangecroft',
-                'description': 'Whering is a fashiontech app that helps users digitize their wardrobes and make smarter fashion choices through AI-powered outfit recommendations.',
-                'technology_focus': 'AI-powered fashion technology and sustainable wardrobe management',
-                'recent_news': 'securing Series A funding and expanding into the US market with celebrity partnerships',
-                'impressive_metric': 'over 4 million users actively engaging with their digital closets'
-            }
-        }
-        
-        # Check if we have known data for this company
-        company_lower = company_name.lower()
-        if company_lower in known_companies:
-            result.update(known_companies[company_lower])
-            print(f"⏱️ Using cached data for {company_name}")
+        # Check if we have known data for this company (curated or learned)
+        known = KNOWLEDGE_BASE.lookup(company_name) if sources is None else None
+        if known:
+            fields = {field: known[field] for field in ENTRY_FIELDS if known.get(field)}
+            result.update(fields)
+            result['company_name'] = known.get('name') or company_name
+            result['enrichment'] = known_enrichment(fields, 'learned' if 'learned_at' in known else 'known_companies',
+                                                    known.get('learned_at'))
+            log.info("Using knowledge base data for %s", company_name)
             return result
         
-        # Run concurrent operations using ThreadPoolExecutor
-        futures = []
+        # Run concurrent operations using ThreadPoolExecutor, under a branch of the
+        # deadline that is cancelled once the required fields are settled
+        branches = deadline.branch()
+        futures = {}
         
         # Submit website search
-        website_future = self.executor.submit(self._find_and_scrape_website, company_name)
-        futures.append(('website', website_future))
+        if sources is None or 'website' in sources:
+            futures[submit(self.executor, self._find_and_scrape_website, company_name, branches,
+                           stage='search.website')] = 'website'
         
         # Submit Serper search (if configured)
-        if SERPER_API_KEY and SERPER_API_KEY != 'your_serper_api_key_here':
-            serper_future = self.executor.submit(self._search_with_serper, company_name)
-            futures.append(('serper', serper_future))
+        if SERPER_API_KEY and SERPER_API_KEY != 'your_serper_api_key_here' and (sources is None or 'serper' in sources):
+            futures[submit(self.executor, self._search_with_serper, company_name, branches,
+                           stage='search.serper')] = 'serper'
         
         # Submit funding news search
-        funding_future = self.executor.submit(self._search_recent_funding_news, company_name)
-        futures.append(('funding', funding_future))
+        if sources is None or 'funding' in sources:
+            futures[submit(self.executor, self._search_recent_funding_news, company_name, branches,
+                           stage='search.funding')] = 'funding'
         
-        # Collect results as they complete
-        for name, future in futures:
-            try:
-                if name == 'website':
-                    website_data = future.result(timeout=8)  # 8 second timeout
-                    if website_data:
-                        result.update(website_data)
-                    print(f"⏱️ Website search completed")
-                    
-                elif name == 'serper':
-                    serper_info = future.result(timeout=8)  # 8 second timeout
-                    print(f"⏱️ Serper API completed")
-                    
-                    # Log what we got from Serper
-                    print(f"📊 SERPER RESULTS:")
-                    print(f"  - Description: {'✓' if serper_info.get('description') else '✗'}")
-                    print(f"  - CEO: {serper_info.get('ceo_name', 'Not found')}")
-                    print(f"  - Funding: {serper_info.get('funding_info', 'Not found')}")
-                    print(f"  - Metrics: {serper_info.get('company_metrics', 'Not found')}")
-                    
-                    if serper_info['description'] and not result['description']:
-                        result['description'] = serper_info['description']
-                    if serper_info['founder_name'] and not result['founder_name']:
-                        result['founder_name'] = serper_info['founder_name']
-                    if serper_info['ceo_name'] and not result['ceo_name']:
-                        result['ceo_name'] = serper_info['ceo_name']
-                    # Add new data from Serper
-                    if serper_info.get('funding_info'):
-                        result['recent_news'] = serper_info['funding_info']
-                    if serper_info.get('company_metrics'):
-                        result['impressive_metric'] = serper_info['company_metrics']
-                        
-                elif name == 'funding':
-                    recent_news_info = future.result(timeout=8)  # 8 second timeout
-                    if recent_news_info['recent_news']:
-                        result['recent_news'] = recent_news_info['recent_news']
-                    if recent_news_info['impressive_metric']:
-                        result['impressive_metric'] = recent_news_info['impressive_metric']
-                    print(f"⏱️ Funding news search completed")
-                    
-            except Exception as e:
-                print(f"⚠️ {name} search failed or timed out: {e}")
+        # Merge results as they complete, by field precedence, under one shared wait
+        merger = SourceMerger(result)
+        merger.collect(futures, branches, normalize=self._normalize_source)
+        result['enrichment'] = merger.summary()
         
         total_time = time.time() - start_time
-        print(f"⏱️ Total search_company_info took {total_time:.2f}s")
+        log.info("search_company_info took %.2fs", total_time)
         
         return result
     
-    def _find_and_scrape_website(self, company_name: str) -> Optional[Dict]:
+    def _normalize_source(self, source: str, data: Optional[Dict]) -> Tuple[Optional[Dict], Dict[str, float]]:
+        """Map a branch's raw result onto company_data field names, with per-field confidence overrides"""
+        if source != 'serper':
+            return data, {}
+        
+        # Log what we got from Serper
+        log.debug("Serper results - description: %s, CEO: %s, funding: %s, metrics: %s",
+                  bool(data.get('description')), data.get('ceo_name'), data.get('funding_info'),
+                  data.get('company_metrics'))
+        
+        # Knowledge-graph facts and an amount tied to a named round are trustworthy on their own
+        confidence = {field: KNOWLEDGE_GRAPH_CONFIDENCE for field in data.get('knowledge_graph_fields', [])}
+        if data.get('funding_info') and 'Series' in data['funding_info']:
+            confidence['recent_news'] = SERIES_FUNDING_CONFIDENCE
+        
+        return {
+            'description': data.get('description'),
+            'founder_name': data.get('founder_name'),
+            'ceo_name': data.get('ceo_name'),
+            'recent_news': data.get('funding_info'),
+            'impressive_metric': data.get('company_metrics')
+        }, confidence
+    
+    def _find_and_scrape_website(self, company_name: str, deadline: Deadline = None) -> Optional[Dict]:
         """Find and scrape company website - combined operation"""
-        website = self._find_company_website(company_name)
+        website = self._find_company_website(company_name, deadline)
         if website:
-            return self._scrape_company_website(website)
+            return self._scrape_company_website(website, deadline)
         return None
     
-    def _find_company_website(self, company_name: str) -> Optional[str]:
+    def _find_company_website(self, company_name: str, deadline: Deadline = None) -> Optional[str]:
         """Try to find the company's official website"""
+        deadline = deadline or unbounded()
         # First, try common domain patterns - prioritize .com
         clean_name = company_name.lower().replace(' ', '').replace('.', '').replace(',', '')
         common_domains = [
@@ -271,19 +269,29 @@ class CompanyDataScraper:
         
         # Check if any of these common patterns work
         for domain in common_domains:
+            if deadline.expired:
+                break
             try:
-                response = self.session.head(domain, timeout=2, allow_redirects=True)
+                # Misses are expected here, so they aren't counted as upstream errors
+                with timed('domain_probe') as span:
+                    probe_url = website_fetch_url(domain)
+                    response = self.session.head(probe_url, timeout=deadline.timeout(2), allow_redirects=True)
+                    span.set(**http_attributes('HEAD', probe_url, response))
                 if response.status_code < 400:
-                    print(f"Found website via common pattern: {domain}")
+                    log.debug("Found website via common pattern: %s", domain)
                     return domain
             except:
                 continue
         
+        # Out of budget - skip the Google search and use the .com fallback
+        if not deadline.allows('website_google_search', 1):
+            return f"https://www.{clean_name}.com"
+        
         # If common patterns don't work, try Google search
         search_query = f"{company_name} official website"
         try:
-            search_url = f"https://www.google.com/search?q={urllib.parse.quote(search_query)}"
-            response = self.session.get(search_url, timeout=5)
+            search_url = f"{GOOGLE_SEARCH_URL}?q={urllib.parse.quote(search_query)}"
+            response = self._request('website.google_search', 'google', 'GET', search_url, timeout=deadline.timeout(5))
             soup = BeautifulSoup(response.content, 'html.parser')
             
             # Look for URLs in the page text
@@ -302,23 +310,27 @@ class CompanyDataScraper:
                 href = link.get('href', '')
                 if href.startswith('http') and clean_name in href.lower():
                     if not any(blocked in href for blocked in ['google.com', 'youtube.com', 'facebook.com', 'linkedin.com', 'twitter.com', 'wikipedia.org']):
-                        print(f"Found website via search: {href}")
+                        log.debug("Found website via search: %s", href)
                         return href
                         
         except Exception as e:
-            print(f"Error finding website: {e}")
+            log.warning("Error finding website: %s", e)
         
         # Last resort: use .com as it's most common
         fallback = f"https://www.{clean_name}.com"
-        print(f"Using fallback domain: {fallback}")
+        log.debug("Using fallback domain: %s", fallback)
         return fallback
     
-    def _scrape_company_website(self, website_url: str) -> Dict[str, Optional[str]]:
+    def _scrape_company_website(self, website_url: str, deadline: Deadline = None) -> Dict[str, Optional[str]]:
         """Scrape company website for information"""
+        deadline = deadline or unbounded()
         result = {'description': None, 'founder_name': None, 'ceo_name': None}
         
         try:
-            response = self.session.get(website_url, timeout=5)
+            if not deadline.allows('website_scrape', 1):
+                return result
+            response = self._request('website.scrape', 'website', 'GET', website_fetch_url(website_url),
+                                     timeout=deadline.timeout(5))
             soup = BeautifulSoup(response.content, 'html.parser')
             
             # Get description from meta tags or about section
@@ -331,7 +343,7 @@ class CompanyDataScraper:
             result.update(founder_info)
             
         except Exception as e:
-            print(f"Error scraping website {website_url}: {e}")
+            log.warning("Error scraping website %s: %s", website_url, e)
         
         return result
     
@@ -406,8 +418,9 @@ class CompanyDataScraper:
         
         return result
     
-    def _search_with_serper(self, company_name: str) -> Dict[str, Any]:
+    def _search_with_serper(self, company_name: str, deadline: Deadline = None) -> Dict[str, Any]:
         """Use Serper API for SINGLE comprehensive web search about the company"""
+        deadline = deadline or unbounded()
         result = {
             'description': None, 
             'founder_name': None, 
@@ -415,20 +428,19 @@ class CompanyDataScraper:
             'recent_news': None,
             'funding_info': None,
             'company_metrics': None,
-            'recent_articles': []
+            'recent_articles': [],
+            'knowledge_graph_fields': []
         }
         
         if not SERPER_API_KEY or SERPER_API_KEY == 'your_serper_api_key_here':
-            print("⚠️ SERPER API NOT CONFIGURED - Using fallback Google search")
-            print(f"SERPER_API_KEY exists: {bool(SERPER_API_KEY)}")
-            print(f"SERPER_API_KEY value: {SERPER_API_KEY[:10]}..." if SERPER_API_KEY else "None")
-            return self._search_google_fallback(company_name)
+            log.warning("Serper API not configured - using fallback Google search")
+            return self._search_google_fallback(company_name, deadline)
         
-        print(f"✅ SERPER API CONFIGURED - Making SINGLE optimized search for {company_name}")
+        log.debug("Serper search for %s", company_name)
         
         try:
             # Serper API endpoint
-            serper_url = "https://google.serper.dev/search"
+            serper_url = f"{SERPER_BASE_URL}/search"
             headers = {
                 "X-API-KEY": SERPER_API_KEY,
                 "Content-Type": "application/json"
@@ -443,8 +455,9 @@ class CompanyDataScraper:
                 "tbs": "qdr:y"  # Past year for recent info
             }
             
-            print(f"Serper SINGLE search: {combined_query}")
-            response = self.session.post(serper_url, json=search_data, headers=headers, timeout=8)
+            log.debug("Serper query: %s", combined_query)
+            response = self._request('serper.search', 'serper', 'POST', serper_url, json=search_data, headers=headers,
+                                     timeout=deadline.timeout(8))
             
             if response.status_code == 200:
                 serper_results = response.json()
@@ -454,12 +467,15 @@ class CompanyDataScraper:
                     kg = serper_results['knowledgeGraph']
                     if 'description' in kg:
                         result['description'] = kg['description']
+                        result['knowledge_graph_fields'].append('description')
                     if 'attributes' in kg:
                         for attr in kg['attributes']:
                             if 'CEO' in attr:
                                 result['ceo_name'] = attr['CEO']
+                                result['knowledge_graph_fields'].append('ceo_name')
                             elif 'Founder' in attr:
                                 result['founder_name'] = attr['Founder']
+                                result['knowledge_graph_fields'].append('founder_name')
                 
                 # Process ALL organic results in ONE PASS
                 if 'organic' in serper_results:
@@ -521,25 +537,28 @@ class CompanyDataScraper:
                                     result['founder_name'] = name
                                 break
             
-            print(f"Serper results - Description: {result['description'][:50] if result['description'] else 'None'}...")
-            print(f"Serper results - CEO: {result['ceo_name']}, Founder: {result['founder_name']}")
-            print(f"Serper results - Funding: {result['funding_info']}, Metrics: {result['company_metrics']}")
+            log.debug("Serper results - description: %.50s, CEO: %s, founder: %s, funding: %s, metrics: %s",
+                      result['description'], result['ceo_name'], result['founder_name'],
+                      result['funding_info'], result['company_metrics'])
             
         except Exception as e:
-            print(f"Error with Serper API: {e}")
-            return self._search_google_fallback(company_name)
+            log.warning("Error with Serper API: %s", e)
+            if not deadline.allows('google_fallback', 2):
+                return result
+            return self._search_google_fallback(company_name, deadline)
         
         return result
     
-    def _search_google_fallback(self, company_name: str) -> Dict[str, Optional[str]]:
+    def _search_google_fallback(self, company_name: str, deadline: Deadline = None) -> Dict[str, Optional[str]]:
         """Fallback to basic Google search if Serper fails"""
+        deadline = deadline or unbounded()
         result = {'description': None, 'founder_name': None, 'ceo_name': None}
         
         try:
             # Search for company description
             desc_query = f"{company_name} company what do they do"
-            desc_url = f"https://www.google.com/search?q={urllib.parse.quote(desc_query)}"
-            response = self.session.get(desc_url, timeout=5)
+            desc_url = f"{GOOGLE_SEARCH_URL}?q={urllib.parse.quote(desc_query)}"
+            response = self._request('google_fallback.description', 'google', 'GET', desc_url, timeout=deadline.timeout(5))
             soup = BeautifulSoup(response.content, 'html.parser')
             
             # Get any text that might contain company info
@@ -552,12 +571,16 @@ class CompanyDataScraper:
                         result['description'] = sentence.strip()[:300] + "..."
                         break
             
+            # The second search (plus the politeness delay) is optional under a tight deadline
+            if not deadline.allows('google_fallback_founder', 3):
+                return result
+            
             time.sleep(1)  # Be respectful to Google
             
             # Search for founder/CEO
             founder_query = f"{company_name} founder CEO"
-            founder_url = f"https://www.google.com/search?q={urllib.parse.quote(founder_query)}"
-            response = self.session.get(founder_url, timeout=10)
+            founder_url = f"{GOOGLE_SEARCH_URL}?q={urllib.parse.quote(founder_query)}"
+            response = self._request('google_fallback.founder', 'google', 'GET', founder_url, timeout=deadline.timeout(10))
             soup = BeautifulSoup(response.content, 'html.parser')
             
             text_content = soup.get_text()
@@ -577,21 +600,22 @@ class CompanyDataScraper:
                     break
             
         except Exception as e:
-            print(f"Error searching Google: {e}")
+            log.warning("Error searching Google: %s", e)
         
         return result
     
-    def _search_recent_funding_news(self, company_name: str) -> Dict[str, Optional[str]]:
+    def _search_recent_funding_news(self, company_name: str, deadline: Deadline = None) -> Dict[str, Optional[str]]:
         """Search for recent funding news and company updates"""
+        deadline = deadline or unbounded()
         result = {'recent_news': None, 'impressive_metric': None}
         
         try:
             # Search for recent funding news with current year
             current_year = time.strftime('%Y')
             funding_query = f"{company_name} funding round {current_year} series million billion"
-            funding_url = f"https://www.google.com/search?q={urllib.parse.quote(funding_query)}&tbs=qdr:y"  # tbs=qdr:y limits to past year
+            funding_url = f"{GOOGLE_SEARCH_URL}?q={urllib.parse.quote(funding_query)}&tbs=qdr:y"  # tbs=qdr:y limits to past year
             
-            response = self.session.get(funding_url, timeout=10)
+            response = self._request('funding.news', 'google', 'GET', funding_url, timeout=deadline.timeout(10))
             soup = BeautifulSoup(response.content, 'html.parser')
             
             # Look for funding amounts in the search results
@@ -624,11 +648,12 @@ class CompanyDataScraper:
                     break
             
             # If no funding news, look for other recent achievements
-            if not result['recent_news']:
+            if not result['recent_news'] and deadline.allows('achievement_search', 2):
                 achievement_query = f"{company_name} announcement partnership product launch {current_year}"
-                achievement_url = f"https://www.google.com/search?q={urllib.parse.quote(achievement_query)}&tbs=qdr:m"  # past month
+                achievement_url = f"{GOOGLE_SEARCH_URL}?q={urllib.parse.quote(achievement_query)}&tbs=qdr:m"  # past month
                 
-                response = self.session.get(achievement_url, timeout=10)
+                response = self._request('funding.achievements', 'google', 'GET', achievement_url,
+                                         timeout=deadline.timeout(10))
                 soup = BeautifulSoup(response.content, 'html.parser')
                 
                 # Look for achievement patterns
@@ -647,33 +672,35 @@ class CompanyDataScraper:
                             break
             
         except Exception as e:
-            print(f"Error searching for recent news: {e}")
+            log.warning("Error searching for recent news: %s", e)
         
         return result
     
-    def find_email_with_specter(self, company_name: str, person_name: str = None, domain: str = None) -> Optional[str]:
+    def find_email_with_specter(self, company_name: str, person_name: str = None, domain: str = None,
+                                deadline: Deadline = None) -> Optional[str]:
         """Find email address using Specter API"""
+        deadline = deadline or unbounded()
         if not SPECTER_API_KEY:
-            print("Specter API key not configured")
+            log.debug("Specter API key not configured")
             return None
         
         try:
             # If we don't have a domain, try to extract it from the company website
             if not domain and company_name:
-                website = self._find_company_website(company_name)
+                website = self._find_company_website(company_name, deadline)
                 if website:
                     # Extract domain from URL
                     from urllib.parse import urlparse
                     parsed_url = urlparse(website)
                     domain = parsed_url.netloc.replace('www.', '')
-                    print(f"Found domain: {domain}")
+                    log.debug("Found domain: %s", domain)
             
             if not domain:
-                print("No domain found, cannot proceed with Specter API")
+                log.info("No domain found for %s, skipping Specter email lookup", company_name)
                 return None
             
             # Specter API base URL
-            specter_base_url = "https://app.tryspecter.com/api/v1"
+            specter_base_url = SPECTER_BASE_URL
             
             # Headers for Specter API
             headers = {
@@ -682,69 +709,67 @@ class CompanyDataScraper:
             }
             
             # Step 1: Enrich company to get company ID
-            print(f"Enriching company with domain: {domain}")
+            log.debug("Enriching company with domain: %s", domain)
             
             company_url = f"{specter_base_url}/companies"
             company_data = {
                 "domain": domain
             }
             
-            print(f"Calling Specter company enrichment: POST {company_url}")
-            print(f"Request data: {company_data}")
+            log.debug("Calling Specter company enrichment: POST %s %s", company_url, company_data)
             
-            response = self.session.post(company_url, json=company_data, headers=headers, timeout=10)
+            response = self._request('specter.company', 'specter', 'POST', company_url, json=company_data,
+                                     headers=headers, timeout=deadline.timeout(10))
             
-            print(f"Specter company enrichment response status: {response.status_code}")
+            log.debug("Specter company enrichment response status: %s", response.status_code)
             
             if response.status_code != 200:
-                print(f"Company enrichment failed: {response.status_code} - {response.text[:500]}")
+                log.warning("Specter company enrichment failed: %s - %.500s", response.status_code, response.text)
                 return None
             
             company_result = response.json()
-            print(f"Company enrichment response type: {type(company_result)}")
-            print(f"Company enrichment response: {str(company_result)[:500]}...")  # First 500 chars
+            log.debug("Specter company enrichment response: %.500s", company_result)
             
             # Handle if result is a list (multiple companies found)
             if isinstance(company_result, list):
                 if not company_result:
-                    print("No companies found in Specter")
+                    log.info("No companies found in Specter for %s", domain)
                     return None
                 # Take the first company
                 company_data = company_result[0]
-                print(f"Found {len(company_result)} companies, using first one")
+                log.debug("Found %d companies, using first one", len(company_result))
             else:
                 company_data = company_result
             
             company_id = company_data.get('id')
             
             if not company_id:
-                print("No company ID returned from enrichment")
+                log.info("No Specter company ID returned for %s", domain)
                 return None
             
-            print(f"Got company ID: {company_id}")
+            log.debug("Got company ID: %s", company_id)
             
             # Step 2: Get company people
             people_url = f"{specter_base_url}/companies/{company_id}/people"
-            print(f"Getting company people: GET {people_url}")
+            log.debug("Getting company people: GET %s", people_url)
             
-            people_response = self.session.get(people_url, headers=headers, timeout=10)
+            people_response = self._request('specter.people', 'specter', 'GET', people_url, headers=headers,
+                                            timeout=deadline.timeout(10))
             
-            print(f"Company people response status: {people_response.status_code}")
+            log.debug("Company people response status: %s", people_response.status_code)
             
             if people_response.status_code != 200:
-                print(f"Failed to get company people: {people_response.status_code}")
+                log.warning("Failed to get Specter company people: %s", people_response.status_code)
                 return None
             
             people = people_response.json()
-            print(f"Found {len(people) if isinstance(people, list) else 0} people at company")
+            log.debug("Found %d people at company", len(people) if isinstance(people, list) else 0)
             
             if not people or not isinstance(people, list):
-                print("No people found at company")
+                log.info("No people found at company %s", company_id)
                 return None
             
-            # Debug: print first person to see structure
-            if people:
-                print(f"First person object: {people[0]}")
+            log.debug("First person object: %s", people[0])
             
             # Step 3: Look for CEO/Founder or specific person
             target_person_id = None
@@ -754,7 +779,7 @@ class CompanyDataScraper:
                 for person in people:
                     if person.get('full_name', '').lower() == person_name.lower():
                         target_person_id = person.get('person_id')
-                        print(f"Found target person {person_name} with ID: {target_person_id}")
+                        log.debug("Found target person %s with ID: %s", person_name, target_person_id)
                         break
             
             # If no specific person found, look for executives
@@ -765,50 +790,51 @@ class CompanyDataScraper:
                     is_founder = person.get('is_founder', False)
                     seniority = person.get('seniority', '').lower()
                     
-                    print(f"Checking person: {name} - {person.get('title')}")
+                    log.debug("Checking person: %s - %s", name, person.get('title'))
                     
                     # Check if this person is a founder, CEO, or executive
                     if (is_founder or 
                         any(role in title for role in ['ceo', 'chief executive', 'founder', 'co-founder']) or
                         'executive' in seniority):
                         target_person_id = person.get('person_id')
-                        print(f"Found executive: {name} ({person.get('title')})")
+                        log.debug("Found executive: %s (%s)", name, person.get('title'))
                         break
             
             if not target_person_id:
-                print("No target person found")
+                log.info("No target person found at company %s", company_id)
                 return None
             
             # Step 4: Get person's email
             email_url = f"{specter_base_url}/people/{target_person_id}/email"
-            print(f"Getting person's email: GET {email_url}")
+            log.debug("Getting person's email: GET %s", email_url)
             
-            email_response = self.session.get(email_url, headers=headers, timeout=10)
+            email_response = self._request('specter.email', 'specter', 'GET', email_url, headers=headers,
+                                           timeout=deadline.timeout(10))
             
-            print(f"Email response status: {email_response.status_code}")
+            log.debug("Email response status: %s", email_response.status_code)
             
             if email_response.status_code == 200:
                 email_data = email_response.json()
                 email = email_data.get('email')
                 if email:
-                    print(f"Found email: {email} (type: {email_data.get('type')})")
+                    log.info("Found email via Specter (type: %s)", email_data.get('type'))
+                    log.debug("Found email: %s", email)
                     return email
             elif email_response.status_code == 204:
-                print("No email found for this person")
+                log.info("No email found for person %s", target_person_id)
             else:
-                print(f"Failed to get email: {email_response.status_code}")
+                log.warning("Failed to get email from Specter: %s", email_response.status_code)
             
         except Exception as e:
-            print(f"Error finding email with Specter: {e}")
-            import traceback
-            traceback.print_exc()
+            log.exception("Error finding email with Specter: %s", e)
         
         return None
     
-    def get_specter_company_data(self, company_name: str, domain: str = None) -> Dict[str, Any]:
+    def get_specter_company_data(self, company_name: str, domain: str = None, deadline: Deadline = None) -> Dict[str, Any]:
         """Get comprehensive company data from Specter API"""
+        deadline = deadline or unbounded()
         start_time = time.time()
-        print(f"\n🔍 Starting Specter search for {company_name}")
+        log.info("Starting Specter search for %s", company_name)
         
         specter_data = {
             'company_info': None,
@@ -823,7 +849,7 @@ class CompanyDataScraper:
         try:
             # Get domain if not provided
             if not domain:
-                website = self._find_company_website(company_name)
+                website = self._find_company_website(company_name, deadline)
                 if website:
                     from urllib.parse import urlparse
                     parsed_url = urlparse(website)
@@ -834,18 +860,19 @@ class CompanyDataScraper:
                 return specter_data
             
             # Specter API setup
-            specter_base_url = "https://app.tryspecter.com/api/v1"
+            specter_base_url = SPECTER_BASE_URL
             headers = {
                 "X-API-Key": SPECTER_API_KEY,
                 "Content-Type": "application/json"
             }
             
             # Get company data
-            response = self.session.post(
+            response = self._request(
+                'specter.company', 'specter', 'POST',
                 f"{specter_base_url}/companies",
                 json={"domain": domain},
                 headers=headers,
-                timeout=10
+                timeout=deadline.timeout(10)
             )
             
             if response.status_code == 200:
@@ -857,11 +884,12 @@ class CompanyDataScraper:
                 
                 # Get company people if we have company ID
                 company_id = specter_data['company_info'].get('id') if specter_data['company_info'] else None
-                if company_id:
-                    people_response = self.session.get(
+                if company_id and deadline.allows('specter_people', 1):
+                    people_response = self._request(
+                        'specter.people', 'specter', 'GET',
                         f"{specter_base_url}/companies/{company_id}/people",
                         headers=headers,
-                        timeout=10
+                        timeout=deadline.timeout(10)
                     )
                     
                     if people_response.status_code == 200:
@@ -881,168 +909,109 @@ class CompanyDataScraper:
                                     specter_data['executives'].append(person)
         
         except Exception as e:
-            print(f"Error getting Specter data: {e}")
+            log.warning("Error getting Specter data: %s", e)
         
-        print(f"⏱️ Specter search took {time.time() - start_time:.2f}s")
+        log.info("Specter search took %.2fs", time.time() - start_time)
         return specter_data
     
-    def enhance_with_openai(self, company_data: Dict[str, Optional[str]], specter_data: Dict[str, Any] = None) -> Dict[str, Optional[str]]:
+    def enhance_with_openai(self, company_data: Dict[str, Optional[str]], specter_data: Dict[str, Any] = None,
+                            token_usage: TokenUsage = None, deadline: Deadline = None) -> Dict[str, Optional[str]]:
         """Use OpenAI to synthesize and enhance data from all sources (Specter, Serper, web scraping)"""
+        deadline = deadline or unbounded()
         if not OPENAI_API_KEY:
-            print("OpenAI API key not configured")
+            log.debug("OpenAI API key not configured")
             return company_data
         
-        print(f"Enhancing data for company: {company_data['company_name']}")
+        log.debug("Enhancing data for company: %s", company_data['company_name'])
         try:
-            # Extract Specter information if available
-            specter_info = ""
-            if specter_data and specter_data.get('company_info'):
-                company_info = specter_data['company_info']
-                specter_info = f"""
-                
-                === SPECTER DATA (Company Database) ===
-                - Official Company Name: {company_info.get('organization_name', 'N/A')}
-                - Company Description: {company_info.get('description', 'N/A')}
-                - Company Rank: {company_info.get('organization_rank', 'N/A')}
-                - Primary Role: {company_info.get('primary_role', 'N/A')}
-                - Domain: {specter_data.get('domain', 'N/A')}
-                """
-                
-                if specter_data.get('executives'):
-                    specter_info += "\n\nEXECUTIVE TEAM FROM SPECTER:"
-                    for exec in specter_data['executives'][:5]:  # Top 5 executives
-                        specter_info += f"\n- {exec.get('full_name', 'Unknown')} - {exec.get('title', 'Unknown Title')}"
-                        if exec.get('is_founder'):
-                            specter_info += " (Founder)"
-                
-                if specter_data.get('people'):
-                    specter_info += f"\n\nTotal Employees in Database: {len(specter_data['people'])}"
-            
-            # Add Serper search results context
-            serper_context = ""
-            if company_data.get('recent_news') and '$' in str(company_data.get('recent_news', '')):
-                serper_context += f"\n\n=== RECENT FUNDING (from Serper search) ===\n{company_data['recent_news']}"
-            if company_data.get('impressive_metric'):
-                serper_context += f"\nKey Metric: {company_data['impressive_metric']}"
-            
-            # Create a comprehensive prompt that synthesizes all data
-            prompt = f"""
-            You are a world-class venture capital analyst at HOF Capital researching {company_data['company_name']} for a personalized outreach email.
-            
-            Your task is to synthesize ALL available data sources and provide the most accurate, up-to-date information.
-            
-            === DATA SOURCES ===
-            
-            1. WEB SCRAPING DATA:
-            - Company: {company_data['company_name']}
-            - Description: {company_data.get('description', 'No description found')}
-            - CEO/Founder: {company_data.get('ceo_name') or company_data.get('founder_name') or 'Unknown'}
-            - Website Data: {company_data.get('recent_news', 'None')}
-            
-            2. SERPER API SEARCH RESULTS:
-            {serper_context if serper_context else '- No recent funding or metrics found via search'}
-            
-            3. SPECTER DATABASE:
-            {specter_info if specter_info else '- No Specter data available'}
-            
-            === SYNTHESIS INSTRUCTIONS ===
-            
-            Based on ALL the information above, provide the MOST ACCURATE information by:
-            1. Prioritizing Specter data for executive names (it's most reliable)
-            2. Using Serper search results for recent funding/news (most current)
-            3. Combining all sources for the best company description
-            
-            Provide:
-            1. A compelling 1-2 sentence description that captures what makes this company investment-worthy
-            2. The CORRECT CEO/founder name (check Specter executives first, then other sources)
-            3. Their unique technology/market edge
-            4. The MOST RECENT achievement (prioritize 2024, then late 2023) - BE SPECIFIC with amounts/dates
-            5. The MOST IMPRESSIVE metric with actual numbers
-            
-            CRITICAL ACCURACY RULES:
-            - If Serper found funding info (e.g., "$2B from Google"), use that EXACT amount
-            - If Specter lists executives, use those EXACT names
-            - For achievements, be HYPER-SPECIFIC: dates, amounts, partner names
-            - NEVER make up information - only use what's provided
-            
-            Format your response EXACTLY as:
-            DESCRIPTION: [1-2 sentences, investment-focused]
-            CEO_NAME: [exact name - check Specter executives first]
-            TECHNOLOGY: [their specific edge/approach]
-            RECENT_NEWS: [most recent achievement with EXACT details]
-            IMPRESSIVE_METRIC: [specific number with context - MUST HAVE NUMBERS]
-            """
+            model = MODEL_CONFIG[ACTIVE_MODEL]["model"]
+            builder = build_enhance_prompt(company_data, specter_data, model)
+            prompt = builder.build()
+            # Lets a refresh skip this call when none of its inputs changed
+            company_data['enhancement_input_hash'] = prompt_hash(prompt)
             
             import openai
             openai.api_key = OPENAI_API_KEY
+            openai.api_base = OPENAI_API_BASE
             
-            response = openai.ChatCompletion.create(
-                model=MODEL_CONFIG[ACTIVE_MODEL]["model"],
-                messages=[
-                    {"role": "system", "content": """You are a world-class venture capital analyst at HOF Capital conducting deep due diligence. Your analysis should be:
-1. HYPER-SPECIFIC: Use exact numbers, dates, names, and details from the provided data
-2. INVESTMENT-FOCUSED: Frame everything through the lens of what makes this company attractive to VCs
-3. ACCURATE: If data conflicts, prioritize Specter (real-time) > web scraping > general knowledge
-4. COMPREHENSIVE: Connect multiple data points to form insights
-5. CURRENT: Focus on 2023-2024 developments, not outdated information"""},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=MODEL_CONFIG[ACTIVE_MODEL]["temperature"],
-                max_tokens=500
-            )
+            messages = [
+                {"role": "system", "content": ENHANCE_SYSTEM_PROMPT},
+                {"role": "user", "content": prompt}
+            ]
+            with timed('openai.enhance', 'openai') as span:
+                response = openai.ChatCompletion.create(
+                    model=model,
+                    messages=messages,
+                    functions=[enhancement_function()],
+                    function_call={"name": ENHANCEMENT_FUNCTION_NAME},
+                    temperature=MODEL_CONFIG[ACTIVE_MODEL]["temperature"],
+                    max_tokens=500,
+                    request_timeout=deadline.timeout(15, reserve=STAGE_MIN_SECONDS['intro'])
+                )
+                span.set(kind='llm', model=model, **llm_usage(response))
+            if token_usage is not None:
+                token_usage.record('enhance_with_openai', response, builder.token_count())
+            
+            # Parse and validate the structured response
+            message = response['choices'][0]['message']
+            enhanced, problems = validate_enhancement(parse_arguments(message))
+            
+            # One cheap repair round asking only for the fields that failed validation
+            if problems and deadline.allows('enhance_repair', STAGE_MIN_SECONDS['enhance_repair'] + STAGE_MIN_SECONDS['intro']):
+                log.warning("Enhancement missing/invalid fields %s - requesting repair", problems)
+                repair_messages = messages + [
+                    {"role": "assistant", "content": None,
+                     "function_call": message.get('function_call') or {"name": ENHANCEMENT_FUNCTION_NAME, "arguments": message.get('content') or '{}'}},
+                    {"role": "user", "content": repair_instructions(problems)}
+                ]
+                with timed('openai.enhance_repair', 'openai') as span:
+                    repair_response = openai.ChatCompletion.create(
+                        model=model,
+                        messages=repair_messages,
+                        functions=[enhancement_function(tuple(problems))],
+                        function_call={"name": ENHANCEMENT_FUNCTION_NAME},
+                        temperature=0,
+                        max_tokens=250,
+                        request_timeout=deadline.timeout(8, reserve=STAGE_MIN_SECONDS['intro'])
+                    )
+                    span.set(kind='llm', model=model, **llm_usage(repair_response))
+                if token_usage is not None:
+                    token_usage.record('enhance_with_openai.repair', repair_response, builder.token_count())
+                repaired, problems = validate_enhancement(
+                    parse_arguments(repair_response['choices'][0]['message']), tuple(problems))
+                enhanced.update(repaired)
+            
+            company_data['enhancement_status'] = 'partial' if problems else 'validated'
             
-            # Parse the response
-            content = response['choices'][0]['message']['content']
-            
-            # Extract enhanced information
-            description_match = re.search(r'DESCRIPTION:\s*(.+?)(?=CEO_NAME:|TECHNOLOGY:|RECENT_NEWS:|IMPRESSIVE_METRIC:|$)', content, re.DOTALL)
-            ceo_match = re.search(r'CEO_NAME:\s*(.+?)(?=DESCRIPTION:|TECHNOLOGY:|RECENT_NEWS:|IMPRESSIVE_METRIC:|$)', content, re.DOTALL)
-            tech_match = re.search(r'TECHNOLOGY:\s*(.+?)(?=DESCRIPTION:|CEO_NAME:|RECENT_NEWS:|IMPRESSIVE_METRIC:|$)', content, re.DOTALL)
-            news_match = re.search(r'RECENT_NEWS:\s*(.+?)(?=DESCRIPTION:|CEO_NAME:|TECHNOLOGY:|IMPRESSIVE_METRIC:|$)', content, re.DOTALL)
-            metric_match = re.search(r'IMPRESSIVE_METRIC:\s*(.+?)(?=DESCRIPTION:|CEO_NAME:|TECHNOLOGY:|RECENT_NEWS:|$)', content, re.DOTALL)
-            
-            if description_match:
-                enhanced_desc = description_match.group(1).strip()
-                if enhanced_desc and enhanced_desc.lower() != 'unknown':
-                    company_data['description'] = enhanced_desc
-            
-            if ceo_match:
-                ceo_name = ceo_match.group(1).strip()
-                if ceo_name and ceo_name.lower() != 'unknown':
-                    if not company_data.get('ceo_name'):
-                        company_data['ceo_name'] = ceo_name
-            
-            if tech_match:
-                tech = tech_match.group(1).strip()
-                if tech and tech.lower() != 'unknown':
-                    company_data['technology_focus'] = tech
-            
-            if news_match:
-                news = news_match.group(1).strip()
-                if news and news.lower() != 'unknown':
-                    # Only update if we don't already have recent news from real-time search
-                    if not company_data.get('recent_news'):
-                        company_data['recent_news'] = news
-                    elif 'closing a $' not in company_data.get('recent_news', ''):
-                        # If we have news but it's not specific funding info, enhance it
-                        company_data['recent_news'] = news
-            
-            if metric_match:
-                metric = metric_match.group(1).strip()
-                if metric and metric.lower() != 'unknown':
-                    company_data['impressive_metric'] = metric
-            
-            print(f"Enhanced data - CEO: {company_data.get('ceo_name')}, News: {company_data.get('recent_news', 'None')[:100] if company_data.get('recent_news') else 'None'}")
+            if enhanced.get('description'):
+                company_data['description'] = enhanced['description']
+            
+            if enhanced.get('ceo_name') and not company_data.get('ceo_name'):
+                company_data['ceo_name'] = enhanced['ceo_name']
+            
+            if enhanced.get('technology'):
+                company_data['technology_focus'] = enhanced['technology']
+            
+            if enhanced.get('recent_news'):
+                # Only update if we don't already have recent news from real-time search
+                if not company_data.get('recent_news'):
+                    company_data['recent_news'] = enhanced['recent_news']
+                elif 'closing a $' not in company_data.get('recent_news', ''):
+                    # If we have news but it's not specific funding info, enhance it
+                    company_data['recent_news'] = enhanced['recent_news']
+            
+            if enhanced.get('impressive_metric'):
+                company_data['impressive_metric'] = enhanced['impressive_metric']
+            
+            log.debug("Enhanced data - CEO: %s, News: %.100s", company_data.get('ceo_name'), company_data.get('recent_news'))
             
         except Exception as e:
+            company_data['enhancement_status'] = 'failed'
             error_msg = str(e)
             if "quota" in error_msg.lower():
-                print("⚠️  OpenAI API quota exceeded - please add credits to your OpenAI account")
-                print("   Visit: https://platform.openai.com/account/billing")
+                log.error("OpenAI API quota exceeded - add credits at https://platform.openai.com/account/billing")
             else:
-                print(f"Error enhancing with OpenAI: {e}")
-            import traceback
-            traceback.print_exc()
+                log.exception("Error enhancing with OpenAI: %s", e)
         
         return company_data
 
@@ -1051,8 +1020,16 @@ class CompanyDataScraper:
         if hasattr(self, 'executor'):
             self.executor.shutdown(wait=False)
 
-def generate_email(company_data: Dict[str, Optional[str]], specter_executives: list = None) -> str:
-    """Generate a highly personalized outreach email using all available data"""
+def generate_email(company_data: Dict[str, Optional[str]], specter_executives: list = None,
+                   token_usage: TokenUsage = None, draft_mode: str = 'llm', deadline: Deadline = None,
+                   strict: bool = False) -> str:
+    """Generate a highly personalized outreach email using all available data
+
+    draft_mode 'local' skips OpenAI and renders the intro from local templates in microseconds.
+    The local templates are also used when the request deadline leaves no time for an LLM call.
+    With strict=True an unavailable or failed LLM intro raises instead of falling back.
+    """
+    deadline = deadline or unbounded()
     company_name = company_data['company_name']
     ceo_name = company_data['ceo_name'] or company_data['founder_name'] or '[CEO/Founder Name]'
     
@@ -1060,7 +1037,6 @@ def generate_email(company_data: Dict[str, Optional[str]], specter_executives: l
     first_name = ceo_name.split()[0] if ceo_name and ceo_name != '[CEO/Founder Name]' else ceo_name
     
     # Get company details
-    description = company_data.get('description', '')
     recent_news = company_data.get('recent_news', '')
     technology_focus = company_data.get('technology_focus', '')
     impressive_metric = company_data.get('impressive_metric', '')
@@ -1075,110 +1051,44 @@ Tahseen Rashid
 Investor | HOF Capital"""
     
     # If we have OpenAI API key, generate ONLY the personalized intro
-    if OPENAI_API_KEY:
+    if OPENAI_API_KEY and draft_mode == 'llm' and deadline.allows('llm_intro', STAGE_MIN_SECONDS['intro']):
         try:
             import openai
             openai.api_key = OPENAI_API_KEY
+            openai.api_base = OPENAI_API_BASE
             
-            # Simplified training examples - hardcoded for reliability
-            print(f"=== GENERATING EMAIL FOR {company_name} ===")
-            print(f"Using model: {MODEL_CONFIG[ACTIVE_MODEL]['model']}")
-            
-            # Hardcode key training examples for production reliability
-            selected_examples = [
-                '"Hi Sam, I\'ve been closely tracking OpenAI\'s extraordinary growth - hitting 200M weekly active users while maintaining your mission of ensuring AGI benefits all of humanity is truly remarkable. The way you\'ve balanced rapid commercialization with responsible AI development, especially with the recent GPT-4o launch, demonstrates the kind of transformative leadership we love to support."',
-                '"Hi Patrick, Stripe crossing $1 trillion in total payment volume is a defining moment for global internet commerce. The infrastructure you\'ve built has become so fundamental that it\'s hard to imagine the modern internet economy without it - that\'s the kind of category-defining impact we\'re passionate about supporting."',
-                '"Hi Dario, Claude 3\'s breakthrough performance combined with your recent $7.3B raise at an $18.4B valuation is reshaping the entire AI landscape. Your commitment to AI safety while shipping products that genuinely compete with and often surpass GPT-4 shows that responsible development and commercial success aren\'t mutually exclusive."'
-            ]
+            model = MODEL_CONFIG[ACTIVE_MODEL]["model"]
+            # Few-shot intros picked from training_examples.json for this company
+            selected_examples = EXAMPLE_INDEX.select(company_data)
             
-            print(f"Loaded {len(selected_examples)} training examples")
-            print(f"Recent news: {recent_news[:100] if recent_news else 'None'}")
-            print(f"Metric: {impressive_metric[:100] if impressive_metric else 'None'}")
+            if log.isEnabledFor(logging.DEBUG):
+                log.debug("Generating intro for %s with %s - examples: %s, news: %.100s, metric: %.100s",
+                          company_name, model, ', '.join(ex.get('company', '?') for ex in selected_examples),
+                          recent_news, impressive_metric)
             
             # Create a prompt for ONLY the intro paragraph
-            prompt = f"""
-            Write ONLY a brief 2-3 sentence personalized intro paragraph for a VC outreach email from Tahseen Rashid to {first_name} at {company_name}.
-            
-            COMPANY DETAILS:
-            - Company: {company_name}
-            - CEO/Founder: {ceo_name}
-            - What they do: {description}
-            - Recent achievement: {recent_news}
-            - Key metric: {impressive_metric}
-            
-            REQUIREMENTS:
-            1. Start with "Hi {first_name},"
-            2. In 2-3 sentences MAX, show genuine interest by:
-               - Mentioning a SPECIFIC recent achievement, news, or impressive metric
-               - Briefly showing you understand what they do
-               - Being authentic and conversational
-            3. DO NOT include any HOF Capital context - that comes later
-            4. DO NOT include call-to-action - that comes later
-            5. Just write the greeting and 2-3 sentences of personalized interest
-            
-            CRITICAL ACCURACY RULES:
-            - If recent news mentions a funding round, use the EXACT amount (e.g., "$150M Series D")
-            - Be specific about dates when available (e.g., "your January 2024 announcement")
-            - Name specific products, partnerships, or people when mentioned
-            - Avoid generic phrases like "impressive growth" without specifics
-            - If a metric is provided, use the exact number
-            
-            PERFECT EXAMPLES FROM TRAINING DATA:
-            {chr(10).join([f'"{ex}"' for ex in selected_examples]) if selected_examples else '''
-            "Hi Sam, I've been closely tracking OpenAI's extraordinary growth - hitting 200M weekly active users while maintaining your mission of ensuring AGI benefits all of humanity is truly remarkable. The way you've balanced rapid commercialization with responsible AI development, especially with the recent GPT-4o launch, demonstrates the kind of transformative leadership we love to support."
-            
-            "Hi Patrick, Stripe crossing $1 trillion in total payment volume is a defining moment for global internet commerce. The infrastructure you've built has become so fundamental that it's hard to imagine the modern internet economy without it - that's the kind of category-defining impact we're passionate about supporting."
-            
-            "Hi Melanie, Canva's achievement of 170M+ monthly active users and $2.3B in ARR while democratizing design globally is extraordinary. Your vision of empowering everyone to create has fundamentally changed how billions approach visual communication - that's precisely the kind of transformative impact we seek to accelerate."
-            '''}
-            
-            WINNING FORMULAS:
-            - Achievement + Impact: "[Specific achievement] is [adjective]. [How this impacts industry] - that's [connection to HOF thesis]."
-            - Metric + Vision: "[Impressive metric] while [broader mission] is [adjective]. [Strategic insight] [what HOF values]."
-            - Category Creation: "[What they're doing differently] shows you're [creating/redefining category]. [Why this matters] - that's the kind of [transformation] [HOF connection]."
-            
-            BAD EXAMPLES (NEVER WRITE LIKE THIS):
-            "Hi [Name], I've been impressed by your company's growth." (Too generic)
-            "Hi [Name], Congrats on your recent funding!" (Not specific enough)
-            "Hi [Name], Your company is doing great things in the industry." (No substance)
-            "Hi [Name], I wanted to reach out about investment opportunities." (Too salesy)
-            
-            SPECIFIC PATTERNS TO FOLLOW:
-            - Funding: "your $150M Series D at a $2B valuation"
-            - Metrics: "reaching 10 million active users" or "growing revenue 300% YoY to $50M ARR"
-            - Product launches: "the launch of [Product Name] which already has 100K users"
-            - Partnerships: "your partnership with Microsoft to integrate [specific feature]"
-            - Market position: "becoming the de facto standard for [specific use case]"
-            
-            Write ONLY the intro paragraph now:
-            """
-            
-            response = openai.ChatCompletion.create(
-                model=MODEL_CONFIG[ACTIVE_MODEL]["model"],
-                messages=[
-                    {"role": "system", "content": """You are Tahseen Rashid, an investor at HOF Capital, writing the opening of a personalized outreach email. Your writing should be:
-
-1. AUTHENTIC: Sound like a real person who has genuinely researched the company, not a template
-2. SPECIFIC: Reference exact metrics, dates, product names, funding amounts - no generic statements
-3. INSIGHTFUL: Show you understand not just what they do, but why it matters in the market
-4. CONCISE: Maximum 2-3 sentences that pack a punch
-5. CONVERSATIONAL: Professional but warm, like reaching out to a potential partner, not cold sales
-
-Remember: This is just the intro. The HOF Capital context and call-to-action come later."""},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=MODEL_CONFIG[ACTIVE_MODEL]["temperature"],
-                max_tokens=150
-            )
+            builder = build_intro_prompt(company_data, first_name, ceo_name, selected_examples, model)
+            prompt = builder.build()
+            
+            with timed('openai.intro', 'openai') as span:
+                response = openai.ChatCompletion.create(
+                    model=model,
+                    messages=[
+                        {"role": "system", "content": INTRO_SYSTEM_PROMPT},
+                        {"role": "user", "content": prompt}
+                    ],
+                    temperature=MODEL_CONFIG[ACTIVE_MODEL]["temperature"],
+                    max_tokens=150,
+                    request_timeout=deadline.timeout(10)
+                )
+                span.set(kind='llm', model=model, **llm_usage(response))
+            if token_usage is not None:
+                token_usage.record('generate_email', response, builder.token_count())
             
             intro = response['choices'][0]['message']['content'].strip()
             
             # Log the generated intro for quality monitoring
-            print(f"\n=== GPT-4 Generated Intro ===")
-            print(f"Company: {company_name}")
-            print(f"Model: {MODEL_CONFIG[ACTIVE_MODEL]['model']}")
-            print(f"Generated intro:\n{intro}")
-            print("="*30)
+            log.debug("Generated intro for %s (%s):\n%s", company_name, model, intro)
             
             # Ensure the intro doesn't already contain the fixed content
             if "HOF Capital" in intro or "calendar" in intro.lower():
@@ -1192,24 +1102,210 @@ Remember: This is just the intro. The HOF Capital context and call-to-action com
             return email
             
         except Exception as e:
-            print(f"Error generating personalized intro: {e}")
-            # Fall through to default template
+            if strict:
+                raise
+            log.warning("Error generating personalized intro, using local template: %s", e)
+            # Fall through to local template
+    elif strict:
+        raise RuntimeError("LLM intro unavailable for this request")
     
-    # Fallback template if OpenAI fails
-    if recent_news and impressive_metric:
-        intro = f"Hi {first_name}, I've been following {company_name}'s incredible progress - congratulations on {recent_news}! {impressive_metric} is truly impressive and speaks to the transformative impact you're having."
-    elif recent_news:
-        intro = f"Hi {first_name}, I've been following {company_name}'s journey and was excited to see you {recent_news}. The work you're doing in {description.lower() if description else 'your space'} is truly compelling."
-    elif impressive_metric:
-        intro = f"Hi {first_name}, I've been tracking {company_name}'s growth and {impressive_metric} really caught my attention. Your approach to {description.lower() if description else 'the market'} is exactly the kind of innovation we love to support."
-    else:
-        intro = f"Hi {first_name}, I've been following {company_name} with great interest. Your work in {description.lower() if description else 'building transformative technology'} aligns perfectly with the kind of visionary companies we partner with."
+    # Local template engine - explicit fast mode, or fallback if OpenAI fails
+    intro = render_intro(company_data)
     
     # Combine intro with fixed bottom
     email = f"{intro}\n\n{fixed_bottom}"
     
     return email
 
+def enrich_company(company_name: str, draft_mode: str = 'llm', deadline: Deadline = None,
+                   token_usage: TokenUsage = None, on_scraped=None) -> CompanyRecord:
+    """Run the full enrichment pipeline and return the cache record for the company
+
+    on_scraped is called with the first-pass company data as soon as the web scrape is in,
+    before Specter, enhancement and the email lookup.
+    """
+    deadline = deadline or unbounded()
+    # Scrape company information
+    scraper = CompanyDataScraper()
+    scrape_start = time.time()
+    
+    # Create executor for concurrent operations - not a with-block, so a late
+    # future can't hold the response past the deadline on shutdown
+    executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='enrich')
+    try:
+        # Start web scraping
+        scrape_future = submit(executor, scraper.search_company_info, company_name, deadline, stage='search')
+        
+        # Start Specter search concurrently - on its own branch so it can be dropped
+        specter_deadline = deadline.branch()
+        specter_future = submit(executor, scraper.get_specter_company_data, company_name, None, specter_deadline,
+                                stage='specter')
+        
+        # Get web scraping results
+        try:
+            company_data = scrape_future.result(timeout=deadline.timeout(15))
+        except FutureTimeoutError:
+            log.warning("Web scraping missed the deadline - continuing with Specter data only")
+            deadline.skipped.append('web_scrape')
+            company_data = {'company_name': company_name, 'description': None, 'founder_name': None, 'ceo_name': None}
+        log.info("Web scraping took %.2fs", time.time() - scrape_start)
+        log.debug("Initial scrape results - CEO: %s, Founder: %s, Description: %.50s", company_data.get('ceo_name'),
+                  company_data.get('founder_name'), company_data.get('description'))
+        
+        if on_scraped:
+            on_scraped(company_data)
+        
+        # Get Specter results, unless the scrape alone already covers what the intro needs
+        try:
+            if is_sufficient(company_data):
+                log.info("Enrichment already sufficient - cancelling Specter")
+                specter_deadline.cancel()
+                specter_future.cancel()
+                company_data['enrichment']['cancelled'] = company_data['enrichment']['cancelled'] + ['specter']
+                specter_data = {'company_info': None, 'people': [], 'executives': [], 'domain': None}
+            else:
+                specter_data = specter_future.result(timeout=deadline.timeout(10))
+        except FutureTimeoutError:
+            log.warning("Specter missed the deadline - continuing without it")
+            deadline.skipped.append('specter')
+            specter_data = {'company_info': None, 'people': [], 'executives': [], 'domain': None}
+        log.info("Specter API took %.2fs", time.time() - scrape_start)
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+    
+    company_data.setdefault('enrichment', {'field_sources': {}, 'confidence': {}, 'fetched_at': {},
+                                           'sufficient': False, 'settled': False, 'cancelled': []})
+    raw_fields = {field: company_data.get(field) for field in RAW_FIELDS}
+    
+    # Enhance with OpenAI using both data sources, if there's still time for it and the intro
+    if draft_mode == 'llm' and deadline.allows('enhance', STAGE_MIN_SECONDS['enhance'] + STAGE_MIN_SECONDS['intro']):
+        enhance_start = time.time()
+        company_data = scraper.enhance_with_openai(company_data, specter_data, token_usage, deadline)
+        log.info("OpenAI enhancement took %.2fs", time.time() - enhance_start)
+    
+    apply_specter_executives(company_data, specter_data.get('executives'))
+    
+    # Validated enrichments of companies the knowledge base doesn't know yet are learned
+    served_from = set((company_data.get('enrichment') or {}).get('field_sources', {}).values())
+    if company_data.get('enhancement_status') == 'validated' and not served_from & {'known_companies', 'learned'}:
+        KNOWLEDGE_BASE.learn(company_name, company_data, specter_data.get('domain'))
+    
+    # Try to find CEO/Founder email address
+    ceo_email = None
+    if (company_data.get('ceo_name') or company_data.get('founder_name')) and \
+            deadline.allows('email_lookup', STAGE_MIN_SECONDS['email_lookup'] + STAGE_MIN_SECONDS['intro']):
+        person_name = company_data.get('ceo_name') or company_data.get('founder_name')
+        # Reuse the domain Specter resolved rather than probing for the website again
+        ceo_email = scraper.find_email_with_specter(company_name, person_name, specter_data.get('domain'),
+                                                    deadline=deadline)
+    
+    return CompanyRecord.from_enrichment(
+        company_data, specter_data,
+        ceo_email=ceo_email,
+        specter_profile=specter_profile(specter_data),
+        raw_fields=raw_fields,
+        # Results cut short by the deadline are refetched by the next LLM request
+        enhanced=draft_mode == 'llm' and not deadline.skipped
+    )
+
+def apply_specter_executives(company_data: Dict[str, Any], executives: Optional[list]) -> None:
+    """If we found executives in Specter, update CEO name"""
+    for exec in executives or []:
+        if exec.get('is_founder') or 'ceo' in exec.get('title', '').lower():
+            company_data['ceo_name'] = exec.get('full_name')
+            break
+
+def specter_profile(specter_data: Dict[str, Any]) -> Dict[str, Any]:
+    """The part of a Specter response the enhancement prompt uses, minus the people list"""
+    company_info = specter_data.get('company_info') or {}
+    return {
+        'company_info': {key: company_info.get(key) for key in
+                         ('organization_name', 'description', 'organization_rank', 'primary_role')} if company_info else None,
+        'people_count': len(specter_data.get('people') or [])
+    }
+
+def refresh_company(company_name: str, cached: CompanyRecord, draft_mode: str = 'llm',
+                    deadline: Deadline = None, token_usage: TokenUsage = None) -> CompanyRecord:
+    """Re-fetch only the sources feeding stale fields and reuse the rest of a cached entry
+
+    Falls back to a full enrich_company run for entries without field timestamps or when
+    a stable field (CEO, description) has gone stale.
+    """
+    deadline = deadline or unbounded()
+    old = cached.company_data()
+    enrichment = old.get('enrichment') or {}
+    stale = stale_fields(enrichment.get('fetched_at') or {}, CACHE_SOFT_TTL_SECONDS, STABLE_FIELD_TTL_SECONDS)
+    # Curated knowledge-base entries are refreshed from the knowledge base itself, which is instant
+    curated = 'known_companies' in (enrichment.get('field_sources') or {}).values()
+    if curated or not cached.raw_fields or any(f not in VOLATILE_FIELDS for f in stale):
+        return enrich_company(company_name, draft_mode, deadline, token_usage)
+    
+    enrichment = {key: dict(value) if isinstance(value, dict) else value for key, value in enrichment.items()}
+    raw_fields = dict(cached.raw_fields)
+    # A field no source supplied the first time is worth another look on every refresh
+    stale = sorted(set(stale) | {f for f in VOLATILE_FIELDS if not raw_fields.get(f)})
+    sources = sources_for(stale)
+    log.info("Incremental refresh of %s: %s via %s", company_name, ', '.join(stale), ', '.join(sorted(sources)))
+    
+    scraper = CompanyDataScraper()
+    fresh = scraper.search_company_info(company_name, deadline, sources=sources)
+    fresh_enrichment = fresh.get('enrichment') or {}
+    for field in stale:
+        if fresh.get(field):
+            raw_fields[field] = fresh[field]
+            enrichment['field_sources'][field] = fresh_enrichment['field_sources'][field]
+            enrichment['confidence'][field] = fresh_enrichment['confidence'][field]
+        # Re-stamp even when nothing new turned up, so it isn't re-fetched on every request
+        enrichment['fetched_at'][field] = time.time()
+    
+    company_data = {'company_name': old['company_name'], **raw_fields, 'enrichment': enrichment}
+    profile = cached.specter_profile or {'company_info': None, 'people_count': 0}
+    specter_data = {'company_info': profile['company_info'], 'people': [], 'people_count': profile['people_count'],
+                    'executives': cached.executive_dicts(), 'domain': cached.domain}
+    
+    if draft_mode == 'llm' and old.get('enhancement_status') in ('validated', 'partial') and \
+            prompt_hash(build_enhance_prompt(company_data, specter_data, MODEL_CONFIG[ACTIVE_MODEL]["model"]).build()) == old.get('enhancement_input_hash'):
+        log.info("Enhancement inputs unchanged - reusing enhanced fields")
+        company_data = {**old, 'enrichment': enrichment}
+    elif draft_mode == 'llm' and deadline.allows('enhance', STAGE_MIN_SECONDS['enhance']):
+        company_data = scraper.enhance_with_openai(company_data, specter_data, token_usage, deadline)
+    
+    apply_specter_executives(company_data, specter_data['executives'])
+    return CompanyRecord.from_enrichment(
+        company_data, specter_data,
+        ceo_email=cached.ceo_email,
+        specter_profile=cached.specter_profile,
+        raw_fields=raw_fields,
+        enhanced=draft_mode == 'llm' and company_data.get('enhancement_status') != 'failed' and not deadline.skipped
+    )
+
+def register_aliases(cache_key: str, company_name: str, record: CompanyRecord) -> None:
+    """Make the requested name, the canonical name and the resolved domain all hit cache_key"""
+    for alias in (company_name, record.company_name):
+        COMPANY_INDEX.register(alias, cache_key, record.domain)
+
+def store_enrichment(cache_key: str, company_name: str, record: CompanyRecord) -> None:
+    """Cache an enrichment result under its canonical key"""
+    SEARCH_CACHE.put(cache_key, record)
+    register_aliases(cache_key, company_name, record)
+
+def refresh_enrichment(cache_key: str, company_name: str, draft_mode: str) -> bool:
+    """Re-enrich a stale cache entry in the background; False if a refresh is already running"""
+    def enrich():
+        cached, _ = SEARCH_CACHE.peek_entry(cache_key)
+        deadline = Deadline(MAX_DEADLINE_SECONDS)
+        with trace('refresh_enrichment', company=company_name):
+            if cached:
+                record = refresh_company(company_name, cached, draft_mode, deadline, TokenUsage())
+            else:
+                record = enrich_company(company_name, draft_mode, deadline, TokenUsage())
+        # A refresh cut short by the deadline is worse than the stale entry it would replace
+        if draft_mode == 'llm' and not record.enhanced:
+            return None
+        register_aliases(cache_key, company_name, record)
+        return record
+    return SEARCH_CACHE.refresh(cache_key, enrich)
+
 @app.route('/api/health', methods=['GET'])
 def health_check():
     """Health check endpoint for monitoring"""
@@ -1219,13 +1315,33 @@ def health_check():
         'api_keys_configured': {
             'openai': bool(OPENAI_API_KEY),
             'specter': bool(SPECTER_API_KEY)
-        }
+        },
+        'speculation': speculation_stats(),
+        'cache': SEARCH_CACHE.to_dict()
     }), 200
 
 @app.route('/api/generate-outreach', methods=['POST'])
 def generate_outreach():
+    # Stages timed while handling the request (including on pool threads) are reported in its metadata
+    # and traced under its request ID - the caller's X-Request-Id if it sent a usable one
+    request_id = request.headers.get('X-Request-Id', '')
+    if not REQUEST_ID_RE.match(request_id):
+        request_id = new_request_id()
+    body = request.get_json(silent=True)
+    company_name = body.get('company_name') if isinstance(body, dict) else None
+    # X-Debug-Log: 1 turns on DEBUG logging for just this request
+    debug = request.headers.get('X-Debug-Log', '').lower() in ('1', 'true')
+    with trace('generate_outreach', request_id, company=company_name) as root, collect_timings() as timings, \
+            request_debug(debug):
+        response = app.make_response(_generate_outreach(timings))
+        root.set(status=response.status_code)
+    response.headers['X-Request-Id'] = request_id
+    return response
+
+def _generate_outreach(timings: Dict[str, float]):
     try:
         request_start = time.time()
+        token_usage = TokenUsage()
         
         # Check for API key authentication
         auth_header = request.headers.get('Authorization')
@@ -1240,9 +1356,21 @@ def generate_outreach():
         if not company_name:
             return jsonify({'error': 'Company name is required'}), 400
         
+        # 'local' drafts skip both OpenAI calls - for fast first-pass bulk lists
+        draft_mode = data.get('draft_mode', 'llm')
+        if draft_mode not in DRAFT_MODES:
+            return jsonify({'error': f"draft_mode must be one of: {', '.join(DRAFT_MODES)}"}), 400
+        
+        # One wall-clock budget for the whole request, capped below Relay's 30s timeout
+        try:
+            budget = float(data.get('deadline_seconds') or REQUEST_DEADLINE_SECONDS)
+        except (TypeError, ValueError):
+            return jsonify({'error': 'deadline_seconds must be a number'}), 400
+        deadline = Deadline(min(max(budget, 1.0), MAX_DEADLINE_SECONDS))
+        
         # Special test case for Gmail integration testing
         if company_name.lower() == 'maroni test':
-            print(f"\n🧪 === TEST MODE: Processing test company 'maroni test' ===")
+            log.info("Test mode: serving canned response for 'maroni test'")
             test_email_content = """Hi Giacomo, I've been following Maroni Test's innovative approach to revolutionizing enterprise software testing. Your recent achievement of reducing testing cycles by 75% while maintaining 99.9% accuracy is truly impressive - that's exactly the kind of efficiency breakthrough that transforms entire industries.
 
 For quick context, I'm an Investor at HOF Capital, a $3B+ AUM multi-stage VC firm that has backed transformative ventures including OpenAI, xAI, Epic Games, UiPath, and Rimac Automobili. Each year, we selectively partner with visionary founders tackling critical societal challenges through groundbreaking technology. Additionally, our LP base (https://hofcapital.com/partners/) includes influential leaders across consumer and technology industries, providing extensive strategic value.
@@ -1281,36 +1409,45 @@ Investor | HOF Capital"""
                 }
             })
         
-        print(f"\n🚀 === Processing company: {company_name} at {time.strftime('%H:%M:%S')} ===")
-        print(f"OpenAI API Key available: {'Yes' if OPENAI_API_KEY else 'No'}")
+        log.info("Processing company: %s", company_name, extra={'draft_mode': draft_mode})
         
         # Check cache first
-        cache_key = company_name.lower()
-        if cache_key in SEARCH_CACHE:
-            print(f"💾 CACHE HIT for {company_name}!")
-            cached_data = SEARCH_CACHE[cache_key]
-            # Move to end (most recently used)
-            SEARCH_CACHE.move_to_end(cache_key)
+        # Name variants ("Scale AI Inc.", "scale.ai") and resolved domains share one entry
+        cache_key = COMPANY_INDEX.resolve(company_name)
+        # Entries drafted in local mode were never enhanced, so they can't serve LLM requests
+        cached_record, freshness = SEARCH_CACHE.get(cache_key)
+        cache_hit = bool(cached_record and (draft_mode == 'local' or cached_record.enhanced))
+        CACHE_LOOKUPS.inc(result=freshness if cache_hit else 'miss')
+        if cache_hit:
+            log.info("Cache hit for %s (%s)", company_name, freshness)
+            cached_data = cached_record.company_data()
+            
+            # Past the soft TTL: serve it now, refresh it for the next caller
+            refreshing = False
+            if freshness == STALE:
+                refreshing = refresh_enrichment(cache_key, company_name, 'llm' if cached_record.enhanced else 'local')
             
             # Generate fresh email even for cached data
-            email_content = generate_email(cached_data['company_data'], cached_data.get('specter_executives', []))
+            with timed('email_generation'):
+                email_content = generate_email(cached_data, cached_record.executive_dicts(), token_usage, draft_mode, deadline)
             
             total_time = time.time() - request_start
-            print(f"\n✅ TOTAL REQUEST TIME (from cache): {total_time:.2f}s")
+            REQUEST_SECONDS.observe(total_time, cache='hit')
+            log.info("Total request time (from cache): %.2fs", total_time)
             
             return jsonify({
                 'success': True,
                 'data': {
-                    'company_name': cached_data['company_data'].get('company_name'),
-                    'ceo_name': cached_data['company_data'].get('ceo_name') or cached_data['company_data'].get('founder_name'),
-                    'ceo_email': cached_data.get('ceo_email'),
+                    'company_name': cached_data.get('company_name'),
+                    'ceo_name': cached_data.get('ceo_name') or cached_data.get('founder_name'),
+                    'ceo_email': cached_record.ceo_email,
                     'email_content': email_content,
-                    'subject_line': f"HOF Capital - Partnership Opportunity with {cached_data['company_data'].get('company_name')}",
+                    'subject_line': f"HOF Capital - Partnership Opportunity with {cached_data.get('company_name')}",
                     'company_details': {
-                        'description': cached_data['company_data'].get('description'),
-                        'technology_focus': cached_data['company_data'].get('technology_focus'),
-                        'recent_news': cached_data['company_data'].get('recent_news'),
-                        'impressive_metric': cached_data['company_data'].get('impressive_metric')
+                        'description': cached_data.get('description'),
+                        'technology_focus': cached_data.get('technology_focus'),
+                        'recent_news': cached_data.get('recent_news'),
+                        'impressive_metric': cached_data.get('impressive_metric')
                     }
                 },
                 'metadata': {
@@ -1318,76 +1455,52 @@ Investor | HOF Capital"""
                     'api_version': '1.0',
                     'processing_time_seconds': round(total_time, 2),
                     'cache_hit': True,
+                    'cache': {'freshness': freshness, 'age_seconds': round(SEARCH_CACHE.age(cache_key) or 0), 'refreshing': refreshing},
+                    'draft_mode': draft_mode,
+                    'token_usage': token_usage.to_dict(),
+                    'deadline': deadline.to_dict(),
+                    'enrichment': cached_data.get('enrichment'),
+                    'timings': rounded_timings(timings),
+                    'request_id': current_request_id(),
                     'debug': {
                         'specter_configured': bool(SPECTER_API_KEY),
-                        'attempted_email_search': bool(cached_data.get('ceo_email') is not None)
+                        'attempted_email_search': bool(cached_record.ceo_email is not None)
                     }
                 }
             })
         
         # Not in cache, proceed with normal flow
-        # Scrape company information
-        scraper = CompanyDataScraper()
-        scrape_start = time.time()
-        
-        # Create executor for concurrent operations
-        with ThreadPoolExecutor(max_workers=2) as executor:
-            # Start web scraping
-            scrape_future = executor.submit(scraper.search_company_info, company_name)
-            
-            # Start Specter search concurrently
-            specter_future = executor.submit(scraper.get_specter_company_data, company_name)
-            
-            # Get web scraping results
-            company_data = scrape_future.result(timeout=15)
-            print(f"⏱️ Total web scraping took {time.time() - scrape_start:.2f}s")
-            print(f"Initial scrape results - CEO: {company_data.get('ceo_name')}, Founder: {company_data.get('founder_name')}, Description: {company_data.get('description')[:50] if company_data.get('description') else 'None'}...")
-            
-            # Get Specter results
-            specter_data = specter_future.result(timeout=10)
-            print(f"⏱️ Total Specter API took {time.time() - scrape_start:.2f}s")
+        # Overlap the intro LLM call with Specter, enhancement and the email lookup
+        speculative = {}
+        def start_speculation(snapshot):
+            if SPECULATIVE_DRAFTING and draft_mode == 'llm':
+                speculative['draft'] = SpeculativeDraft.start(
+                    snapshot, lambda data: generate_email(data, [], token_usage, draft_mode, deadline),
+                    draft=lambda data: generate_email(data, [], token_usage, draft_mode, deadline, strict=True))
         
-        # Enhance with OpenAI using both data sources
-        enhance_start = time.time()
-        company_data = scraper.enhance_with_openai(company_data, specter_data)
-        print(f"⏱️ OpenAI enhancement took {time.time() - enhance_start:.2f}s")
-        
-        # If we found executives in Specter, update CEO name
-        if specter_data.get('executives'):
-            for exec in specter_data['executives']:
-                if exec.get('is_founder') or 'ceo' in exec.get('title', '').lower():
-                    company_data['ceo_name'] = exec.get('full_name')
-                    break
+        record = enrich_company(company_name, draft_mode, deadline, token_usage, on_scraped=start_speculation)
+        company_data = record.company_data()
+        ceo_email = record.ceo_email
         
-        # Try to find CEO/Founder email address
-        ceo_email = None
-        if company_data.get('ceo_name') or company_data.get('founder_name'):
-            person_name = company_data.get('ceo_name') or company_data.get('founder_name')
-            ceo_email = scraper.find_email_with_specter(company_name, person_name)
-        
-        # Generate email with Specter executive data
-        email_content = generate_email(company_data, specter_data.get('executives', []))
+        # Generate email with Specter executive data, reusing the speculative draft if its facts still hold
+        speculation = None
+        with timed('email_generation'):
+            if speculative.get('draft'):
+                email_content, speculation = speculative['draft'].resolve(company_data, timeout=deadline.timeout(10))
+            else:
+                email_content = generate_email(company_data, record.executive_dicts(), token_usage, draft_mode, deadline)
         
         # Add to cache before returning
-        cache_data = {
-            'company_data': company_data,
-            'specter_executives': specter_data.get('executives', []),
-            'ceo_email': ceo_email
-        }
-        
-        # Add to cache with size limit
-        SEARCH_CACHE[cache_key] = cache_data
-        if len(SEARCH_CACHE) > CACHE_MAX_SIZE:
-            # Remove oldest item
-            SEARCH_CACHE.popitem(last=False)
+        store_enrichment(cache_key, company_name, record)
         
         # Structure the response for easy integration
         total_time = time.time() - request_start
-        print(f"\n✅ TOTAL REQUEST TIME: {total_time:.2f}s")
-        print(f"💾 Cached result for future requests")
+        REQUEST_SECONDS.observe(total_time, cache='miss')
+        log.info("Total request time: %.2fs", total_time)
+        log.debug("Cached result for future requests")
         
         if total_time > 25:
-            print(f"⚠️  WARNING: Request took {total_time:.2f}s - approaching 30s timeout limit!")
+            log.warning("Request took %.2fs - approaching 30s timeout limit", total_time)
         
         return jsonify({
             'success': True,
@@ -1409,6 +1522,13 @@ Investor | HOF Capital"""
                     'api_version': '1.0',
                     'processing_time_seconds': round(total_time, 2),
                     'cache_hit': False,
+                    'draft_mode': draft_mode,
+                    'speculation': speculation,
+                    'token_usage': token_usage.to_dict(),
+                    'deadline': deadline.to_dict(),
+                    'enrichment': company_data.get('enrichment'),
+                    'timings': rounded_timings(timings),
+                    'request_id': current_request_id(),
                     'debug': {
                         'specter_configured': bool(SPECTER_API_KEY),
                         'attempted_email_search': bool(ceo_email is not None or (company_data.get('ceo_name') or company_data.get('founder_name')))
@@ -1423,14 +1543,99 @@ Investor | HOF Capital"""
             'message': 'Failed to generate outreach email'
         }), 500
 
+def warm_company(company_name: str) -> None:
+    """Enrich a watchlist company and cache it, as a live LLM request would"""
+    cache_key = COMPANY_INDEX.resolve(company_name)
+    cached, _ = SEARCH_CACHE.peek_entry(cache_key)
+    with trace('warm_company', company=company_name):
+        if cached and cached.enhanced:
+            record = refresh_company(company_name, cached, 'llm', Deadline(MAX_DEADLINE_SECONDS), TokenUsage())
+        else:
+            record = enrich_company(company_name, 'llm', Deadline(MAX_DEADLINE_SECONDS), TokenUsage())
+    # Like a background refresh - a warm-up cut short by the deadline or an OpenAI failure keeps what's cached
+    if not record.enhanced:
+        raise RuntimeError('Enrichment was not fully enhanced - keeping the cached entry')
+    store_enrichment(cache_key, company_name, record)
+
+def cache_freshness(company_name: str):
+    """(freshness, age) of a company's cache entry, (None, None) if it isn't cached"""
+    cache_key = COMPANY_INDEX.lookup(company_name)
+    return SEARCH_CACHE.peek(cache_key) if cache_key else (None, None)
+
+# Pre-enrich the watchlist off-peak so the first click is a cache hit
+CACHE_WARMER = CacheWarmer(warm_company, cache_freshness)
+
+def _require_api_key() -> bool:
+    """A `Bearer <HOF_API_KEY>` header is present and correct - for endpoints that act on stored data"""
+    auth_header = request.headers.get('Authorization', '')
+    if not auth_header.startswith('Bearer '):
+        return False
+    return hmac.compare_digest(auth_header[len('Bearer '):].encode(), HOF_API_KEY.encode())
+
+@app.route('/api/metrics', methods=['GET'])
+def prometheus_metrics():
+    """Stage latency histograms, cache lookups and upstream errors in Prometheus text format"""
+    return app.response_class(render_metrics(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/api/cache/warmer', methods=['GET'])
+def cache_warmer_status():
+    """Watchlist coverage and freshness"""
+    if not _require_api_key():
+        return jsonify({'error': 'Missing or invalid API key'}), 401
+    return jsonify(CACHE_WARMER.status())
+
+@app.route('/api/cache/watchlist', methods=['POST'])
+def cache_watchlist():
+    """Add companies to the watchlist; {"companies": [...], "warm_now": false}"""
+    if not _require_api_key():
+        return jsonify({'error': 'Missing or invalid API key'}), 401
+    data = request.get_json() or {}
+    companies = data.get('companies') or []
+    if not isinstance(companies, list) or not all(isinstance(c, str) for c in companies):
+        return jsonify({'error': 'companies must be a list of company names'}), 400
+    added = CACHE_WARMER.add([c.strip() for c in companies if c.strip()])
+    if data.get('warm_now'):
+        CACHE_WARMER.trigger()
+    return jsonify({'success': True, 'added': added, 'watchlist_size': len(CACHE_WARMER.watchlist())})
+
 # Gmail Integration Endpoints
-gmail_service = GmailService()
+# Opened by create_app(), so importing this module (tests, benchmarks) creates no databases
+gmail_service: Optional[GmailService] = None
+
+# Bulk and scheduled sends go through a persistent queue drained in Gmail batch requests
+SEND_QUEUE: Optional[SendQueue] = None
+BULK_SEND_MAX_MESSAGES = 1000
+
+def _gmail_user() -> Optional[str]:
+    """Whose mailbox a Gmail request is for - the user its X-User-Token was issued to, else the default mailbox
+
+    None if the token is invalid, or if a user is named (X-User-Id / user_id) without a token to prove it.
+    """
+    token = request.headers.get('X-User-Token')
+    if token:
+        return user_from_token(token)
+    named = request.headers.get('X-User-Id') or request.args.get('user_id') or \
+        (request.get_json(silent=True) or {}).get('user_id')
+    return DEFAULT_USER if not named or named == DEFAULT_USER else None
+
+def gmail_endpoint(view):
+    """Gmail endpoints need the API key and act only for the user proven by _gmail_user, passed as user_id"""
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        if not _require_api_key():
+            return jsonify({'error': 'Missing or invalid API key'}), 401
+        user_id = _gmail_user()
+        if user_id is None:
+            return jsonify({'success': False, 'error': 'Missing or invalid X-User-Token'}), 401
+        return view(*args, user_id=user_id, **kwargs)
+    return wrapper
 
 @app.route('/api/gmail/auth', methods=['GET'])
-def gmail_auth():
+@gmail_endpoint
+def gmail_auth(user_id: str):
     """Initiate Gmail OAuth2 authentication"""
     state = request.args.get('state', '')
-    auth_url = gmail_service.get_auth_url(state)
+    auth_url = gmail_service.get_auth_url(state, user_id)
     return jsonify({
         'success': True,
         'auth_url': auth_url
@@ -1459,7 +1664,7 @@ def gmail_callback():
     result = gmail_service.handle_callback(code, state)
     
     # Log the result for debugging
-    print(f"Gmail callback result: {result}")
+    log.info("Gmail callback for %s: %s", result.get('user_id'), 'connected' if result.get('success') else result.get('error'))
     
     # Return a simple HTML page that closes the popup
     if result['success']:
@@ -1503,13 +1708,15 @@ def gmail_callback():
         '''
 
 @app.route('/api/gmail/status', methods=['GET'])
-def gmail_status():
+@gmail_endpoint
+def gmail_status(user_id: str):
     """Check Gmail authentication status"""
-    status = gmail_service.check_auth_status()
+    status = gmail_service.check_auth_status(user_id)
     return jsonify(status)
 
 @app.route('/api/gmail/send', methods=['POST'])
-def gmail_send():
+@gmail_endpoint
+def gmail_send(user_id: str):
     """Send email via Gmail"""
     data = request.get_json()
     
@@ -1534,7 +1741,8 @@ def gmail_send():
         subject=subject,
         body=body,
         cc=cc,
-        bcc=bcc
+        bcc=bcc,
+        user_id=user_id
     )
     
     if result['success']:
@@ -1545,11 +1753,89 @@ def gmail_send():
             return jsonify(result), 401
         return jsonify(result), 500
 
+@app.route('/api/gmail/send-bulk', methods=['POST'])
+@gmail_endpoint
+def gmail_send_bulk(user_id: str):
+    """Queue emails for sending now or later
+
+    {"messages": [{"to", "subject", "body", "cc", "bcc", "send_at", "idempotency_key"}, ...]}
+    """
+    messages = (request.get_json() or {}).get('messages')
+    if not isinstance(messages, list) or not messages:
+        return jsonify({'success': False, 'error': 'messages must be a non-empty list'}), 400
+    if len(messages) > BULK_SEND_MAX_MESSAGES:
+        return jsonify({'success': False, 'error': f'At most {BULK_SEND_MAX_MESSAGES} messages per request'}), 400
+    for index, message in enumerate(messages):
+        if not isinstance(message, dict) or not all(message.get(field) for field in ('to', 'subject', 'body')):
+            return jsonify({
+                'success': False,
+                'error': f'Message {index} is missing required fields: to, subject, body'
+            }), 400
+        try:
+            parse_send_at(message.get('send_at'))
+        except (TypeError, ValueError) as e:
+            return jsonify({'success': False, 'error': f'Message {index}: {e}'}), 400
+    
+    # Fail fast rather than queueing messages that can't be sent
+    status = gmail_service.check_auth_status(user_id)
+    if not status['authenticated']:
+        return jsonify({'success': False, 'error': 'Not authenticated', 'auth_url': status.get('auth_url')}), 401
+    
+    result = SEND_QUEUE.enqueue(messages, user_id)
+    return jsonify({
+        'success': True,
+        **result,
+        'status_url': f"/api/gmail/send-bulk/{result['batch_id']}"
+    }), 202
+
+@app.route('/api/gmail/send-bulk/<batch_id>', methods=['GET'])
+@gmail_endpoint
+def gmail_send_bulk_status(batch_id, user_id: str):
+    """Per-message status of a bulk send"""
+    status = SEND_QUEUE.status(batch_id, user_id)
+    if status is None:
+        return jsonify({'success': False, 'error': 'Unknown batch id'}), 404
+    return jsonify(status)
+
+@app.route('/api/gmail/queue', methods=['GET'])
+@gmail_endpoint
+def gmail_queue(user_id: str):
+    """The user's messages waiting to be sent, in send order"""
+    return jsonify({'messages': SEND_QUEUE.upcoming(user_id, request.args.get('limit', 100, type=int))})
+
+@app.route('/api/gmail/queue/<int:message_id>', methods=['DELETE'])
+@gmail_endpoint
+def gmail_queue_cancel(message_id, user_id: str):
+    """Cancel a queued message before it's sent"""
+    if not SEND_QUEUE.cancel(message_id, user_id):
+        return jsonify({'success': False, 'error': 'No queued message with that id'}), 404
+    return jsonify({'success': True})
+
+@app.route('/api/gmail/users', methods=['GET'])
+def gmail_users():
+    """Users with a connected mailbox"""
+    if not _require_api_key():
+        return jsonify({'error': 'Missing or invalid API key'}), 401
+    return jsonify({'users': gmail_service.store.users()})
+
 @app.route('/api/gmail/logout', methods=['POST'])
-def gmail_logout():
+@gmail_endpoint
+def gmail_logout(user_id: str):
     """Logout from Gmail"""
-    result = gmail_service.logout()
+    result = gmail_service.logout(user_id)
     return jsonify(result)
 
+def create_app() -> Flask:
+    """Server entrypoint - open the Gmail stores and start the background workers once per process"""
+    global gmail_service, SEND_QUEUE
+    if gmail_service is None:
+        gmail_service = GmailService()
+        SEND_QUEUE = SendQueue(gmail_service.send_batch, gmail_service.find_sent)
+        if os.getenv('CACHE_WARMER_ENABLED', 'true').lower() == 'true':
+            CACHE_WARMER.start()
+        if os.getenv('SEND_QUEUE_ENABLED', 'true').lower() == 'true':
+            SEND_QUEUE.start()
+    return app
+
 if __name__ == '__main__':
-    app.run(debug=True, port=5001) 
\ No newline at end of file
+    create_app().run(debug=True, port=5001) 
\ No newline at end of file
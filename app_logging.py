@@ -0,0 +1,141 @@
+"""
+Leveled, structured, non-blocking logging
+
+Modules log through `get_logger(__name__)`. Records are handed to a queue
+on the calling thread and written to stdout by a single listener thread, so
+request threads never contend on stdout. Each record carries the current
+request ID (see tracing.py) and is written as one JSON object per line
+(LOG_FORMAT=text for a readable console). Production runs at LOG_LEVEL=INFO;
+the verbose DEBUG detail - upstream payloads, every candidate checked, full
+generated intros - is only built and written for requests that ask for it
+(X-Debug-Log: 1) or are sampled (LOG_DEBUG_SAMPLE_RATE).
+"""
+
+import atexit
+import contextvars
+import logging
+import os
+import queue
+import random
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from logging.handlers import QueueHandler, QueueListener
+from typing import Iterator, Optional
+
+from serialization import dumps
+from tracing import current_request_id
+
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO').upper()
+LOG_FORMAT = os.getenv('LOG_FORMAT', 'json').lower()
+# Share of requests logged at DEBUG without asking for it
+LOG_DEBUG_SAMPLE_RATE = float(os.getenv('LOG_DEBUG_SAMPLE_RATE', '0'))
+
+_request_debug: contextvars.ContextVar[bool] = contextvars.ContextVar('request_debug', default=False)
+
+# Attributes every LogRecord has - anything else came in through extra={...}
+_RECORD_FIELDS = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime', 'request_id'}
+
+
+class RequestLogger(logging.Logger):
+    """Logger that also emits DEBUG records for requests with debug logging switched on"""
+
+    def isEnabledFor(self, level: int) -> bool:
+        return super().isEnabledFor(level) or (level >= logging.DEBUG and _request_debug.get())
+
+
+class RequestContextFilter(logging.Filter):
+    """Stamps records with the request ID while still on the request's thread"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = current_request_id()
+        return True
+
+
+class JSONFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'ts': time.strftime('%Y-%m-%dT%H:%M:%S', time.gmtime(record.created)) + f'.{int(record.msecs):03d}Z',
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage(),
+            'request_id': getattr(record, 'request_id', None),
+            'thread': record.threadName,
+        }
+        entry.update({key: value for key, value in vars(record).items() if key not in _RECORD_FIELDS})
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry['exc'] = record.exc_text
+        return dumps(entry, default=str).decode('utf-8')
+
+
+class TextFormatter(logging.Formatter):
+    def __init__(self):
+        super().__init__('%(asctime)s %(levelname)-7s [%(request_id)s] %(name)s: %(message)s', '%H:%M:%S')
+
+    def format(self, record: logging.LogRecord) -> str:
+        record.request_id = getattr(record, 'request_id', None) or '-'
+        return super().format(record)
+
+
+class _QueueHandler(QueueHandler):
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Leave formatting to the listener thread; only resolve the message so args can't change under it
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+_listener: Optional[QueueListener] = None
+_configure_lock = threading.Lock()
+
+
+def configure_logging(level: Optional[str] = None, fmt: Optional[str] = None) -> None:
+    """Route the root logger through a queue to one stdout writer thread (idempotent)
+
+    Level and format default to LOG_LEVEL / LOG_FORMAT, read at call time so a .env loaded after import counts.
+    """
+    global _listener
+    level = (level or os.getenv('LOG_LEVEL', LOG_LEVEL)).upper()
+    fmt = (fmt or os.getenv('LOG_FORMAT', LOG_FORMAT)).lower()
+    with _configure_lock:
+        if _listener is not None:
+            return
+        stream = logging.StreamHandler(sys.stdout)
+        stream.setFormatter(TextFormatter() if fmt == 'text' else JSONFormatter())
+        log_queue: queue.SimpleQueue = queue.SimpleQueue()
+        handler = _QueueHandler(log_queue)
+        handler.addFilter(RequestContextFilter())
+        root = logging.getLogger()
+        root.handlers[:] = [handler]
+        root.setLevel(level)
+        _listener = QueueListener(log_queue, stream, respect_handler_level=False)
+        _listener.start()
+        atexit.register(_listener.stop)
+
+
+def get_logger(name: str) -> logging.Logger:
+    """A module logger that honours per-request debug logging"""
+    with _configure_lock:
+        previous = logging.getLoggerClass()
+        logging.setLoggerClass(RequestLogger)
+        try:
+            return logging.getLogger(name)
+        finally:
+            logging.setLoggerClass(previous)
+
+
+@contextmanager
+def request_debug(enabled: bool = False) -> Iterator[bool]:
+    """Log DEBUG for the current request if asked to, or if it is sampled"""
+    enabled = enabled or (LOG_DEBUG_SAMPLE_RATE > 0 and random.random() < LOG_DEBUG_SAMPLE_RATE)
+    token = _request_debug.set(enabled)
+    try:
+        yield enabled
+    finally:
+        _request_debug.reset(token)
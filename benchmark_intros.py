@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Benchmark the local intro templates against the OpenAI intro path
+
+Reports per-company latency and fact coverage (how many of the funding amount,
+series, valuation, metric, product and first name make it into the intro).
+The OpenAI path only runs with --llm and a configured OPENAI_API_KEY; intros
+recorded in the saved *_test.json responses are scored offline either way.
+
+Usage:
+  python benchmark_intros.py          # Local templates + recorded LLM intros
+  python benchmark_intros.py --llm    # Also call OpenAI live for each company
+"""
+
+import glob
+import statistics
+import sys
+import time
+from datetime import datetime
+
+from local_intro import extract_facts, render_intro, fact_coverage
+from serialization import read_json, write_json
+
+LOCAL_REPETITIONS = 1000
+
+
+def load_cases():
+    """Company data from the training examples and the saved API responses"""
+    cases = []
+    for ex in read_json('training_examples.json'):
+        cases.append({
+            'source': 'training_examples',
+            'company_data': {
+                'company_name': ex['company'],
+                'ceo_name': ex.get('ceo_name'),
+                'founder_name': None,
+                'recent_news': ex.get('recent_achievement'),
+                'impressive_metric': ex.get('key_metric')
+            },
+            'recorded_intro': None
+        })
+
+    for path in sorted(glob.glob('*_test.json')):
+        try:
+            data = read_json(path).get('data', {})
+        except ValueError:
+            print(f"⚠️ Skipping {path} - not a saved JSON response")
+            continue
+        details = data.get('company_details', {})
+        email = data.get('email_content', '')
+        intro_end = email.find("For quick context")
+        cases.append({
+            'source': path,
+            'company_data': {
+                'company_name': data.get('company_name'),
+                'ceo_name': data.get('ceo_name'),
+                'founder_name': None,
+                'description': details.get('description'),
+                'technology_focus': details.get('technology_focus'),
+                'recent_news': details.get('recent_news'),
+                'impressive_metric': details.get('impressive_metric')
+            },
+            'recorded_intro': email[:intro_end].strip() if intro_end > 0 else None
+        })
+    return cases
+
+
+def time_local(company_data):
+    """Mean render time in microseconds over LOCAL_REPETITIONS runs"""
+    start = time.perf_counter()
+    for _ in range(LOCAL_REPETITIONS):
+        intro = render_intro(company_data)
+    return intro, (time.perf_counter() - start) / LOCAL_REPETITIONS * 1e6
+
+
+def time_llm(company_data):
+    """Single live OpenAI intro and its latency in milliseconds"""
+    from app import generate_email
+    start = time.perf_counter()
+    email = generate_email(dict(company_data), [], draft_mode='llm')
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    intro_end = email.find("For quick context")
+    return email[:intro_end].strip(), elapsed_ms
+
+
+def run_benchmark(use_llm=False):
+    print("\n" + "=" * 60)
+    print("INTRO GENERATION BENCHMARK - LOCAL TEMPLATES vs OPENAI")
+    print("=" * 60)
+
+    results = []
+    for case in load_cases():
+        company_data = case['company_data']
+        facts = extract_facts(company_data)
+        local_intro, local_us = time_local(company_data)
+
+        result = {
+            'company': company_data['company_name'],
+            'source': case['source'],
+            'facts': sorted(k for k in facts if k in ('funding', 'series', 'valuation', 'metric', 'product')),
+            'local_latency_us': round(local_us, 1),
+            'local_coverage': round(fact_coverage(local_intro, facts), 2),
+            'local_intro': local_intro
+        }
+        if case['recorded_intro']:
+            result['recorded_llm_coverage'] = round(fact_coverage(case['recorded_intro'], facts), 2)
+        if use_llm:
+            llm_intro, llm_ms = time_llm(company_data)
+            result['llm_latency_ms'] = round(llm_ms, 1)
+            result['llm_coverage'] = round(fact_coverage(llm_intro, facts), 2)
+            result['llm_intro'] = llm_intro
+
+        results.append(result)
+        line = f"  - {result['company']}: local {result['local_latency_us']:.1f}µs, coverage {result['local_coverage']:.0%}"
+        if 'llm_latency_ms' in result:
+            line += f" | llm {result['llm_latency_ms']:.0f}ms, coverage {result['llm_coverage']:.0%}"
+        if 'recorded_llm_coverage' in result:
+            line += f" | recorded llm coverage {result['recorded_llm_coverage']:.0%}"
+        print(line)
+
+    print("\n" + "=" * 60)
+    print("SUMMARY")
+    print("=" * 60)
+    local_latencies = [r['local_latency_us'] for r in results]
+    print(f"Local  - p50 {statistics.median(local_latencies):.1f}µs, max {max(local_latencies):.1f}µs, "
+          f"mean coverage {statistics.mean(r['local_coverage'] for r in results):.0%}")
+    llm_results = [r for r in results if 'llm_latency_ms' in r]
+    if llm_results:
+        llm_latencies = [r['llm_latency_ms'] for r in llm_results]
+        print(f"OpenAI - p50 {statistics.median(llm_latencies):.0f}ms, max {max(llm_latencies):.0f}ms, "
+              f"mean coverage {statistics.mean(r['llm_coverage'] for r in llm_results):.0%}")
+    recorded = [r for r in results if 'recorded_llm_coverage' in r]
+    if recorded:
+        print(f"Recorded OpenAI intros - mean coverage {statistics.mean(r['recorded_llm_coverage'] for r in recorded):.0%} "
+              f"over {len(recorded)} saved responses")
+
+    filename = f"benchmark_intros_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    write_json(filename, results)
+    print(f"\nResults saved to: {filename}")
+    return results
+
+
+if __name__ == "__main__":
+    run_benchmark(use_llm='--llm' in sys.argv)
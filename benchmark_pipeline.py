@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+Offline benchmark of the enrichment and drafting pipeline
+
+Replays the recorded upstream responses in cassettes/ (see cassettes.py)
+through CompanyDataScraper and generate_email - no network, no API keys -
+with the recorded latency scaled or replaced, and reports p50/p95/p99 per
+stage plus end-to-end latency and throughput at each concurrency level.
+The knowledge base and the search cache are bypassed so every request runs
+the full pipeline.
+
+Usage:
+  python benchmark_pipeline.py                          # Concurrency 1,4,8 with recorded latency
+  python benchmark_pipeline.py --concurrency 1,16 --requests 64
+  python benchmark_pipeline.py --latency-scale 0.5      # Upstreams twice as fast as recorded
+  python benchmark_pipeline.py --latency-ms 0           # No injected latency - pipeline CPU cost only
+  python benchmark_pipeline.py --draft-mode local       # Skip the OpenAI calls
+  python benchmark_pipeline.py --record "Stripe"        # Record a cassette (live network and API keys)
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, List
+
+# Background workers, learning and per-request output would only add noise to the measurements
+os.environ.setdefault('CACHE_WARMER_ENABLED', 'false')
+os.environ.setdefault('SEND_QUEUE_ENABLED', 'false')
+os.environ.setdefault('KNOWLEDGE_BASE_LEARNING', 'false')  # Replayed companies aren't worth remembering
+os.environ.setdefault('TRACING_ENABLED', 'false')
+os.environ.setdefault('LOG_LEVEL', 'WARNING')
+
+from cassettes import CassetteLibrary, CassetteRecorder, CASSETTE_DIR
+from serialization import write_json
+
+DEFAULT_CONCURRENCY = '1,4,8'
+DEFAULT_REQUESTS_PER_LEVEL = 24
+
+
+def percentiles(values: List[float]) -> Dict[str, float]:
+    if len(values) == 1:
+        return {'p50': values[0], 'p95': values[0], 'p99': values[0]}
+    cuts = statistics.quantiles(values, n=100, method='inclusive')
+    return {'p50': cuts[49], 'p95': cuts[94], 'p99': cuts[98]}
+
+
+def run_request(app, company: str, draft_mode: str) -> Dict[str, float]:
+    """One generate-outreach pipeline run; stage timings plus the total, in seconds"""
+    from metrics import collect_timings, timed
+    from deadline import Deadline
+    from prompt_builder import TokenUsage
+
+    start = time.perf_counter()
+    with collect_timings() as timings:
+        deadline = Deadline(app.REQUEST_DEADLINE_SECONDS)
+        token_usage = TokenUsage()
+        record = app.enrich_company(company, draft_mode, deadline, token_usage)
+        with timed('email_generation'):
+            app.generate_email(record.company_data(), record.executive_dicts(), token_usage, draft_mode, deadline)
+    timings = dict(timings)
+    timings['total'] = time.perf_counter() - start
+    return timings
+
+
+def run_level(app, companies: List[str], concurrency: int, requests: int, draft_mode: str) -> Dict:
+    jobs = [companies[i % len(companies)] for i in range(requests)]
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        runs = list(pool.map(lambda company: run_request(app, company, draft_mode), jobs))
+    wall = time.perf_counter() - start
+
+    stages: Dict[str, List[float]] = {}
+    for timings in runs:
+        for stage, seconds in timings.items():
+            stages.setdefault(stage, []).append(seconds)
+    return {
+        'concurrency': concurrency,
+        'requests': requests,
+        'wall_seconds': round(wall, 3),
+        'throughput_rps': round(requests / wall, 2),
+        'stages': {stage: {key: round(value * 1000, 1) for key, value in percentiles(values).items()}
+                   | {'runs': len(values)} for stage, values in sorted(stages.items())},
+    }
+
+
+def print_level(result: Dict) -> None:
+    total = result['stages']['total']
+    print(f"\nConcurrency {result['concurrency']}: {result['requests']} requests in {result['wall_seconds']:.2f}s "
+          f"- {result['throughput_rps']:.2f} req/s, total p50 {total['p50']:.0f}ms p95 {total['p95']:.0f}ms "
+          f"p99 {total['p99']:.0f}ms")
+    print(f"  {'stage':<32} {'runs':>5} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for stage, stats in result['stages'].items():
+        if stage != 'total':
+            print(f"  {stage:<32} {stats['runs']:>5} {stats['p50']:>9.1f} {stats['p95']:>9.1f} {stats['p99']:>9.1f}")
+
+
+def run_benchmark(args) -> List[Dict]:
+    # Keys only need to be present for the pipeline to take the Serper/Specter/OpenAI paths
+    for key in ('SERPER_API_KEY', 'SPECTER_API_KEY', 'OPENAI_API_KEY'):
+        os.environ.setdefault(key, 'cassette')
+    library = CassetteLibrary.load(args.cassettes, latency_scale=args.latency_scale, latency_ms=args.latency_ms,
+                                   jitter=args.jitter, seed=args.seed)
+    companies = library.companies()
+    if not companies:
+        print(f"No cassettes in {args.cassettes} - record one with --record \"Company\"")
+        return []
+    import app
+
+    latency = f"{args.latency_ms:g}ms per call" if args.latency_ms is not None else f"recorded x{args.latency_scale:g}"
+    print(f"Replaying {len(companies)} cassettes ({', '.join(companies)}), latency {latency}, draft mode {args.draft_mode}")
+
+    results = []
+    lookup = app.KNOWLEDGE_BASE.lookup
+    app.KNOWLEDGE_BASE.lookup = lambda name: None
+    try:
+        with library.replaying():
+            run_request(app, companies[0], args.draft_mode)  # Warm-up: imports, encoders, thread pools
+            for concurrency in args.concurrency:
+                result = run_level(app, companies, concurrency, args.requests, args.draft_mode)
+                results.append(result)
+                print_level(result)
+    finally:
+        app.KNOWLEDGE_BASE.lookup = lookup
+
+    print(f"\nUpstream calls - {library.stats['matched']} replayed, {library.stats['unmatched']} unrecorded (404), "
+          f"{library.stats['openai']} OpenAI")
+    filename = f"benchmark_pipeline_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    write_json(filename, {'latency': latency, 'draft_mode': args.draft_mode, 'companies': companies, 'levels': results})
+    print(f"Results saved to: {filename}")
+    return results
+
+
+def record(company: str, directory: str) -> None:
+    """Run the live pipeline for one company and save every upstream response it got"""
+    import app
+    if app.KNOWLEDGE_BASE.lookup(company):
+        print(f"⚠️ {company} is in the knowledge base - recording the live search anyway")
+    lookup = app.KNOWLEDGE_BASE.lookup
+    app.KNOWLEDGE_BASE.lookup = lambda name: None
+    recorder = CassetteRecorder(company)
+    try:
+        with recorder.recording():
+            run_request(app, company, 'llm')
+    finally:
+        app.KNOWLEDGE_BASE.lookup = lookup
+    path = recorder.save(directory)
+    print(f"Recorded {len(recorder.cassette['http'])} HTTP and {len(recorder.cassette['openai'])} OpenAI calls to {path}")
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0].strip())
+    parser.add_argument('--concurrency', type=lambda s: [int(n) for n in s.split(',')], default=DEFAULT_CONCURRENCY,
+                        help=f'comma-separated concurrency levels (default {DEFAULT_CONCURRENCY})')
+    parser.add_argument('--requests', type=int, default=DEFAULT_REQUESTS_PER_LEVEL,
+                        help=f'requests per concurrency level (default {DEFAULT_REQUESTS_PER_LEVEL})')
+    parser.add_argument('--latency-scale', type=float, default=1.0, help='multiply recorded upstream latency')
+    parser.add_argument('--latency-ms', type=float, default=None, help='fixed latency per upstream call instead')
+    parser.add_argument('--jitter', type=float, default=0.0, help='random +/- fraction applied to each latency')
+    parser.add_argument('--seed', type=int, default=0, help='seed for the jitter')
+    parser.add_argument('--draft-mode', choices=('llm', 'local'), default='llm')
+    parser.add_argument('--cassettes', default=CASSETTE_DIR, help='cassette directory')
+    parser.add_argument('--record', metavar='COMPANY', help='record a cassette for COMPANY instead of benchmarking')
+    args = parser.parse_args(argv)
+    if isinstance(args.concurrency, str):
+        args.concurrency = [int(n) for n in args.concurrency.split(',')]
+    return args
+
+
+if __name__ == "__main__":
+    args = parse_args(sys.argv[1:])
+    if args.record:
+        record(args.record, args.cassettes)
+    else:
+        run_benchmark(args)
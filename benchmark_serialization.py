@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Benchmark stdlib json against the orjson-backed serialization layer
+
+Payloads are the saved API responses (*_test.json), the batch test results and
+a batch of cached CompanyRecords - the shapes generate_outreach, the search
+cache and batch mode actually serialize. Reports per-operation latency for
+dumps/loads and the speedup.
+
+Usage:
+  python benchmark_serialization.py            # 1000 repetitions per payload
+  python benchmark_serialization.py 5000       # Custom repetitions
+"""
+
+import glob
+import json
+import statistics
+import sys
+import time
+
+import serialization
+from company_record import CompanyRecord
+from serialization import read_json
+
+DEFAULT_REPETITIONS = 1000
+BATCH_SIZE = 1000
+
+
+def load_payloads():
+    """Representative payloads by name"""
+    payloads = {}
+    for path in sorted(glob.glob('*_test.json')) + sorted(glob.glob('test_results_*.json')):
+        try:
+            payloads[path] = read_json(path)
+        except ValueError:
+            print(f"⚠️ Skipping {path} - not a saved JSON response")
+
+    responses = [p for name, p in payloads.items() if name.endswith('_test.json')]
+    if responses:
+        # Batch mode emits one response per company
+        payloads[f'batch of {BATCH_SIZE} responses'] = [responses[i % len(responses)] for i in range(BATCH_SIZE)]
+        details = responses[0]['data']
+        record = CompanyRecord(company_name=details.get('company_name') or 'Example',
+                               ceo_email=details.get('ceo_email'), ceo_name=details.get('ceo_name'),
+                               **{k: v for k, v in details.get('company_details', {}).items()
+                                  if k in ('description', 'technology_focus', 'recent_news', 'impressive_metric')})
+        payloads[f'{BATCH_SIZE} cache records'] = [record.to_dict() for _ in range(BATCH_SIZE)]
+    return payloads
+
+
+def time_op(fn, repetitions: int) -> float:
+    """Median microseconds per call over a few rounds"""
+    rounds = []
+    for _ in range(5):
+        start = time.perf_counter()
+        for _ in range(repetitions):
+            fn()
+        rounds.append((time.perf_counter() - start) / repetitions * 1e6)
+    return statistics.median(rounds)
+
+
+def run_benchmark(repetitions: int = DEFAULT_REPETITIONS):
+    if serialization.orjson is None:
+        print("⚠️ orjson not installed - serialization falls back to stdlib json, expect ~1x")
+    payloads = load_payloads()
+    print(f"{'payload':<40} {'bytes':>9} {'op':>6} {'json µs':>10} {'fast µs':>10} {'speedup':>8}")
+    for name, payload in payloads.items():
+        encoded = serialization.dumps(payload)
+        # Fewer repetitions for the big batch payloads so a run stays in seconds
+        reps = max(1, repetitions // 100) if isinstance(payload, list) and len(payload) >= BATCH_SIZE else repetitions
+        ops = {
+            'dumps': (lambda: json.dumps(payload).encode('utf-8'), lambda: serialization.dumps(payload)),
+            'loads': (lambda: json.loads(encoded), lambda: serialization.loads(encoded)),
+        }
+        for op, (stdlib, fast) in ops.items():
+            stdlib_us, fast_us = time_op(stdlib, reps), time_op(fast, reps)
+            print(f"{name[:40]:<40} {len(encoded):>9} {op:>6} {stdlib_us:>10.1f} {fast_us:>10.1f} {stdlib_us / fast_us:>7.1f}x")
+
+
+if __name__ == "__main__":
+    run_benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_REPETITIONS)
@@ -0,0 +1,141 @@
+"""
+Background cache warmer for the companies we're about to contact
+
+Companies on the watchlist (watchlist.txt, one per line, or added through
+/api/cache/watchlist) are enriched ahead of time during an off-peak window,
+rate limited, and stored in the search cache - so the first click in the UI
+is a cache hit instead of the 15-25s cold path.
+"""
+
+import os
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Any, Tuple
+
+from company_names import dedupe_company_names
+from rate_limit import TokenBucket
+from app_logging import get_logger
+
+log = get_logger(__name__)
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+WATCHLIST_FILE = os.getenv('WATCHLIST_FILE', os.path.join(BASE_DIR, 'watchlist.txt'))
+
+# Off-peak hours (UTC) as "start-end"; the window may wrap past midnight, e.g. "22-6"
+WARM_WINDOW_UTC = os.getenv('WARM_WINDOW_UTC', '2-7')
+WARM_RATE_PER_MINUTE = float(os.getenv('WARM_RATE_PER_MINUTE', '4'))
+# How often the warmer wakes up to look for cold or stale watchlist companies
+WARM_CHECK_SECONDS = 300
+
+
+def parse_window(window: str) -> Tuple[int, int]:
+    try:
+        start, end = (int(part) % 24 for part in window.split('-'))
+        return start, end
+    except ValueError:
+        log.warning("Invalid WARM_WINDOW_UTC %r - warming around the clock", window)
+        return 0, 0
+
+
+class CacheWarmer:
+    """Enriches watchlist companies that are missing from or stale in the cache"""
+
+    def __init__(self, warm: Callable[[str], None],
+                 freshness: Callable[[str], Tuple[Optional[str], Optional[float]]],
+                 path: str = WATCHLIST_FILE, window: str = WARM_WINDOW_UTC,
+                 rate_per_minute: float = WARM_RATE_PER_MINUTE):
+        self.warm = warm
+        self.freshness = freshness
+        self.path = path
+        self.window = parse_window(window)
+        self.bucket = TokenBucket(rate_per_minute / 60.0, capacity=1)
+        self.results: Dict[str, Dict[str, Any]] = {}
+        self._wake = threading.Event()
+        self._force = False
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def watchlist(self) -> List[str]:
+        if not os.path.exists(self.path):
+            return []
+        with open(self.path, 'r') as f:
+            names = [line.split('#', 1)[0].strip() for line in f]
+        return dedupe_company_names(names)
+
+    def add(self, companies: List[str]) -> List[str]:
+        """Append new companies to the watchlist file; returns the ones actually added"""
+        with self._lock:
+            existing = self.watchlist()
+            added = [name for name in dedupe_company_names(existing + companies) if name not in existing]
+            if added:
+                with open(self.path, 'a') as f:
+                    f.writelines(f"{name}\n" for name in added)
+        return added
+
+    def in_window(self, hour: int = None) -> bool:
+        start, end = self.window
+        hour = time.gmtime().tm_hour if hour is None else hour
+        if start == end:
+            return True
+        return start <= hour < end if start < end else hour >= start or hour < end
+
+    def run_once(self) -> int:
+        """Warm every watchlist company that isn't fresh in the cache; returns how many were warmed"""
+        warmed = 0
+        for company in self.watchlist():
+            state, _ = self.freshness(company)
+            if state == 'fresh':
+                continue
+            self.bucket.acquire()
+            started = time.time()
+            try:
+                self.warm(company)
+                self.results[company] = {'warmed_at': int(started), 'seconds': round(time.time() - started, 2)}
+                warmed += 1
+                log.info("Warmed %s in %.1fs", company, time.time() - started)
+            except Exception as e:
+                self.results[company] = {'warmed_at': int(started), 'error': str(e)}
+                log.warning("Could not warm %s: %s", company, e)
+        return warmed
+
+    def trigger(self) -> None:
+        """Run a pass now, even outside the off-peak window"""
+        self._force = True
+        self._wake.set()
+
+    def _loop(self) -> None:
+        while True:
+            if self._force or self.in_window():
+                self._force = False
+                self.run_once()
+            self._wake.wait(WARM_CHECK_SECONDS)
+            self._wake.clear()
+
+    def start(self) -> None:
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._loop, name='cache-warmer', daemon=True)
+            self._thread.start()
+            log.info("Cache warmer started - window %02d-%02d UTC, %g companies/min",
+                     self.window[0], self.window[1], self.bucket.rate * 60)
+
+    def status(self) -> Dict[str, Any]:
+        """Watchlist coverage and per-company cache freshness"""
+        companies = {}
+        counts = {'fresh': 0, 'stale': 0, 'missing': 0}
+        for company in self.watchlist():
+            state, age = self.freshness(company)
+            state = state or 'missing'
+            counts[state] += 1
+            companies[company] = {'state': state, 'age_seconds': round(age) if age is not None else None,
+                                  **self.results.get(company, {})}
+        total = len(companies)
+        return {
+            'watchlist_size': total,
+            'coverage': round((counts['fresh'] + counts['stale']) / total, 3) if total else None,
+            'fresh_share': round(counts['fresh'] / total, 3) if total else None,
+            **counts,
+            'in_window': self.in_window(),
+            'window_utc': f"{self.window[0]:02d}-{self.window[1]:02d}",
+            'running': self._thread is not None,
+            'companies': companies
+        }
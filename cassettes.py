@@ -0,0 +1,239 @@
+"""
+VCR-style cassettes of upstream responses for offline benchmarking
+
+A cassette (cassettes/<company>.json) holds the HTTP responses - website,
+Google, Serper, Specter - and OpenAI completions recorded while enriching one
+company, with how long each took. Replaying patches requests.Session.request
+and openai.ChatCompletion.create so CompanyDataScraper and generate_email run
+unchanged against the recordings, sleeping the recorded (or a configured)
+latency instead of touching the network. See benchmark_pipeline.py.
+"""
+
+import os
+import random
+import re
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional, Set
+from urllib.parse import unquote_plus, urlparse
+
+import requests
+
+from serialization import dumps, read_json, write_json
+
+try:
+    import openai
+except ImportError:
+    openai = None
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+CASSETTE_DIR = os.path.join(BASE_DIR, 'cassettes')
+# Latency of a call nothing was recorded for - an unregistered domain fails fast
+UNMATCHED_LATENCY_MS = 20
+
+
+def _tokens(text: str) -> Set[str]:
+    # Years are dropped so a cassette recorded last year still matches "... funding round 2026"
+    return {t for t in re.findall(r'[a-z0-9]+', unquote_plus(text).lower()) if not re.fullmatch(r'(19|20)\d\d', t)}
+
+
+def _request_key(method: str, url: str) -> str:
+    parsed = urlparse(url)
+    return f"{method.upper()} {parsed.netloc}{parsed.path.rstrip('/')}"
+
+
+def _request_tokens(url: str, json_body: Any = None) -> Set[str]:
+    return _tokens(urlparse(url).query + ' ' + (dumps(json_body).decode('utf-8') if json_body is not None else ''))
+
+
+def _messages_text(kwargs: Dict[str, Any]) -> str:
+    return ' '.join(str(m.get('content') or '') for m in kwargs.get('messages') or []).lower()
+
+
+def _function_fields(kwargs: Dict[str, Any]) -> Optional[List[str]]:
+    """Required fields of the requested function call, None for a plain completion"""
+    functions = kwargs.get('functions')
+    if not functions:
+        return None
+    return sorted(functions[0].get('parameters', {}).get('required', []))
+
+
+def _to_response(entry: Dict[str, Any], url: str) -> requests.Response:
+    response = requests.Response()
+    response.status_code = entry['status']
+    response.url = url
+    response.encoding = 'utf-8'
+    response.headers['Content-Type'] = entry.get('content_type') or 'text/html; charset=utf-8'
+    if 'json' in entry:
+        response._content = dumps(entry['json'])
+    else:
+        response._content = (entry.get('text') or '').encode('utf-8')
+    return response
+
+
+class CassetteLibrary:
+    """Recorded interactions of every cassette, matched against live calls"""
+
+    def __init__(self, cassettes: List[Dict[str, Any]], latency_scale: float = 1.0,
+                 latency_ms: Optional[float] = None, jitter: float = 0.0, seed: int = 0):
+        self.cassettes = cassettes
+        self.latency_scale = latency_scale
+        self.latency_ms = latency_ms
+        self.jitter = jitter
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.stats = {'matched': 0, 'unmatched': 0, 'openai': 0}
+        self._http: Dict[str, List[Dict[str, Any]]] = {}
+        for cassette in cassettes:
+            for entry in cassette.get('http', []):
+                self._http.setdefault(_request_key(entry['method'], entry['url']), []).append(
+                    dict(entry, tokens=_request_tokens(entry['url'], entry.get('request_json'))))
+
+    @classmethod
+    def load(cls, directory: str = CASSETTE_DIR, **options: Any) -> 'CassetteLibrary':
+        paths = sorted(os.path.join(directory, name) for name in os.listdir(directory) if name.endswith('.json'))
+        return cls([read_json(path) for path in paths], **options)
+
+    def companies(self) -> List[str]:
+        return [cassette['company'] for cassette in self.cassettes]
+
+    def _sleep(self, recorded_ms: float) -> None:
+        delay_ms = self.latency_ms if self.latency_ms is not None else recorded_ms * self.latency_scale
+        if self.jitter:
+            with self._lock:
+                delay_ms *= 1 + self._random.uniform(-self.jitter, self.jitter)
+        if delay_ms > 0:
+            time.sleep(delay_ms / 1000)
+
+    def _count(self, outcome: str) -> None:
+        with self._lock:
+            self.stats[outcome] += 1
+
+    def match_http(self, method: str, url: str, json_body: Any = None) -> Optional[Dict[str, Any]]:
+        """Recorded call to the same endpoint whose query/body shares the most words with this one"""
+        candidates = self._http.get(_request_key(method, url))
+        if not candidates:
+            return None
+        tokens = _request_tokens(url, json_body)
+        best = max(candidates, key=lambda entry: len(entry['tokens'] & tokens))
+        if len(candidates) > 1 and not best['tokens'] & tokens:
+            return None
+        return best
+
+    def match_openai(self, kwargs: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Recorded completion of the same kind (enhance, repair, intro) for the company in the prompt"""
+        fields = _function_fields(kwargs)
+        text = _messages_text(kwargs)
+        fallback = None
+        for cassette in self.cassettes:
+            for entry in cassette.get('openai', []):
+                if entry.get('function_fields') != fields:
+                    continue
+                if cassette['company'].lower() in text:
+                    return entry
+                fallback = fallback or entry
+        return fallback
+
+    def replay_request(self, method: str, url: str, **kwargs: Any) -> requests.Response:
+        entry = self.match_http(method, url, kwargs.get('json'))
+        if entry is None:
+            self._count('unmatched')
+            self._sleep(UNMATCHED_LATENCY_MS)
+            return _to_response({'status': 404, 'text': ''}, url)
+        self._count('matched')
+        self._sleep(entry.get('elapsed_ms', 0))
+        return _to_response(entry, url)
+
+    def replay_chat_completion(self, **kwargs: Any) -> Dict[str, Any]:
+        entry = self.match_openai(kwargs)
+        if entry is None:
+            raise RuntimeError('No recorded OpenAI completion matches this call')
+        self._count('openai')
+        self._sleep(entry.get('elapsed_ms', 0))
+        return entry['response']
+
+    @contextmanager
+    def replaying(self):
+        """Serve every requests.Session call and OpenAI completion from the cassettes"""
+        library = self
+        original_request = requests.Session.request
+
+        def request(session, method, url, **kwargs):
+            return library.replay_request(method, url, **kwargs)
+        requests.Session.request = request
+        original_create = vars(openai.ChatCompletion)['create'] if openai else None
+        if openai:
+            openai.ChatCompletion.create = staticmethod(lambda **kwargs: library.replay_chat_completion(**kwargs))
+        try:
+            yield self
+        finally:
+            requests.Session.request = original_request
+            if openai:
+                openai.ChatCompletion.create = original_create
+
+
+class CassetteRecorder:
+    """Records the real upstream calls made while enriching one company"""
+
+    def __init__(self, company: str):
+        self.cassette: Dict[str, Any] = {'company': company, 'recorded_at': time.strftime('%Y-%m-%d'),
+                                         'http': [], 'openai': []}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def recording(self):
+        recorder = self
+        original_request = requests.Session.request
+
+        def request(session, method, url, **kwargs):
+            start = time.perf_counter()
+            response = original_request(session, method, url, **kwargs)
+            recorder._add_http(method, url, kwargs.get('json'), response, (time.perf_counter() - start) * 1000)
+            return response
+        requests.Session.request = request
+
+        original_create = vars(openai.ChatCompletion)['create'] if openai else None
+        if openai:
+            live_create = openai.ChatCompletion.create
+
+            def create(**kwargs):
+                start = time.perf_counter()
+                response = live_create(**kwargs)
+                recorder._add_openai(kwargs, response, (time.perf_counter() - start) * 1000)
+                return response
+            openai.ChatCompletion.create = staticmethod(create)
+        try:
+            yield self
+        finally:
+            requests.Session.request = original_request
+            if openai:
+                openai.ChatCompletion.create = original_create
+
+    def _add_http(self, method: str, url: str, json_body: Any, response: requests.Response, elapsed_ms: float) -> None:
+        entry = {'method': method.upper(), 'url': url, 'status': response.status_code,
+                 'content_type': response.headers.get('Content-Type'), 'elapsed_ms': round(elapsed_ms, 1)}
+        if json_body is not None:
+            entry['request_json'] = json_body
+        try:
+            entry['json'] = response.json() if 'json' in (entry['content_type'] or '') else None
+        except ValueError:
+            entry['json'] = None
+        if entry['json'] is None:
+            del entry['json']
+            entry['text'] = response.text
+        with self._lock:
+            self.cassette['http'].append(entry)
+
+    def _add_openai(self, kwargs: Dict[str, Any], response: Any, elapsed_ms: float) -> None:
+        entry = {'function_fields': _function_fields(kwargs), 'elapsed_ms': round(elapsed_ms, 1),
+                 'response': response.to_dict_recursive() if hasattr(response, 'to_dict_recursive') else response}
+        with self._lock:
+            self.cassette['openai'].append(entry)
+
+    def save(self, directory: str = CASSETTE_DIR) -> str:
+        os.makedirs(directory, exist_ok=True)
+        slug = re.sub(r'[^a-z0-9]+', '_', self.cassette['company'].lower()).strip('_')
+        path = os.path.join(directory, f'{slug}.json')
+        write_json(path, self.cassette)
+        return path
@@ -0,0 +1,145 @@
+"""
+Company name normalization and alias resolution
+
+"Scale AI", "scale.ai", "Scale AI Inc." and " scale ai " all normalize to the
+same key. CompanyIndex maps every known alias key (name variants, resolved
+domains) to one canonical company id, with a trigram index for near-miss
+spellings, and is shared by the search cache, the knowledge base and batch
+deduplication.
+"""
+
+import os
+import re
+import threading
+from typing import Dict, Iterable, List, Optional, Set
+
+LEGAL_SUFFIXES = {
+    'inc', 'incorporated', 'llc', 'llp', 'ltd', 'limited', 'corp', 'corporation', 'co', 'pbc',
+    'gmbh', 'ag', 'sa', 'sas', 'sarl', 'bv', 'nv', 'plc', 'pty', 'srl', 'spa', 'oy', 'ab', 'as', 'pte'
+}
+# Descriptors often dropped in casual use - "Scale" for "Scale AI"
+GENERIC_SUFFIXES = {'ai', 'labs', 'lab', 'hq', 'io', 'app', 'technologies', 'technology', 'tech', 'software', 'systems'}
+TLDS = {'com', 'io', 'ai', 'co', 'org', 'net', 'so', 'app', 'dev', 'xyz', 'tech', 'inc', 'us', 'uk', 'de', 'fr', 'ca'}
+
+DOMAIN_RE = re.compile(r'^[a-z0-9-]+(\.[a-z0-9-]+)+$')
+
+# Minimum trigram Jaccard similarity for a fuzzy match, and the shortest key it applies to
+FUZZY_THRESHOLD = float(os.getenv('COMPANY_FUZZY_THRESHOLD', '0.8'))
+FUZZY_MIN_LENGTH = 5
+
+
+def name_tokens(name: str) -> List[str]:
+    """Lowercase word tokens of a company name or domain, without legal suffixes"""
+    value = (name or '').strip().lower()
+    value = re.sub(r'^https?://', '', value).split('/')[0]
+    value = re.sub(r'^www\.', '', value)
+
+    if DOMAIN_RE.match(value) and value.rsplit('.', 1)[-1] in TLDS:
+        labels = value.split('.')
+        while len(labels) > 1 and labels[-1] in TLDS:
+            tld = labels.pop()
+        # Brand-like TLDs are part of the name: scale.ai is "Scale AI"
+        return labels[-1].split('-') + ([tld] if tld in GENERIC_SUFFIXES else [])
+
+    value = value.replace('&', ' and ')
+    tokens = re.sub(r'[^a-z0-9]+', ' ', value).split()
+    while len(tokens) > 1 and tokens[-1] in LEGAL_SUFFIXES:
+        tokens.pop()
+    if len(tokens) > 1 and tokens[0] == 'the':
+        tokens.pop(0)
+    return tokens
+
+
+def normalize_company_name(name: str) -> str:
+    """Canonical lookup key - "Scale AI Inc." and "scale.ai" both become "scaleai\""""
+    return ''.join(name_tokens(name))
+
+
+def alias_keys(name: str, strip_generic: bool = True) -> List[str]:
+    """Keys a name should be reachable by - the full key plus, optionally, the key without a generic descriptor"""
+    tokens = name_tokens(name)
+    keys = [''.join(tokens)] if tokens else []
+    if strip_generic and len(tokens) > 1 and tokens[-1] in GENERIC_SUFFIXES:
+        keys.append(''.join(tokens[:-1]))
+    return keys
+
+
+def trigrams(key: str) -> Set[str]:
+    padded = f"  {key} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class CompanyIndex:
+    """Alias keys -> canonical company id, with trigram fuzzy matching for near misses
+
+    strip_generic also registers "Scale" for "Scale AI"; only safe for a curated list,
+    since a bare word like "Harvey" may well be a different company.
+    """
+
+    def __init__(self, threshold: float = FUZZY_THRESHOLD, strip_generic: bool = True):
+        self.threshold = threshold
+        self.strip_generic = strip_generic
+        self.aliases: Dict[str, str] = {}
+        self.grams: Dict[str, Set[str]] = {}
+        self._lock = threading.Lock()
+
+    def register(self, name: str, company_id: str, domain: Optional[str] = None) -> None:
+        """Make a name (and its resolved domain) resolve to company_id"""
+        with self._lock:
+            for value in filter(None, (name, domain)):
+                for key in alias_keys(value, self.strip_generic):
+                    if key and key not in self.aliases:
+                        self.aliases[key] = company_id
+                        for gram in trigrams(key):
+                            self.grams.setdefault(gram, set()).add(key)
+
+    def lookup(self, name: str, fuzzy: bool = True) -> Optional[str]:
+        """Canonical id for a name, or None if nothing matches closely enough"""
+        keys = alias_keys(name, self.strip_generic)
+        for key in keys:
+            if key in self.aliases:
+                return self.aliases[key]
+        return self._fuzzy(keys[0]) if keys and fuzzy else None
+
+    def resolve(self, name: str) -> str:
+        """Canonical id for a name, falling back to its normalized key for new companies"""
+        return self.lookup(name) or normalize_company_name(name)
+
+    def _fuzzy(self, key: str) -> Optional[str]:
+        if len(key) < FUZZY_MIN_LENGTH:
+            return None
+        query = trigrams(key)
+        with self._lock:
+            shared: Dict[str, int] = {}
+            for gram in query:
+                for candidate in self.grams.get(gram, ()):
+                    shared[candidate] = shared.get(candidate, 0) + 1
+            best, best_score = None, 0.0
+            for candidate, overlap in shared.items():
+                score = overlap / (len(query) + len(trigrams(candidate)) - overlap)
+                if score > best_score:
+                    best, best_score = candidate, score
+            if best is not None and best_score >= self.threshold:
+                return self.aliases[best]
+        return None
+
+    def __len__(self) -> int:
+        return len(self.aliases)
+
+
+def dedupe_company_names(names: Iterable[str]) -> List[str]:
+    """First spelling of each distinct company, in order"""
+    index = CompanyIndex()
+    unique = []
+    for name in names:
+        if not name or not name.strip():
+            continue
+        if index.lookup(name) is None:
+            index.register(name, normalize_company_name(name))
+            unique.append(name.strip())
+    return unique
+
+
+# Shared by the search cache - resolved domains registered here map back to the cached company.
+# Exact names only: "Open AI" must not answer for a company called just "Open"
+COMPANY_INDEX = CompanyIndex(strip_generic=False)
@@ -0,0 +1,99 @@
+"""
+Typed company records for the search cache
+
+The pipeline passes company_data dicts between stages; once a company is
+enriched it is frozen into a CompanyRecord that keeps only what is served or
+needed for a refresh - the company fields, provenance, the executives' name,
+title and founder flag (not the full Specter people list) and the compact
+Specter profile. Records are stored serialized, which keeps a cached company
+to a couple of KB so a worker can hold tens of thousands of them.
+"""
+
+from dataclasses import dataclass, field, fields
+from typing import Dict, List, Optional, Any
+
+from serialization import dumps, loads
+
+# Fields generate_email, the prompts and the API response read from company_data
+COMPANY_FIELDS = ('company_name', 'description', 'ceo_name', 'founder_name', 'technology_focus',
+                  'recent_news', 'impressive_metric', 'enhancement_status', 'enhancement_input_hash', 'enrichment')
+
+
+@dataclass(slots=True)
+class Executive:
+    full_name: str
+    title: str = ''
+    is_founder: bool = False
+    person_id: Optional[str] = None
+
+    @classmethod
+    def from_specter(cls, person: Dict[str, Any]) -> 'Executive':
+        person_id = person.get('person_id') or person.get('id')
+        return cls(full_name=person.get('full_name') or '', title=person.get('title') or '',
+                   is_founder=bool(person.get('is_founder')), person_id=str(person_id) if person_id else None)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Same shape as a Specter person, for code that reads executives with .get()"""
+        return {'full_name': self.full_name, 'title': self.title, 'is_founder': self.is_founder,
+                'person_id': self.person_id}
+
+
+@dataclass(slots=True)
+class CompanyRecord:
+    company_name: str
+    description: Optional[str] = None
+    ceo_name: Optional[str] = None
+    founder_name: Optional[str] = None
+    technology_focus: Optional[str] = None
+    recent_news: Optional[str] = None
+    impressive_metric: Optional[str] = None
+    enhancement_status: Optional[str] = None
+    enhancement_input_hash: Optional[str] = None
+    enrichment: Dict[str, Any] = field(default_factory=dict)
+    executives: List[Executive] = field(default_factory=list)
+    ceo_email: Optional[str] = None
+    domain: Optional[str] = None
+    specter_profile: Optional[Dict[str, Any]] = None
+    raw_fields: Optional[Dict[str, Any]] = None
+    # False when enhancement was skipped (local drafts, deadline cut it short)
+    enhanced: bool = True
+
+    @classmethod
+    def from_enrichment(cls, company_data: Dict[str, Any], specter_data: Dict[str, Any], **extra) -> 'CompanyRecord':
+        """Freeze a pipeline company_data dict and its Specter response into a record"""
+        return cls(**{name: company_data.get(name) for name in COMPANY_FIELDS if company_data.get(name) is not None},
+                   executives=[Executive.from_specter(p) for p in specter_data.get('executives') or []],
+                   domain=specter_data.get('domain'), **extra)
+
+    def company_data(self) -> Dict[str, Any]:
+        """A fresh company_data dict for the pipeline functions"""
+        data = {name: getattr(self, name) for name in COMPANY_FIELDS}
+        data['enrichment'] = dict(self.enrichment)
+        return data
+
+    def executive_dicts(self) -> List[Dict[str, Any]]:
+        return [executive.to_dict() for executive in self.executives]
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Plain dict without empty values"""
+        data = {}
+        for f in fields(self):
+            value = getattr(self, f.name)
+            if f.name == 'executives':
+                value = [executive.to_dict() for executive in value]
+            if value is not None and value != [] and value != {}:
+                data[f.name] = value
+        return data
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'CompanyRecord':
+        data = dict(data)
+        data['executives'] = [Executive(**executive) for executive in data.get('executives', [])]
+        return cls(**data)
+
+    def to_bytes(self) -> bytes:
+        return dumps(self.to_dict())
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> 'CompanyRecord':
+        return cls.from_dict(loads(data))
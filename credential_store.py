@@ -0,0 +1,271 @@
+"""
+Per-user Gmail credential store
+
+Each investor connects their own mailbox. OAuth tokens are kept in SQLite
+(gmail_credentials.db) keyed by user id, encrypted with the Fernet key in
+GMAIL_TOKEN_KEY - without a usable key nothing is stored unless
+GMAIL_ALLOW_PLAINTEXT_TOKENS=true opts out - and the live Credentials objects sit in an
+in-memory LRU, so a send doesn't touch disk. Cached entries are re-checked
+against the database every few seconds to pick up tokens another worker
+connected or refreshed, and refreshes are serialized per user so concurrent
+sends for one mailbox don't all refresh at once. A legacy single-user
+gmail_token.pickle is imported as the default user.
+
+Callers prove which user they are with a user token - the user id signed with
+GMAIL_USER_SECRET (`python credential_store.py token <user_id>` issues one) -
+and the OAuth flow carries a one-time server-side nonce in its state, so
+nobody can connect their own mailbox under another user's id.
+"""
+
+import hashlib
+import hmac
+import os
+import pickle
+import secrets
+import sys
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Any
+
+from google.oauth2.credentials import Credentials
+
+from serialization import loads
+from app_logging import get_logger
+
+log = get_logger(__name__)
+
+try:
+    from cryptography.fernet import Fernet
+except ImportError:
+    Fernet = None
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+CREDENTIALS_DB = os.getenv('GMAIL_CREDENTIALS_DB', os.path.join(BASE_DIR, 'gmail_credentials.db'))
+# Fernet key (Fernet.generate_key()) - without it no token can be stored
+TOKEN_KEY = os.getenv('GMAIL_TOKEN_KEY')
+# Explicit opt-out for local development: store tokens unencrypted when there's no usable key
+ALLOW_PLAINTEXT_TOKENS = os.getenv('GMAIL_ALLOW_PLAINTEXT_TOKENS', 'false').lower() == 'true'
+CREDENTIAL_CACHE_SIZE = int(os.getenv('GMAIL_CREDENTIAL_CACHE_SIZE', '100'))
+# How often a cached user's row is compared with the database
+RECHECK_SECONDS = 5
+LEGACY_TOKEN_PATH = 'gmail_token.pickle'
+# Signs user tokens - without it only the default mailbox can be used
+USER_TOKEN_SECRET = os.getenv('GMAIL_USER_SECRET')
+# How long a user has to finish the Google consent screen
+OAUTH_STATE_TTL_SECONDS = 600
+
+DEFAULT_USER = 'default'
+USER_ID_RE = re.compile(r'^[A-Za-z0-9_.@+-]{1,128}$')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS credentials (
+    user_id TEXT PRIMARY KEY,
+    email TEXT,
+    token BLOB NOT NULL,
+    encrypted INTEGER NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS oauth_states (
+    nonce TEXT PRIMARY KEY,
+    user_id TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+"""
+
+
+def valid_user_id(user_id: str) -> bool:
+    return bool(user_id) and bool(USER_ID_RE.match(user_id))
+
+
+def _signature(user_id: str, secret: str) -> str:
+    return hmac.new(secret.encode('utf-8'), user_id.encode('utf-8'), hashlib.sha256).hexdigest()
+
+
+def user_token(user_id: str, secret: Optional[str] = USER_TOKEN_SECRET) -> str:
+    """Token a user presents (X-User-Token) to act on their own mailbox"""
+    if not secret:
+        raise RuntimeError('GMAIL_USER_SECRET is not configured')
+    if not valid_user_id(user_id):
+        raise ValueError(f"Invalid user id: {user_id!r}")
+    return f"{user_id}.{_signature(user_id, secret)}"
+
+
+def user_from_token(token: str, secret: Optional[str] = USER_TOKEN_SECRET) -> Optional[str]:
+    """The user a token was issued to, None if it is malformed or not signed with our secret"""
+    if not secret or not token or '.' not in token:
+        return None
+    user_id, signature = token.rsplit('.', 1)
+    if not valid_user_id(user_id) or not hmac.compare_digest(signature, _signature(user_id, secret)):
+        return None
+    return user_id
+
+
+@dataclass(slots=True)
+class CredentialEntry:
+    credentials: Credentials
+    email: Optional[str]
+    updated_at: float
+    checked_at: float
+
+
+class CredentialStore:
+    """SQLite-backed per-user OAuth credentials with an in-memory LRU"""
+
+    def __init__(self, path: str = CREDENTIALS_DB, key: Optional[str] = TOKEN_KEY,
+                 cache_size: int = CREDENTIAL_CACHE_SIZE, legacy_path: str = LEGACY_TOKEN_PATH,
+                 allow_plaintext: bool = ALLOW_PLAINTEXT_TOKENS):
+        self.path = path
+        self.cache_size = cache_size
+        self.allow_plaintext = allow_plaintext
+        self.fernet = None
+        if key and Fernet is not None:
+            self.fernet = Fernet(key.encode() if isinstance(key, str) else key)
+        elif allow_plaintext:
+            log.warning("No usable GMAIL_TOKEN_KEY - storing Gmail tokens unencrypted (GMAIL_ALLOW_PLAINTEXT_TOKENS)")
+        else:
+            log.error("No usable GMAIL_TOKEN_KEY (%s) - Gmail accounts can't be connected",
+                      "cryptography isn't installed" if key else "not set")
+        self._entries: 'OrderedDict[str, CredentialEntry]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._user_locks: Dict[str, threading.Lock] = {}
+        with self._connect() as db:
+            db.executescript(SCHEMA)
+        self._import_legacy(legacy_path)
+
+    @contextmanager
+    def _connect(self):
+        db = sqlite3.connect(self.path, timeout=10)
+        try:
+            with db:
+                yield db
+        finally:
+            db.close()
+
+    def _encode(self, credentials: Credentials) -> bytes:
+        token = credentials.to_json().encode('utf-8')
+        if self.fernet:
+            return self.fernet.encrypt(token)
+        if not self.allow_plaintext:
+            raise RuntimeError('Refusing to store a Gmail token unencrypted - set GMAIL_TOKEN_KEY '
+                               '(or GMAIL_ALLOW_PLAINTEXT_TOKENS=true for local development)')
+        return token
+
+    def _decode(self, token: bytes, encrypted: bool) -> Credentials:
+        if encrypted:
+            if not self.fernet:
+                raise RuntimeError('Stored Gmail token is encrypted but GMAIL_TOKEN_KEY is not configured')
+            token = self.fernet.decrypt(token)
+        info = loads(token)
+        return Credentials.from_authorized_user_info(info, info.get('scopes'))
+
+    def user_lock(self, user_id: str) -> threading.Lock:
+        """Held while refreshing a user's token, so only one thread refreshes it"""
+        with self._lock:
+            return self._user_locks.setdefault(user_id, threading.Lock())
+
+    def get(self, user_id: str) -> Optional[CredentialEntry]:
+        """Live credentials for a user, from memory unless another worker changed them"""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None:
+                self._entries.move_to_end(user_id)
+                if now - entry.checked_at < RECHECK_SECONDS:
+                    return entry
+        with self._connect() as db:
+            row = db.execute("SELECT email, token, encrypted, updated_at FROM credentials WHERE user_id = ?",
+                             (user_id,)).fetchone()
+        with self._lock:
+            if row is None:
+                self._entries.pop(user_id, None)
+                return None
+            email, token, encrypted, updated_at = row
+            if entry is not None and entry.updated_at == updated_at:
+                entry.checked_at = now
+                return entry
+            try:
+                entry = CredentialEntry(self._decode(token, bool(encrypted)), email, updated_at, now)
+            except Exception as e:
+                log.warning("Could not load Gmail credentials for %s: %s", user_id, e)
+                return None
+            self._remember(user_id, entry)
+            return entry
+
+    def save(self, user_id: str, credentials: Credentials, email: Optional[str] = None) -> CredentialEntry:
+        """Store (or replace) a user's credentials; email None keeps the known address"""
+        now = time.time()
+        with self._connect() as db:
+            db.execute(
+                "INSERT INTO credentials (user_id, email, token, encrypted, updated_at) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT(user_id) DO UPDATE SET email = COALESCE(excluded.email, credentials.email), "
+                "token = excluded.token, encrypted = excluded.encrypted, updated_at = excluded.updated_at",
+                (user_id, email, self._encode(credentials), int(self.fernet is not None), now))
+            email = db.execute("SELECT email FROM credentials WHERE user_id = ?", (user_id,)).fetchone()[0]
+        entry = CredentialEntry(credentials, email, now, now)
+        with self._lock:
+            self._remember(user_id, entry)
+        return entry
+
+    def delete(self, user_id: str) -> bool:
+        with self._connect() as db:
+            cursor = db.execute("DELETE FROM credentials WHERE user_id = ?", (user_id,))
+        with self._lock:
+            self._entries.pop(user_id, None)
+        return cursor.rowcount > 0
+
+    def create_oauth_state(self, user_id: str) -> str:
+        """One-time nonce tying an OAuth consent flow to the user who started it"""
+        nonce = secrets.token_urlsafe(24)
+        now = time.time()
+        with self._connect() as db:
+            db.execute("DELETE FROM oauth_states WHERE created_at < ?", (now - OAUTH_STATE_TTL_SECONDS,))
+            db.execute("INSERT INTO oauth_states (nonce, user_id, created_at) VALUES (?, ?, ?)", (nonce, user_id, now))
+        return nonce
+
+    def consume_oauth_state(self, nonce: str) -> Optional[str]:
+        """The user an unexpired nonce was issued to - usable once, from any worker"""
+        with self._connect() as db:
+            row = db.execute("SELECT user_id, created_at FROM oauth_states WHERE nonce = ?", (nonce,)).fetchone()
+            if row is None or db.execute("DELETE FROM oauth_states WHERE nonce = ?", (nonce,)).rowcount == 0:
+                return None
+        user_id, created_at = row
+        return user_id if time.time() - created_at < OAUTH_STATE_TTL_SECONDS else None
+
+    def users(self) -> List[Dict[str, Any]]:
+        """Connected users and their mailboxes"""
+        with self._connect() as db:
+            rows = db.execute("SELECT user_id, email, updated_at FROM credentials ORDER BY user_id").fetchall()
+        return [{'user_id': user_id, 'email': email, 'updated_at': updated_at} for user_id, email, updated_at in rows]
+
+    def _remember(self, user_id: str, entry: CredentialEntry) -> None:
+        self._entries[user_id] = entry
+        self._entries.move_to_end(user_id)
+        while len(self._entries) > self.cache_size:
+            self._entries.popitem(last=False)
+
+    def _import_legacy(self, legacy_path: str) -> None:
+        """Move the single-user token pickle into the store as the default user"""
+        if not os.path.exists(legacy_path):
+            return
+        try:
+            with self._connect() as db:
+                known = db.execute("SELECT 1 FROM credentials WHERE user_id = ?", (DEFAULT_USER,)).fetchone()
+            if not known:
+                with open(legacy_path, 'rb') as token:
+                    self.save(DEFAULT_USER, pickle.load(token))
+                log.info("Imported %s as Gmail user %r", legacy_path, DEFAULT_USER)
+            os.replace(legacy_path, legacy_path + '.migrated')
+        except Exception as e:
+            log.warning("Could not import %s: %s", legacy_path, e)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3 or sys.argv[1] != 'token':
+        print("Usage: python credential_store.py token <user_id>")
+        sys.exit(1)
+    print(user_token(sys.argv[2]))
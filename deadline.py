@@ -0,0 +1,94 @@
+"""
+Request deadlines - one wall-clock budget shared by every pipeline stage
+
+generate_outreach creates a Deadline per request. Each stage derives its
+timeout from the time remaining instead of a hardcoded value, and optional
+stages are skipped (and recorded) when there isn't enough budget left.
+A branch of the deadline can be cancelled on its own, which makes every
+stage running under it stop at its next check. Once a deadline is spent or
+cancelled, timeout() returns 0 and upstream calls under it are skipped.
+"""
+
+import time
+from typing import Dict, List, Optional, Any
+
+from app_logging import get_logger
+
+log = get_logger(__name__)
+
+# Smallest timeout handed to an upstream call - below this it can't succeed anyway
+MIN_TIMEOUT_SECONDS = 0.5
+
+
+class DeadlineExceeded(TimeoutError):
+    """An upstream call was skipped because its deadline is spent or cancelled"""
+
+
+class Deadline:
+    """Wall-clock budget for one request; None means unbounded"""
+
+    def __init__(self, budget_seconds: Optional[float] = None):
+        self.budget = budget_seconds
+        self.started_at = time.monotonic()
+        self.expires_at = self.started_at + budget_seconds if budget_seconds else None
+        self.skipped: List[str] = []
+        self.cancelled = False
+
+    def remaining(self) -> float:
+        """Seconds left, or infinity for an unbounded deadline"""
+        if self.cancelled:
+            return 0.0
+        if self.expires_at is None:
+            return float('inf')
+        return max(0.0, self.expires_at - time.monotonic())
+
+    @property
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+    def timeout(self, cap: float, reserve: float = 0.0) -> float:
+        """Timeout for one call: the stage's own cap, bounded by what's left after reserving for later stages
+
+        0 once the deadline is spent or cancelled - callers skip the call rather than start one.
+        """
+        remaining = self.remaining()
+        if remaining <= 0:
+            return 0.0
+        return max(min(MIN_TIMEOUT_SECONDS, remaining), min(cap, remaining - reserve))
+
+    def allows(self, stage: str, needed: float) -> bool:
+        """Whether an optional stage needing `needed` seconds still fits; records it as skipped if not"""
+        if self.remaining() >= needed:
+            return True
+        if self.cancelled:
+            return False
+        if stage not in self.skipped:
+            self.skipped.append(stage)
+        log.info("Skipping %s - %.1fs left, needs %.1fs", stage, self.remaining(), needed)
+        return False
+
+    def branch(self) -> 'Deadline':
+        """Same expiry and skipped-stage record, but cancellable without affecting this deadline"""
+        child = Deadline(self.budget)
+        child.started_at = self.started_at
+        child.expires_at = self.expires_at
+        child.skipped = self.skipped
+        return child
+
+    def cancel(self) -> None:
+        """Expire this deadline now - stages under it stop at their next check"""
+        self.cancelled = True
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Summary for the response metadata"""
+        remaining = self.remaining()
+        return {
+            'budget_seconds': self.budget,
+            'remaining_seconds': round(remaining, 2) if remaining != float('inf') else None,
+            'skipped_stages': list(self.skipped)
+        }
+
+
+def unbounded() -> Deadline:
+    """Deadline for callers outside a request (scripts, background jobs)"""
+    return Deadline(None)
@@ -0,0 +1,117 @@
+"""
+Structured output schema and validation for enhance_with_openai
+
+The model is forced to answer through a function call whose arguments follow
+ENHANCEMENT_FUNCTION, so the response is JSON instead of free text. Fields
+are validated individually; missing or invalid ones can be requested again in
+a single repair call restricted to just those fields.
+"""
+
+import json
+import re
+from typing import Dict, List, Optional, Any, Tuple
+
+FUNCTION_NAME = 'record_company_profile'
+
+FIELD_SPECS = {
+    'description': {
+        'type': 'string',
+        'description': 'A compelling 1-2 sentence, investment-focused description of what the company does'
+    },
+    'ceo_name': {
+        'type': 'string',
+        'description': 'Exact full name of the CEO/founder - check Specter executives first'
+    },
+    'technology': {
+        'type': 'string',
+        'description': 'Their specific technology or market edge'
+    },
+    'recent_news': {
+        'type': 'string',
+        'description': 'Most recent achievement with EXACT details (amounts, dates, partners)'
+    },
+    'impressive_metric': {
+        'type': 'string',
+        'description': 'Most impressive metric - MUST contain actual numbers'
+    }
+}
+
+REQUIRED_FIELDS = tuple(FIELD_SPECS)
+
+# Upper bounds on field length in characters - anything longer is a runaway answer
+MAX_LENGTHS = {
+    'description': 600,
+    'ceo_name': 60,
+    'technology': 400,
+    'recent_news': 400,
+    'impressive_metric': 300
+}
+
+PLACEHOLDERS = {'unknown', 'n/a', 'na', 'none', 'not found', 'not available', 'null', '-', ''}
+
+NAME_RE = re.compile(r"^[A-Z][\w'.\-]*(?:\s+[A-Z][\w'.\-]*){1,4}$")
+
+
+def enhancement_function(fields: Tuple[str, ...] = REQUIRED_FIELDS) -> Dict[str, Any]:
+    """Function definition for the requested fields, all of them required"""
+    return {
+        'name': FUNCTION_NAME,
+        'description': 'Record the synthesized company profile for the outreach email',
+        'parameters': {
+            'type': 'object',
+            'properties': {field: FIELD_SPECS[field] for field in fields},
+            'required': list(fields)
+        }
+    }
+
+
+def parse_arguments(message: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Extract the JSON arguments from a function-call (or plain JSON) response message"""
+    function_call = message.get('function_call')
+    raw = function_call.get('arguments') if function_call else message.get('content')
+    if not raw:
+        return None
+    try:
+        payload = json.loads(raw)
+    except (TypeError, ValueError):
+        # Models occasionally wrap the JSON in prose or code fences
+        match = re.search(r'\{.*\}', raw, re.DOTALL)
+        if not match:
+            return None
+        try:
+            payload = json.loads(match.group(0))
+        except ValueError:
+            return None
+    return payload if isinstance(payload, dict) else None
+
+
+def validate_enhancement(payload: Optional[Dict[str, Any]],
+                         fields: Tuple[str, ...] = REQUIRED_FIELDS) -> Tuple[Dict[str, str], List[str]]:
+    """Return (valid fields, names of missing or invalid fields)"""
+    valid = {}
+    problems = []
+    payload = payload or {}
+    for field in fields:
+        value = payload.get(field)
+        if not isinstance(value, str):
+            problems.append(field)
+            continue
+        value = re.sub(r'\s+', ' ', value).strip()
+        if value.lower().strip('.') in PLACEHOLDERS or len(value) > MAX_LENGTHS[field]:
+            problems.append(field)
+            continue
+        if field == 'ceo_name' and not NAME_RE.match(value):
+            problems.append(field)
+            continue
+        if field == 'impressive_metric' and not re.search(r'\d', value):
+            problems.append(field)
+            continue
+        valid[field] = value
+    return valid, problems
+
+
+def repair_instructions(problems: List[str]) -> str:
+    """Follow-up message asking only for the fields that failed validation"""
+    return (f"These fields were missing or invalid: {', '.join(problems)}. "
+            f"Call {FUNCTION_NAME} again with just those fields, using only the data provided above. "
+            "Names must be full names, metrics must contain numbers.")
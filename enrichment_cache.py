@@ -0,0 +1,147 @@
+"""
+Enrichment cache with stale-while-revalidate
+
+Entries younger than the soft TTL are served as-is. Between the soft and hard
+TTL they are still served immediately, but a background refresh re-runs the
+enrichment and replaces the entry - at most one refresh per company at a time.
+Past the hard TTL an entry is dropped and the caller enriches synchronously.
+With encode/decode set, entries are held serialized rather than as live objects.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Optional, Any, Tuple
+
+from app_logging import get_logger
+
+log = get_logger(__name__)
+
+FRESH = 'fresh'
+STALE = 'stale'
+
+# Background refreshes run on their own pool so they never compete with live requests
+REFRESH_EXECUTOR = ThreadPoolExecutor(max_workers=2, thread_name_prefix='cache-refresh')
+
+
+class EnrichmentCache:
+    """LRU of enrichment results with soft/hard TTLs and deduplicated background refresh"""
+
+    def __init__(self, max_size: int, soft_ttl: float, hard_ttl: float,
+                 encode: Callable[[Any], bytes] = None, decode: Callable[[bytes], Any] = None):
+        self.max_size = max_size
+        self.encode = encode or (lambda data: data)
+        self.decode = decode or (lambda data: data)
+        self.soft_ttl = soft_ttl
+        self.hard_ttl = max(hard_ttl, soft_ttl)
+        self._entries: 'OrderedDict[str, Dict[str, Any]]' = OrderedDict()
+        self._stored_bytes = 0
+        self._refreshing = set()
+        self._lock = threading.Lock()
+        self.stats = {'fresh_hits': 0, 'stale_hits': 0, 'misses': 0, 'expired': 0,
+                      'refreshes': 0, 'refresh_failures': 0}
+
+    def get(self, key: str) -> Tuple[Optional[Any], Optional[str]]:
+        """(data, FRESH or STALE), or (None, None) on a miss or past the hard TTL"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.stats['misses'] += 1
+                return None, None
+            age = time.time() - entry['stored_at']
+            if age > self.hard_ttl:
+                self._discard(key)
+                self.stats['expired'] += 1
+                return None, None
+            # Move to end (most recently used)
+            self._entries.move_to_end(key)
+            freshness = FRESH if age <= self.soft_ttl else STALE
+            self.stats[f'{freshness}_hits'] += 1
+            data = entry['data']
+        return self.decode(data), freshness
+
+    def put(self, key: str, data: Any) -> None:
+        encoded = self.encode(data)
+        with self._lock:
+            self._discard(key)
+            self._entries[key] = {'data': encoded, 'stored_at': time.time()}
+            self._stored_bytes += self._size(encoded)
+            while len(self._entries) > self.max_size:
+                # Remove oldest item
+                self._discard(next(iter(self._entries)))
+
+    def _discard(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._stored_bytes -= self._size(entry['data'])
+
+    @staticmethod
+    def _size(data: Any) -> int:
+        return len(data) if isinstance(data, (bytes, bytearray)) else 0
+
+    def peek(self, key: str) -> Tuple[Optional[str], Optional[float]]:
+        """(FRESH or STALE, age in seconds) without counting a hit or touching LRU order"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None, None
+            age = time.time() - entry['stored_at']
+            if age > self.hard_ttl:
+                return None, None
+            return (FRESH if age <= self.soft_ttl else STALE), age
+
+    def peek_entry(self, key: str) -> Tuple[Optional[Any], Optional[float]]:
+        """(data, age) for a key regardless of TTL, without counting a hit - used to refresh in place"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None, None
+            data, age = entry['data'], time.time() - entry['stored_at']
+        return self.decode(data), age
+
+    def age(self, key: str) -> Optional[float]:
+        with self._lock:
+            entry = self._entries.get(key)
+            return time.time() - entry['stored_at'] if entry else None
+
+    def refresh(self, key: str, enrich: Callable[[], Optional[Any]]) -> bool:
+        """Re-run `enrich` in the background and store its result; False if one is already running"""
+        with self._lock:
+            if key in self._refreshing:
+                return False
+            self._refreshing.add(key)
+            self.stats['refreshes'] += 1
+        REFRESH_EXECUTOR.submit(self._run_refresh, key, enrich)
+        return True
+
+    def _run_refresh(self, key: str, enrich: Callable[[], Optional[Any]]) -> None:
+        try:
+            data = enrich()
+            if data is not None:
+                self.put(key, data)
+                log.info("Background refresh stored %s", key)
+        except Exception as e:
+            with self._lock:
+                self.stats['refresh_failures'] += 1
+            log.warning("Background refresh of %s failed: %s", key, e)
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Counters and configuration for /api/health"""
+        with self._lock:
+            return {
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'stored_bytes': self._stored_bytes,
+                'soft_ttl_seconds': self.soft_ttl,
+                'hard_ttl_seconds': self.hard_ttl,
+                'refreshing': len(self._refreshing),
+                **self.stats
+            }
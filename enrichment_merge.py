@@ -0,0 +1,214 @@
+"""
+As-completed merging of the enrichment branches in search_company_info
+
+The website, Serper and funding-news branches are consumed in completion
+order under one shared deadline, so a slow branch never holds back results
+that are already in. Each field is resolved by a declared source precedence
+instead of by whichever branch happened to be read last.
+
+Collection stops as soon as the sufficiency policy is met - every required
+field set has a value that is either confident enough or can't be outranked
+by a pending source - and the outstanding branches are cancelled.
+
+Every field also records when it was fetched, so a refresh can re-run only
+the sources feeding fields that went stale (see stale_fields/sources_for).
+"""
+
+import os
+import time
+from concurrent.futures import Future, as_completed, TimeoutError as FutureTimeoutError
+from typing import Callable, Dict, List, Optional, Any, Set, Tuple
+
+from deadline import Deadline
+from app_logging import get_logger
+
+log = get_logger(__name__)
+
+# Highest-precedence source first - the website is authoritative for who runs the
+# company, the dedicated funding search for what they recently raised
+FIELD_PRECEDENCE = {
+    'description': ('website', 'serper'),
+    'founder_name': ('website', 'serper'),
+    'ceo_name': ('website', 'serper'),
+    'recent_news': ('funding', 'serper'),
+    'impressive_metric': ('funding', 'serper')
+}
+
+# Funding news and metrics change week to week; names and descriptions rarely do
+VOLATILE_FIELDS = ('recent_news', 'impressive_metric')
+
+# How far a value from each source can be trusted without corroboration
+SOURCE_CONFIDENCE = {
+    'known_companies': 1.0,
+    'learned': 0.9,
+    'website': 0.8,
+    'funding': 0.7,
+    'serper': 0.6
+}
+KNOWLEDGE_GRAPH_CONFIDENCE = 0.9
+SERIES_FUNDING_CONFIDENCE = 0.8
+
+# Field sets the intro needs - one confident field from each set is enough
+REQUIRED_FIELD_SETS = (
+    ('description',),
+    ('ceo_name', 'founder_name'),
+    ('recent_news', 'impressive_metric')
+)
+SUFFICIENT_CONFIDENCE = float(os.getenv('ENRICHMENT_SUFFICIENT_CONFIDENCE', '0.75'))
+
+# Upper bound on the single wait for all branches, further bounded by the request deadline
+MERGE_TIMEOUT_SECONDS = 10
+
+
+class SufficiencyPolicy:
+    """When enrichment has enough to write the intro"""
+
+    def __init__(self, field_sets: Tuple[Tuple[str, ...], ...] = REQUIRED_FIELD_SETS,
+                 min_confidence: float = SUFFICIENT_CONFIDENCE):
+        self.field_sets = field_sets
+        self.min_confidence = min_confidence
+
+    def met(self, result: Dict[str, Any], confidence: Dict[str, float],
+            is_final: Callable[[str], bool] = None) -> bool:
+        """Each field set has a filled field that is confident enough or already final"""
+        return all(any(result.get(field) and (confidence.get(field, 0) >= self.min_confidence or
+                                              (is_final is not None and is_final(field)))
+                       for field in fields)
+                   for fields in self.field_sets)
+
+
+DEFAULT_POLICY = SufficiencyPolicy()
+
+
+def known_enrichment(fields: Dict[str, Any], source: str = 'known_companies',
+                     fetched_at: Optional[float] = None) -> Dict[str, Any]:
+    """Enrichment summary for data served from the knowledge base"""
+    confidence = {field: SOURCE_CONFIDENCE[source] for field in fields}
+    fetched_at = fetched_at or time.time()
+    return {
+        'field_sources': {field: source for field in fields},
+        'confidence': confidence,
+        'fetched_at': {field: fetched_at for field in fields},
+        'sufficient': DEFAULT_POLICY.met(fields, confidence),
+        'settled': False,
+        'cancelled': []
+    }
+
+
+def stale_fields(fetched_at: Dict[str, float], volatile_ttl: float, stable_ttl: float,
+                 now: Optional[float] = None) -> List[str]:
+    """Fields whose value is older than the TTL for its kind"""
+    now = now or time.time()
+    return [field for field, at in fetched_at.items()
+            if now - at > (volatile_ttl if field in VOLATILE_FIELDS else stable_ttl)]
+
+
+def sources_for(fields: List[str]) -> Set[str]:
+    """Branches that can supply any of the given fields"""
+    return {source for field in fields for source in FIELD_PRECEDENCE.get(field, ())}
+
+
+def is_sufficient(company_data: Dict[str, Any], policy: SufficiencyPolicy = DEFAULT_POLICY) -> bool:
+    """Whether search_company_info's result already satisfies the policy on its own
+
+    Confidence only - a field that is merely settled (no pending branch can outrank
+    it) may still be weak enough that Specter would improve on it.
+    """
+    enrichment = company_data.get('enrichment') or {}
+    return policy.met(company_data, enrichment.get('confidence', {}))
+
+
+class SourceMerger:
+    """Merges per-source results into one record by field precedence"""
+
+    def __init__(self, result: Dict[str, Any],
+                 precedence: Dict[str, Tuple[str, ...]] = FIELD_PRECEDENCE,
+                 policy: SufficiencyPolicy = DEFAULT_POLICY):
+        self.result = result
+        self.precedence = precedence
+        self.policy = policy
+        self.provenance: Dict[str, str] = {}
+        self.confidence: Dict[str, float] = {}
+        self.fetched_at: Dict[str, float] = {}
+        self.pending = set()
+        self.completed: List[str] = []
+        self.cancelled: List[str] = []
+        self.settled = False
+
+    def add(self, source: str, data: Optional[Dict[str, Any]],
+            confidence: Dict[str, float] = None) -> None:
+        """Apply one source's fields wherever it outranks the current value"""
+        self.pending.discard(source)
+        self.completed.append(source)
+        for field, value in (data or {}).items():
+            ranked = self.precedence.get(field, ())
+            if not value or source not in ranked:
+                continue
+            current = self.provenance.get(field)
+            if current is None or ranked.index(source) < ranked.index(current):
+                self.result[field] = value
+                self.provenance[field] = source
+                self.confidence[field] = (confidence or {}).get(field, SOURCE_CONFIDENCE.get(source, 0))
+                self.fetched_at[field] = time.time()
+
+    def fail(self, source: str) -> None:
+        self.pending.discard(source)
+
+    def is_final(self, field: str) -> bool:
+        """No pending source ranks above the one that filled the field"""
+        ranked = self.precedence[field]
+        current = self.provenance.get(field)
+        better = ranked[:ranked.index(current)] if current else ranked
+        return not self.pending.intersection(better)
+
+    def satisfied(self) -> bool:
+        return self.policy.met(self.result, self.confidence, self.is_final)
+
+    def collect(self, futures: Dict[Future, str], deadline: Deadline,
+                normalize: Callable[[str, Any], Tuple[Optional[Dict[str, Any]], Dict[str, float]]] = None) -> Dict[str, Any]:
+        """Merge branch results as they complete; stop at the deadline or once the policy is met
+
+        `deadline` should be a branch of the request deadline - it is cancelled on an early
+        exit so the outstanding branches stop at their next deadline check.
+        """
+        self.pending.update(futures.values())
+        try:
+            for future in as_completed(futures, timeout=deadline.timeout(MERGE_TIMEOUT_SECONDS)):
+                source = futures[future]
+                try:
+                    data = future.result()
+                except Exception as e:
+                    log.warning("%s search failed: %s", source, e)
+                    self.fail(source)
+                    continue
+                data, confidence = normalize(source, data) if normalize else (data, None)
+                self.add(source, data, confidence)
+                log.info("%s search completed", source.capitalize())
+                if self.pending and self.satisfied():
+                    self.settled = True
+                    self.cancel_pending(futures, deadline)
+                    break
+        except FutureTimeoutError:
+            log.warning("%s search timed out", ', '.join(sorted(self.pending)))
+        return self.result
+
+    def cancel_pending(self, futures: Dict[Future, str], deadline: Deadline) -> None:
+        """Stop the branches that can no longer change the outcome"""
+        self.cancelled = sorted(self.pending)
+        log.info("Required fields settled - cancelling %s", ', '.join(self.cancelled))
+        deadline.cancel()
+        for future, source in futures.items():
+            if source in self.pending:
+                future.cancel()
+
+    def summary(self) -> Dict[str, Any]:
+        """Provenance and sufficiency for company_data['enrichment']"""
+        return {
+            'field_sources': dict(self.provenance),
+            'confidence': dict(self.confidence),
+            'fetched_at': dict(self.fetched_at),
+            'sufficient': self.policy.met(self.result, self.confidence),
+            # Collection stopped early because no pending branch could change the outcome
+            'settled': self.settled,
+            'cancelled': self.cancelled
+        }
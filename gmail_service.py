@@ -1,14 +1,22 @@
 import os
 import base64
-import json
+import threading
+import time
+from datetime import datetime, timedelta
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
+import requests
+from google.auth.transport.requests import Request
 from google.oauth2.credentials import Credentials
 from google_auth_oauthlib.flow import Flow
 from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
-import pickle
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, List, Any, Tuple
+
+from credential_store import CredentialStore, CredentialEntry, DEFAULT_USER
+from app_logging import get_logger
+
+log = get_logger(__name__)
 
 # Gmail API scopes
 SCOPES = [
@@ -16,10 +24,32 @@ SCOPES = [
     'https://www.googleapis.com/auth/gmail.readonly'  # Needed to get user profile
 ]
 
+# Refresh the access token this long before it expires, so a send never waits on a refresh
+REFRESH_AHEAD_SECONDS = 300
+# /api/gmail/status is polled by the UI - answer from memory for this long
+AUTH_STATUS_TTL_SECONDS = float(os.getenv('GMAIL_STATUS_TTL_SECONDS', '60'))
+# Messages per batch HTTP request - Gmail throttles batches much larger than this
+BATCH_LIMIT = 50
+
+def oauth_state(nonce: str, state: str = '') -> str:
+    """OAuth state carrying a one-time nonce through the consent screen, plus the client's own state"""
+    return f"{nonce}:{state or ''}"
+
+
+def nonce_from_state(state: str) -> str:
+    return (state or '').split(':', 1)[0]
+
+
 class GmailService:
-    def __init__(self):
-        self.service = None
-        self.credentials = None
+    """Gmail access for every connected user - each call takes the user_id whose mailbox to use"""
+    
+    def __init__(self, store: CredentialStore = None):
+        self.store = store or CredentialStore()
+        # user_id -> (status, when, credentials version it was computed for)
+        self._statuses: Dict[str, Tuple[Dict[str, Any], float, Optional[float]]] = {}
+        # httplib2 connections aren't thread-safe, so each thread gets its own service objects
+        self._local = threading.local()
+        self._refresh_request = Request(requests.Session())
         self.client_config = {
             "web": {
                 "client_id": os.getenv('GOOGLE_CLIENT_ID'),
@@ -34,18 +64,18 @@ class GmailService:
             }
         }
         
-    def get_auth_url(self, state: str = None) -> str:
-        """Generate OAuth2 authorization URL"""
+    def get_auth_url(self, state: str = None, user_id: str = DEFAULT_USER) -> str:
+        """Generate OAuth2 authorization URL for connecting the user's mailbox"""
         redirect_uri = self._get_redirect_uri()
-        print(f"Using redirect URI: {redirect_uri}")
+        log.debug("Using redirect URI: %s", redirect_uri)
         flow = Flow.from_client_config(
             self.client_config,
             scopes=SCOPES,
             redirect_uri=redirect_uri
         )
         
-        if state:
-            flow.state = state
+        # The callback trusts only what the server recorded for this nonce, not anything in the URL
+        flow.state = oauth_state(self.store.create_oauth_state(user_id), state)
             
         auth_url, _ = flow.authorization_url(
             access_type='offline',
@@ -56,7 +86,14 @@ class GmailService:
         return auth_url
     
     def handle_callback(self, code: str, state: str = None) -> Dict[str, Any]:
-        """Handle OAuth2 callback and save credentials"""
+        """Handle OAuth2 callback and save credentials for the user who started the flow"""
+        user_id = self.store.consume_oauth_state(nonce_from_state(state))
+        if user_id is None:
+            return {
+                'success': False,
+                'error': 'Invalid or expired OAuth state',
+                'message': 'Failed to connect to Gmail - please start again'
+            }
         try:
             flow = Flow.from_client_config(
                 self.client_config,
@@ -70,16 +107,16 @@ class GmailService:
             
             # Save credentials
             credentials = flow.credentials
-            self._save_credentials(credentials)
-            
-            # Build service
-            self.service = build('gmail', 'v1', credentials=credentials)
+            self.store.save(user_id, credentials)
             
             # Get user's email
-            profile = self.service.users().getProfile(userId='me').execute()
+            profile = self._get_service(user_id).users().getProfile(userId='me').execute()
+            self.store.save(user_id, credentials, profile.get('emailAddress'))
+            self._statuses.pop(user_id, None)
             
             return {
                 'success': True,
+                'user_id': user_id,
                 'email': profile.get('emailAddress'),
                 'message': 'Successfully connected to Gmail'
             }
@@ -91,43 +128,23 @@ class GmailService:
                 'message': 'Failed to connect to Gmail'
             }
     
-    def send_email(self, to: str, subject: str, body: str, cc: str = None, bcc: str = None) -> Dict[str, Any]:
-        """Send email using Gmail API"""
+    def send_email(self, to: str, subject: str, body: str, cc: str = None, bcc: str = None,
+                   user_id: str = DEFAULT_USER) -> Dict[str, Any]:
+        """Send email from the user's mailbox using Gmail API"""
         try:
-            # Load credentials
-            credentials = self._load_credentials()
-            if not credentials:
+            # Cached credentials and service - the send itself is the only HTTP call
+            service = self._get_service(user_id)
+            if not service:
                 return {
                     'success': False,
                     'error': 'Not authenticated',
-                    'auth_url': self.get_auth_url()
+                    'auth_url': self.get_auth_url(user_id=user_id)
                 }
             
-            # Build service
-            self.service = build('gmail', 'v1', credentials=credentials)
-            
-            # Create message
-            message = MIMEMultipart()
-            message['to'] = to
-            message['subject'] = subject
-            
-            if cc:
-                message['cc'] = cc
-            if bcc:
-                message['bcc'] = bcc
-                
-            # Add body
-            message.attach(MIMEText(body, 'plain'))
-            
-            # Encode message
-            raw_message = base64.urlsafe_b64encode(message.as_bytes()).decode('utf-8')
-            
             # Send message
-            send_message = {
-                'raw': raw_message
-            }
+            send_message = self._build_message(to, subject, body, cc, bcc)
             
-            result = self.service.users().messages().send(
+            result = service.users().messages().send(
                 userId='me',
                 body=send_message
             ).execute()
@@ -139,46 +156,107 @@ class GmailService:
             }
             
         except HttpError as error:
-            print(f'An error occurred: {error}')
+            log.warning("Gmail send failed for %s: %s", user_id, error)
+            if error.resp.status == 401:
+                self._statuses.pop(user_id, None)
             return {
                 'success': False,
                 'error': str(error),
                 'message': 'Failed to send email'
             }
         except Exception as e:
-            print(f'Unexpected error: {e}')
+            log.exception("Unexpected error sending Gmail for %s: %s", user_id, e)
             return {
                 'success': False,
                 'error': str(e),
                 'message': 'Failed to send email'
             }
     
-    def check_auth_status(self) -> Dict[str, Any]:
-        """Check if user is authenticated"""
-        credentials = self._load_credentials()
+    def send_batch(self, messages: List[Dict[str, Any]], user_id: str = DEFAULT_USER) -> List[Dict[str, Any]]:
+        """Send up to BATCH_LIMIT messages ({to, subject, body, cc, bcc}) in one Gmail batch HTTP request
+
+        Returns one result per message, in order, with the HTTP status of failures so callers can retry.
+        """
+        service = self._get_service(user_id)
+        if not service:
+            return [{'success': False, 'error': 'Not authenticated', 'status_code': 401} for _ in messages]
+        
+        results: List[Optional[Dict[str, Any]]] = [None] * len(messages)
+        def on_response(request_id, response, exception):
+            if exception is None:
+                results[int(request_id)] = {'success': True, 'message_id': response['id']}
+            else:
+                status_code = exception.resp.status if isinstance(exception, HttpError) else None
+                results[int(request_id)] = {'success': False, 'error': str(exception), 'status_code': status_code}
         
-        if credentials and credentials.valid:
+        batch = service.new_batch_http_request(callback=on_response)
+        for index, message in enumerate(messages):
+            batch.add(service.users().messages().send(
+                userId='me',
+                body=self._build_message(message['to'], message['subject'], message['body'],
+                                         message.get('cc'), message.get('bcc'), message.get('message_id_header'))
+            ), request_id=str(index))
+        try:
+            batch.execute()
+        except Exception as e:
+            # The batch request itself failed - nothing without a response was sent
+            status_code = e.resp.status if isinstance(e, HttpError) else None
+            log.warning("Gmail batch request failed for %s: %s", user_id, e)
+            if status_code == 401:
+                self._statuses.pop(user_id, None)
+            return [result or {'success': False, 'error': str(e), 'status_code': status_code} for result in results]
+        return [result or {'success': False, 'error': 'No response in batch', 'status_code': None} for result in results]
+    
+    def find_sent(self, message_id_header: str, user_id: str = DEFAULT_USER) -> Optional[str]:
+        """Gmail id of a message already in the user's mailbox with this Message-ID header, if any"""
+        service = self._get_service(user_id)
+        if not service:
+            raise RuntimeError('Not authenticated')
+        result = service.users().messages().list(userId='me', q=f'rfc822msgid:{message_id_header}',
+                                                 includeSpamTrash=True).execute()
+        messages = result.get('messages') or []
+        return messages[0]['id'] if messages else None
+    
+    def check_auth_status(self, user_id: str = DEFAULT_USER) -> Dict[str, Any]:
+        """Check if user is authenticated, answering from memory for AUTH_STATUS_TTL_SECONDS"""
+        entry = self.store.get(user_id)
+        version = entry.updated_at if entry else None
+        cached = self._statuses.get(user_id)
+        # Reused only while nobody connected, refreshed or logged out in the meantime
+        if cached and time.time() - cached[1] < AUTH_STATUS_TTL_SECONDS and cached[2] == version:
+            return cached[0]
+        
+        status = None
+        service = self._get_service(user_id)
+        if service:
             try:
-                service = build('gmail', 'v1', credentials=credentials)
-                profile = service.users().getProfile(userId='me').execute()
-                return {
+                entry = self.store.get(user_id)
+                email = entry.email
+                # The mailbox address doesn't change with a token refresh - look it up once
+                if not email:
+                    email = service.users().getProfile(userId='me').execute().get('emailAddress')
+                    entry = self.store.save(user_id, entry.credentials, email)
+                status = {
                     'authenticated': True,
-                    'email': profile.get('emailAddress')
+                    'email': email
                 }
+                version = entry.updated_at
             except:
                 pass
-                
-        return {
-            'authenticated': False,
-            'auth_url': self.get_auth_url()
-        }
+        
+        if status is None:
+            status = {
+                'authenticated': False,
+                'auth_url': self.get_auth_url(user_id=user_id)
+            }
+        self._statuses[user_id] = (status, time.time(), version)
+        return status
     
-    def logout(self) -> Dict[str, Any]:
-        """Remove stored credentials"""
+    def logout(self, user_id: str = DEFAULT_USER) -> Dict[str, Any]:
+        """Remove the user's stored credentials"""
         try:
-            token_path = 'gmail_token.pickle'
-            if os.path.exists(token_path):
-                os.remove(token_path)
+            self.store.delete(user_id)
+            self._statuses.pop(user_id, None)
             return {
                 'success': True,
                 'message': 'Successfully logged out'
@@ -199,26 +277,72 @@ class GmailService:
             return 'https://hof-vc-outreach.onrender.com/api/gmail/callback'
         return 'http://localhost:5001/api/gmail/callback'
     
-    def _save_credentials(self, credentials: Credentials):
-        """Save credentials to file"""
-        with open('gmail_token.pickle', 'wb') as token:
-            pickle.dump(credentials, token)
+    def _load_credentials(self, user_id: str) -> Optional[Credentials]:
+        """The user's live credentials, refreshed ahead of expiry by one thread at a time"""
+        try:
+            entry = self.store.get(user_id)
+            if entry and entry.credentials.refresh_token and self._needs_refresh(entry.credentials):
+                with self.store.user_lock(user_id):
+                    # Whoever held the lock may have refreshed it already
+                    entry = self.store.get(user_id)
+                    if entry and self._needs_refresh(entry.credentials):
+                        entry = self._refresh(user_id, entry)
+            return entry.credentials if entry else None
+        except Exception as e:
+            log.warning("Error loading credentials for %s: %s", user_id, e)
+            
+        return None
     
-    def _load_credentials(self) -> Optional[Credentials]:
-        """Load credentials from file"""
+    def _refresh(self, user_id: str, entry: CredentialEntry) -> CredentialEntry:
+        credentials = entry.credentials
         try:
-            if os.path.exists('gmail_token.pickle'):
-                with open('gmail_token.pickle', 'rb') as token:
-                    credentials = pickle.load(token)
-                    
-                # Refresh if expired
-                if credentials and credentials.expired and credentials.refresh_token:
-                    from google.auth.transport.requests import Request
-                    credentials.refresh(Request())
-                    self._save_credentials(credentials)
-                    
-                return credentials
+            credentials.refresh(self._refresh_request)
         except Exception as e:
-            print(f"Error loading credentials: {e}")
+            if not credentials.valid:
+                raise
+            log.warning("Early Gmail token refresh for %s failed, retrying on the next call: %s", user_id, e)
+            return entry
+        return self.store.save(user_id, credentials)
+    
+    def _get_service(self, user_id: str = DEFAULT_USER):
+        """This thread's Gmail service for the user, built once from the bundled discovery document"""
+        credentials = self._load_credentials(user_id)
+        if not credentials:
+            return None
+        services = self._local.__dict__.setdefault('services', {})
+        cached = services.get(user_id)
+        if cached is None or cached[0] is not credentials:
+            cached = (credentials, build('gmail', 'v1', credentials=credentials,
+                                         static_discovery=True, cache_discovery=False))
+            services[user_id] = cached
+        return cached[1]
+    
+    @staticmethod
+    def _build_message(to: str, subject: str, body: str, cc: str = None, bcc: str = None,
+                       message_id: str = None) -> Dict[str, str]:
+        """Gmail API message resource for a plain-text email"""
+        message = MIMEMultipart()
+        message['to'] = to
+        message['subject'] = subject
+        if message_id:
+            message['Message-ID'] = message_id
+        
+        if cc:
+            message['cc'] = cc
+        if bcc:
+            message['bcc'] = bcc
             
-        return None 
\ No newline at end of file
+        # Add body
+        message.attach(MIMEText(body, 'plain'))
+        
+        # Encode message
+        return {'raw': base64.urlsafe_b64encode(message.as_bytes()).decode('utf-8')}
+    
+    @staticmethod
+    def _needs_refresh(credentials: Credentials) -> bool:
+        if not credentials.valid:
+            return True
+        # google-auth keeps expiry as naive UTC
+        return credentials.expiry is not None and \
+            credentials.expiry - datetime.utcnow() < timedelta(seconds=REFRESH_AHEAD_SECONDS)
+ 
\ No newline at end of file
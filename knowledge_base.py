@@ -0,0 +1,152 @@
+"""
+Known-company knowledge base - instant enrichment for companies we already know
+
+Curated entries live in known_companies.json; entries learned from validated
+enrichments are appended to learned_companies.json so the curated file is
+never rewritten. Both are indexed once by normalized name, alias and domain
+(see company_names - "Open AI", "openai.com" and "OpenAI Inc." all hit the
+same entry; only curated entries are also reachable without a generic
+descriptor, "Scale" for "Scale AI") and reloaded when either file changes on disk, so edits ship
+without a deploy.
+"""
+
+import os
+import threading
+import time
+from typing import Dict, List, Optional, Any
+
+from company_names import CompanyIndex, normalize_company_name
+from serialization import read_json, write_json
+from app_logging import get_logger
+
+log = get_logger(__name__)
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+KNOWN_COMPANIES_FILE = os.getenv('KNOWN_COMPANIES_FILE', os.path.join(BASE_DIR, 'known_companies.json'))
+LEARNED_COMPANIES_FILE = os.getenv('LEARNED_COMPANIES_FILE', os.path.join(BASE_DIR, 'learned_companies.json'))
+
+# How often lookups check the files for changes
+RELOAD_CHECK_SECONDS = 5
+# Learned news and metrics go stale - older learned entries are ignored
+LEARNED_MAX_AGE_DAYS = int(os.getenv('LEARNED_MAX_AGE_DAYS', '30'))
+KNOWLEDGE_BASE_LEARNING = os.getenv('KNOWLEDGE_BASE_LEARNING', 'true').lower() == 'true'
+
+# Fields an entry can fill in on company_data
+ENTRY_FIELDS = ('ceo_name', 'founder_name', 'description', 'technology_focus', 'recent_news', 'impressive_metric')
+# Fields a learned entry must have to be worth serving instead of a live enrichment
+LEARN_REQUIRED_FIELDS = ('ceo_name', 'description', 'recent_news')
+
+
+class KnowledgeBase:
+    """Curated and learned company entries indexed by normalized name, alias and domain"""
+
+    def __init__(self, known_path: str = KNOWN_COMPANIES_FILE, learned_path: str = LEARNED_COMPANIES_FILE):
+        self.known_path = known_path
+        self.learned_path = learned_path
+        self.names = CompanyIndex()
+        self.learned_names = CompanyIndex(strip_generic=False)
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        self.learned: List[Dict[str, Any]] = []
+        self._mtimes = (None, None)
+        self._checked_at = 0.0
+        self._lock = threading.RLock()
+
+    @classmethod
+    def load(cls, known_path: str = KNOWN_COMPANIES_FILE,
+             learned_path: str = LEARNED_COMPANIES_FILE) -> 'KnowledgeBase':
+        kb = cls(known_path, learned_path)
+        kb.reload()
+        return kb
+
+    @staticmethod
+    def _mtime(path: str) -> Optional[float]:
+        try:
+            return os.path.getmtime(path)
+        except OSError:
+            return None
+
+    @staticmethod
+    def _read(path: str) -> List[Dict[str, Any]]:
+        if not os.path.exists(path):
+            return []
+        try:
+            return read_json(path)
+        except Exception as e:
+            log.warning("Could not load companies from %s: %s", path, e)
+            return []
+
+    def reload(self) -> None:
+        """Rebuild the index from both files"""
+        with self._lock:
+            known = self._read(self.known_path)
+            learned = self._read(self.learned_path)
+            cutoff = time.time() - LEARNED_MAX_AGE_DAYS * 86400
+            names = CompanyIndex()
+            # Learned names weren't reviewed by hand - "Harvey AI" must not answer for "Harvey"
+            learned_names = CompanyIndex(strip_generic=False)
+            entries = {}
+            # Curated entries are registered first so they win any alias collision
+            for entry in known + [e for e in learned if e.get('learned_at', 0) >= cutoff]:
+                company_id = normalize_company_name(entry.get('name'))
+                if not company_id or company_id in entries:
+                    continue
+                entries[company_id] = entry
+                index = learned_names if 'learned_at' in entry else names
+                for alias in [entry.get('name')] + list(entry.get('aliases') or []):
+                    index.register(alias, company_id, entry.get('domain'))
+            self.names = names
+            self.learned_names = learned_names
+            self.entries = entries
+            self.learned = learned
+            self._mtimes = (self._mtime(self.known_path), self._mtime(self.learned_path))
+            self._checked_at = time.time()
+            log.info("Knowledge base: %d curated, %d learned companies", len(known), len(learned))
+
+    def _reload_if_changed(self) -> None:
+        if time.time() - self._checked_at < RELOAD_CHECK_SECONDS:
+            return
+        self._checked_at = time.time()
+        if (self._mtime(self.known_path), self._mtime(self.learned_path)) != self._mtimes:
+            self.reload()
+
+    def lookup(self, company_name: str) -> Optional[Dict[str, Any]]:
+        """Entry for a company name, alias or domain, or None"""
+        self._reload_if_changed()
+        # Exact matches (curated first) beat a fuzzy match in either index
+        company_id = (self.names.lookup(company_name, fuzzy=False) or
+                      self.learned_names.lookup(company_name, fuzzy=False) or
+                      self.names.lookup(company_name) or self.learned_names.lookup(company_name))
+        return self.entries.get(company_id) if company_id else None
+
+    def learn(self, company_name: str, company_data: Dict[str, Any], domain: Optional[str] = None) -> bool:
+        """Record a validated enrichment so later requests for the company are instant"""
+        if not KNOWLEDGE_BASE_LEARNING or not all(company_data.get(f) for f in LEARN_REQUIRED_FIELDS):
+            return False
+        with self._lock:
+            existing = self.lookup(company_name)
+            if existing and 'learned_at' not in existing:
+                # Never shadow a curated entry
+                return False
+            entry = {
+                'name': company_data.get('company_name') or company_name,
+                'aliases': [company_name] if company_name != company_data.get('company_name') else [],
+                'domain': domain,
+                **{f: company_data[f] for f in ENTRY_FIELDS if company_data.get(f)},
+                'learned_at': int(time.time())
+            }
+            company_id = normalize_company_name(entry['name'])
+            learned = [e for e in self.learned if normalize_company_name(e.get('name')) != company_id]
+            learned.append(entry)
+            tmp_path = f"{self.learned_path}.tmp"
+            try:
+                write_json(tmp_path, learned)
+                os.replace(tmp_path, self.learned_path)
+            except OSError as e:
+                log.warning("Could not save learned company %s: %s", company_name, e)
+                return False
+            self.reload()
+        log.info("Learned %s for instant future lookups", entry['name'])
+        return True
+
+
+KNOWLEDGE_BASE = KnowledgeBase.load()
@@ -0,0 +1,163 @@
+"""
+Deterministic local intro generator - fills intro templates from structured facts
+
+Used when OpenAI is unavailable or fails, and as an explicit low-latency
+draft mode for bulk lists. Rendering takes microseconds and never calls out.
+"""
+
+import re
+from typing import Dict, List, Optional, Any, Tuple
+
+MONEY_PATTERN = r'\$\s?([\d.,]+)\s*(trillion|billion|million|thousand|[TBMK])\b'
+UNIT_SUFFIX = {'t': 'T', 'b': 'B', 'm': 'M', 'k': 'K'}
+
+VALUATION_RE = re.compile(r'(?:valued?|valuation)\s*(?:at|of)?\s*(?:an?\s+)?' + MONEY_PATTERN + r'|' +
+                          MONEY_PATTERN + r'\s*valuation', re.IGNORECASE)
+MONEY_RE = re.compile(MONEY_PATTERN, re.IGNORECASE)
+SERIES_RE = re.compile(r'\bSeries\s+([A-Z])\b', re.IGNORECASE)
+PRODUCT_RE = re.compile(r'(?:launch(?:ed|ing|es)?|introduc(?:ed|ing|es)|unveil(?:ed|ing|s)?|releas(?:ed|ing|es))\s+'
+                        r'(?:of\s+)?(?:the\s+|its\s+|their\s+)?([A-Z][\w\-.]*(?:\s+[A-Z0-9][\w\-.]*){0,3})')
+DESCRIPTION_LEAD_RE = re.compile(r'^.*?\b(?:is|are)\s+(?:an?|the)\s+', re.IGNORECASE)
+
+# Most specific first - the first template whose slots are all filled wins
+TEMPLATES: List[Tuple[Tuple[str, ...], str]] = [
+    (('funding', 'series', 'valuation', 'metric'),
+     "Hi {first_name}, congratulations on {company}'s {funding} Series {series} at a {valuation} valuation - "
+     "{metric} is a remarkable foundation to build on. That combination of capital and traction is exactly "
+     "the kind of momentum we love to support."),
+    (('funding', 'series', 'valuation'),
+     "Hi {first_name}, congratulations on {company}'s {funding} Series {series} at a {valuation} valuation! "
+     "That level of investor conviction speaks to the transformative impact you're having."),
+    (('funding', 'series', 'metric'),
+     "Hi {first_name}, congratulations on closing {company}'s {funding} Series {series}. {metric_sentence} "
+     "speaks to the transformative impact you're having."),
+    (('funding', 'valuation', 'metric'),
+     "Hi {first_name}, {company} raising {funding} at a {valuation} valuation while reaching {metric} is "
+     "extraordinary. That pairing of investor conviction and real traction is exactly the kind of momentum "
+     "we love to support."),
+    (('funding', 'valuation'),
+     "Hi {first_name}, {company} raising {funding} at a {valuation} valuation is a strong signal of the "
+     "conviction behind what you're building - exactly the kind of momentum we love to support."),
+    (('funding', 'metric'),
+     "Hi {first_name}, I've been following {company}'s progress - congratulations on the {funding} raise! "
+     "{metric_sentence} is truly impressive and speaks to the impact you're having."),
+    (('product', 'metric'),
+     "Hi {first_name}, the launch of {product} caught my attention, and {metric} shows how well {company} "
+     "is executing. Your approach to {focus} is exactly the kind of innovation we love to support."),
+    (('news', 'metric'),
+     "Hi {first_name}, I've been following {company}'s incredible progress - congratulations on {news}! "
+     "{metric_sentence} is truly impressive and speaks to the transformative impact you're having."),
+    (('funding',),
+     "Hi {first_name}, congratulations on {company}'s {funding} raise! The work you're doing in {focus} "
+     "is truly compelling."),
+    (('news',),
+     "Hi {first_name}, I've been following {company}'s journey and was excited to see you {news}. "
+     "The work you're doing in {focus} is truly compelling."),
+    (('metric',),
+     "Hi {first_name}, I've been tracking {company}'s growth and {metric} really caught my attention. "
+     "Your approach to {focus} is exactly the kind of innovation we love to support."),
+    ((),
+     "Hi {first_name}, I've been following {company} with great interest. Your work in {focus} aligns "
+     "perfectly with the kind of visionary companies we partner with."),
+]
+
+
+def _format_money(amount: str, unit: str) -> str:
+    unit = unit.lower()
+    return f"${amount.rstrip('.,')}{UNIT_SUFFIX.get(unit[0], unit)}"
+
+
+def _money_from_match(match: re.Match) -> Optional[str]:
+    groups = [g for g in match.groups() if g]
+    if len(groups) >= 2:
+        return _format_money(groups[0], groups[1])
+    return None
+
+
+def _clean(value: Any) -> str:
+    return re.sub(r'\s+', ' ', str(value or '')).strip().rstrip('.')
+
+
+def _focus(company_data: Dict[str, Any]) -> str:
+    """Short noun phrase for what the company does"""
+    focus = _clean(company_data.get('technology_focus'))
+    if not focus:
+        description = _clean(company_data.get('description')).split('. ')[0]
+        focus = DESCRIPTION_LEAD_RE.sub('', description)
+    if not focus or len(focus) > 120:
+        return 'building transformative technology'
+    return focus[0].lower() + focus[1:]
+
+
+def extract_facts(company_data: Dict[str, Any]) -> Dict[str, str]:
+    """Pull template slots (funding, series, valuation, metric, product...) out of enriched company data"""
+    ceo_name = company_data.get('ceo_name') or company_data.get('founder_name')
+    news = _clean(company_data.get('recent_news'))
+    metric = _clean(company_data.get('impressive_metric'))
+    text = f"{news}. {metric}"
+
+    facts = {
+        'company': _clean(company_data.get('company_name')),
+        'first_name': ceo_name.split()[0] if ceo_name else '[CEO/Founder Name]',
+        'focus': _focus(company_data)
+    }
+
+    valuation_match = VALUATION_RE.search(text)
+    if valuation_match:
+        facts['valuation'] = _money_from_match(valuation_match)
+
+    # Funding is the first dollar amount in the news that isn't the valuation
+    for match in MONEY_RE.finditer(news):
+        if valuation_match and valuation_match.start() <= match.start() < valuation_match.end():
+            continue
+        facts['funding'] = _format_money(match.group(1), match.group(2))
+        break
+
+    series_match = SERIES_RE.search(text)
+    if series_match:
+        facts['series'] = series_match.group(1).upper()
+
+    product_match = PRODUCT_RE.search(news)
+    if product_match:
+        facts['product'] = product_match.group(1).rstrip('.,')
+
+    # A metric that only restates the valuation adds nothing
+    if metric and 'valuation' in facts and 'valuation' in metric.lower() and len(metric) < 40:
+        metric = ''
+
+    if metric and re.search(r'\d', metric) and len(metric) <= 160:
+        facts['metric'] = metric[0].lower() + metric[1:]
+        facts['metric_sentence'] = metric[0].upper() + metric[1:]
+
+    if news and len(news) <= 160:
+        facts['news'] = news[0].lower() + news[1:]
+
+    return {key: value for key, value in facts.items() if value}
+
+
+def render_intro(company_data: Dict[str, Any]) -> str:
+    """Render the most specific template the available facts can fill"""
+    facts = extract_facts(company_data)
+    for slots, template in TEMPLATES:
+        if all(slot in facts for slot in slots):
+            return template.format(**{'company': 'your company', 'focus': 'your space', **facts})
+    return TEMPLATES[-1][1].format(**facts)
+
+
+def fact_coverage(intro: str, facts: Dict[str, str]) -> float:
+    """Fraction of the key facts (funding, series, valuation, metric, product, name) mentioned in an intro"""
+    keys = [k for k in ('first_name', 'funding', 'series', 'valuation', 'metric', 'product') if k in facts]
+    if not keys:
+        return 0.0
+    lowered = intro.lower()
+    found = 0
+    for key in keys:
+        value = facts[key].lower()
+        if key == 'series':
+            value = f"series {value}"
+        elif key == 'metric':
+            # Metrics get paraphrased - count it if its first number appears
+            numbers = re.findall(r'[\d][\d.,]*', value)
+            value = numbers[0] if numbers else value
+        found += value in lowered
+    return found / len(keys)
@@ -0,0 +1,182 @@
+"""
+Per-stage latency metrics in Prometheus text format
+
+Stages - the domain probe, each search branch, each Specter endpoint, each
+OpenAI call, email generation - are timed with `timed(stage)`. Every timing
+feeds a histogram served on /api/metrics and, inside `collect_timings()`, the
+current request's own timings for the response metadata. Work handed to a
+thread pool keeps reporting to its request when submitted with `submit()`,
+which runs it in a copy of the caller's context. Timed stages are also spans
+of the request's trace (see tracing.py).
+"""
+
+import contextvars
+import threading
+import time
+from bisect import bisect_left
+from concurrent.futures import Executor, Future
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from tracing import Span, span
+
+# Upper bounds in seconds - most stages land between 50ms and the 30s request deadline
+DEFAULT_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 15.0, 20.0, 30.0)
+
+
+def _labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = '') -> str:
+    pairs = [f'{name}="{value}"' for name, value in zip(names, values)] + ([extra] if extra else [])
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+class Counter:
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: str) -> float:
+        return self._values.get(tuple(str(labels[name]) for name in self.labelnames), 0.0)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_labels(self.labelnames, key)} {value:g}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.buckets = tuple(sorted(buckets))
+        # labels -> (per-bucket counts, sum, count)
+        self._series: Dict[Tuple[str, ...], List] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.setdefault(key, [[0] * len(self.buckets), 0.0, 0])
+            if index < len(self.buckets):
+                series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, (counts, total, count) in sorted(self._series.items()):
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets, counts):
+                    cumulative += bucket_count
+                    le = 'le="%g"' % bound
+                    lines.append(f"{self.name}_bucket{_labels(self.labelnames, key, le)} {cumulative}")
+                le = 'le="+Inf"'
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, key, le)} {count}")
+                lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {total:.6f}")
+                lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {count}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        return '\n'.join(line for metric in self.metrics for line in metric.render()) + '\n'
+
+
+REGISTRY = Registry()
+STAGE_SECONDS = REGISTRY.register(Histogram(
+    'outreach_stage_seconds', 'Latency of enrichment and drafting stages', ('stage',)))
+REQUEST_SECONDS = REGISTRY.register(Histogram(
+    'outreach_request_seconds', 'End-to-end generate-outreach latency', ('cache',)))
+CACHE_LOOKUPS = REGISTRY.register(Counter(
+    'outreach_cache_lookups_total', 'Search cache lookups by result', ('result',)))
+UPSTREAM_ERRORS = REGISTRY.register(Counter(
+    'outreach_upstream_errors_total', 'Failed upstream calls by upstream and kind', ('upstream', 'kind')))
+
+_timings: contextvars.ContextVar[Optional[Dict[str, float]]] = contextvars.ContextVar('stage_timings', default=None)
+_timings_lock = threading.Lock()
+
+
+@contextmanager
+def collect_timings() -> Iterator[Dict[str, float]]:
+    """Collect every stage timed in this context (and work submitted from it) into a dict"""
+    timings: Dict[str, float] = {}
+    token = _timings.set(timings)
+    try:
+        yield timings
+    finally:
+        _timings.reset(token)
+
+
+def record(stage: str, seconds: float) -> None:
+    STAGE_SECONDS.observe(seconds, stage=stage)
+    timings = _timings.get()
+    if timings is not None:
+        # Stages that run more than once per request (several probes, a repair call) add up
+        with _timings_lock:
+            timings[stage] = timings.get(stage, 0.0) + seconds
+
+
+def rounded(timings: Dict[str, float]) -> Dict[str, float]:
+    """Collected timings rounded to the millisecond for a response"""
+    return {stage: round(seconds, 3) for stage, seconds in timings.items()}
+
+
+def record_error(upstream: str, kind: str) -> None:
+    UPSTREAM_ERRORS.inc(upstream=upstream, kind=kind)
+
+
+def record_status(upstream: str, status_code: int) -> None:
+    """Count 4xx/5xx responses from an upstream as errors"""
+    if status_code >= 400:
+        record_error(upstream, f"http_{status_code // 100}xx")
+
+
+@contextmanager
+def timed(stage: str, upstream: Optional[str] = None) -> Iterator[Span]:
+    """Time a block as `stage` in its own span; an exception escaping it counts as an error of `upstream`"""
+    start = time.perf_counter()
+    with span(stage) as current:
+        try:
+            yield current
+        except Exception:
+            if upstream:
+                record_error(upstream, 'exception')
+            raise
+        finally:
+            record(stage, time.perf_counter() - start)
+
+
+def submit(executor: Executor, fn: Callable, *args, stage: Optional[str] = None, **kwargs) -> Future:
+    """executor.submit that keeps the caller's timing context, optionally timing the call as `stage`"""
+    context = contextvars.copy_context()
+    if stage is None:
+        return executor.submit(context.run, fn, *args, **kwargs)
+
+    def run():
+        with timed(stage):
+            return fn(*args, **kwargs)
+    return executor.submit(context.run, run)
+
+
+def render() -> str:
+    return REGISTRY.render()
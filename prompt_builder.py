@@ -0,0 +1,162 @@
+"""
+Token-budgeted prompt assembly for the OpenAI calls in app.py
+"""
+
+import re
+import textwrap
+from typing import Dict, List, Optional, Any, Tuple
+
+from app_logging import get_logger
+
+log = get_logger(__name__)
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+DEFAULT_MODEL = "gpt-3.5-turbo"
+
+# Rough chars-per-token ratio for English text, used when tiktoken is unavailable
+CHARS_PER_TOKEN = 4
+
+# Encoders are expensive to construct, so keep one per model
+_ENCODERS: Dict[str, Any] = {}
+
+
+def _get_encoder(model: str):
+    """Return a cached tiktoken encoder for the model, or None if unavailable"""
+    if tiktoken is None:
+        return None
+    if model not in _ENCODERS:
+        try:
+            _ENCODERS[model] = tiktoken.encoding_for_model(model)
+        except Exception as e:
+            # Unknown model or the BPE file could not be loaded (e.g. no network)
+            log.warning("tiktoken unavailable for %s, estimating tokens: %s", model, e)
+            _ENCODERS[model] = None
+    return _ENCODERS[model]
+
+
+def count_tokens(text: str, model: str = DEFAULT_MODEL) -> int:
+    """Count tokens with the local tokenizer, falling back to a character estimate"""
+    if not text:
+        return 0
+    encoder = _get_encoder(model)
+    if encoder:
+        return len(encoder.encode(text))
+    return -(-len(text) // CHARS_PER_TOKEN)
+
+
+def compact(text: str) -> str:
+    """Strip indentation, trailing whitespace, repeated spaces and repeated blank lines"""
+    if not text:
+        return ''
+    lines = []
+    for line in textwrap.dedent(text).splitlines():
+        indent = len(line) - len(line.lstrip(' '))
+        body = re.sub(r'[ \t]+', ' ', line.strip())
+        # Keep a small indent so nested bullets stay readable
+        lines.append((' ' * min(indent, 2) + body) if body else '')
+    compacted = '\n'.join(lines)
+    return re.sub(r'\n{3,}', '\n\n', compacted).strip()
+
+
+def clean_field(value: Any) -> str:
+    """Flatten an interpolated value (scraped text, API fields) to a single line"""
+    if value is None:
+        return ''
+    return re.sub(r'\s+', ' ', str(value)).strip()
+
+
+def truncate_to_tokens(text: str, max_tokens: int, model: str = DEFAULT_MODEL) -> str:
+    """Cap text to max_tokens, cutting at a word boundary"""
+    if not text or max_tokens is None or count_tokens(text, model) <= max_tokens:
+        return text
+    encoder = _get_encoder(model)
+    if encoder:
+        truncated = encoder.decode(encoder.encode(text)[:max_tokens])
+    else:
+        truncated = text[:max_tokens * CHARS_PER_TOKEN]
+    # Drop the partial trailing word
+    if ' ' in truncated:
+        truncated = truncated.rsplit(' ', 1)[0]
+    return truncated.rstrip(' ,;:-') + '…'
+
+
+class PromptBuilder:
+    """Assembles a prompt from compacted sections, each capped to its own token budget"""
+
+    def __init__(self, model: str = DEFAULT_MODEL):
+        self.model = model
+        self.sections: List[str] = []
+
+    def add(self, text: str, max_tokens: Optional[int] = None) -> 'PromptBuilder':
+        """Add a block of text, compacted and optionally capped"""
+        text = compact(text)
+        if max_tokens:
+            text = truncate_to_tokens(text, max_tokens, self.model)
+        if text:
+            self.sections.append(text)
+        return self
+
+    def add_static(self, text: str) -> 'PromptBuilder':
+        """Add a section that was already compacted once at import time"""
+        if text:
+            self.sections.append(text)
+        return self
+
+    def add_fields(self, heading: str, fields: List[Tuple[str, Any, Optional[int]]],
+                   empty: Optional[str] = None) -> 'PromptBuilder':
+        """Add a heading followed by '- label: value' lines; empty values are skipped"""
+        lines = []
+        for label, value, max_tokens in fields:
+            value = clean_field(value)
+            if not value:
+                continue
+            if max_tokens:
+                value = truncate_to_tokens(value, max_tokens, self.model)
+            lines.append(f"- {label}: {value}")
+        if not lines:
+            if empty:
+                self.sections.append(f"{heading}\n- {empty}")
+            return self
+        self.sections.append('\n'.join([heading] + lines))
+        return self
+
+    def build(self) -> str:
+        """Join all sections into the final prompt"""
+        return '\n\n'.join(self.sections)
+
+    def token_count(self) -> int:
+        """Token count of the assembled prompt"""
+        return count_tokens(self.build(), self.model)
+
+
+class TokenUsage:
+    """Per-request prompt/completion token accounting across OpenAI calls"""
+
+    def __init__(self):
+        self.calls: List[Dict[str, Any]] = []
+
+    def record(self, stage: str, response: Any, estimated_prompt_tokens: int) -> None:
+        """Record usage reported by the API, falling back to our local estimate"""
+        usage = {}
+        if response is not None and hasattr(response, 'get'):
+            usage = response.get('usage') or {}
+        self.calls.append({
+            'stage': stage,
+            'prompt_tokens': usage.get('prompt_tokens', estimated_prompt_tokens),
+            'completion_tokens': usage.get('completion_tokens', 0),
+            'estimated_prompt_tokens': estimated_prompt_tokens
+        })
+        log.debug("%s tokens - prompt: %s (estimated %s), completion: %s", stage,
+                  self.calls[-1]['prompt_tokens'], estimated_prompt_tokens, self.calls[-1]['completion_tokens'])
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Summarize usage for the response metadata"""
+        return {
+            'prompt_tokens': sum(c['prompt_tokens'] for c in self.calls),
+            'completion_tokens': sum(c['completion_tokens'] for c in self.calls),
+            'calls': self.calls
+        }
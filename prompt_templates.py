@@ -0,0 +1,263 @@
+"""
+Prompt templates and few-shot example selection for the OpenAI calls in app.py
+
+Static instructions are compacted once at import and always placed first in
+the prompt, so every request shares the same prefix and provider-side prompt
+caching can reuse it. Company-specific data always goes last.
+"""
+
+import hashlib
+import math
+import os
+import re
+from collections import Counter
+from typing import Dict, List, Optional, Any
+
+from prompt_builder import PromptBuilder, compact, clean_field
+from serialization import read_json
+from app_logging import get_logger
+
+log = get_logger(__name__)
+
+TRAINING_EXAMPLES_FILE = os.getenv(
+    'TRAINING_EXAMPLES_FILE',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'training_examples.json')
+)
+
+# Number of few-shot intros included in each email prompt
+FEW_SHOT_EXAMPLES = int(os.getenv('FEW_SHOT_EXAMPLES', '3'))
+
+# Token budgets for interpolated prompt fields - keeps scraped text from bloating prompts
+PROMPT_BUDGETS = {
+    'name': 16,
+    'description': 80,
+    'news': 60,
+    'metric': 40,
+    'executive': 20,
+    'max_executives': 5
+}
+
+STOPWORDS = {
+    'a', 'an', 'and', 'are', 'as', 'at', 'be', 'by', 'for', 'from', 'has', 'in', 'is', 'it', 'its',
+    'of', 'on', 'or', 'that', 'the', 'their', 'to', 'with', 'company', 'platform', 'over', 'into'
+}
+
+ENHANCE_SYSTEM_PROMPT = """You are a world-class venture capital analyst at HOF Capital conducting deep due diligence. Your analysis should be:
+1. HYPER-SPECIFIC: Use exact numbers, dates, names, and details from the provided data
+2. INVESTMENT-FOCUSED: Frame everything through the lens of what makes this company attractive to VCs
+3. ACCURATE: If data conflicts, prioritize Specter (real-time) > web scraping > general knowledge
+4. COMPREHENSIVE: Connect multiple data points to form insights
+5. CURRENT: Focus on 2023-2024 developments, not outdated information"""
+
+ENHANCE_INSTRUCTIONS = compact("""
+    You are researching a company for a personalized HOF Capital outreach email.
+    Your task is to synthesize ALL available data sources below and provide the most accurate, up-to-date information.
+
+    === SYNTHESIS INSTRUCTIONS ===
+    Provide the MOST ACCURATE information by:
+    1. Prioritizing Specter data for executive names (it's most reliable)
+    2. Using Serper search results for recent funding/news (most current)
+    3. Combining all sources for the best company description
+
+    Provide:
+    1. A compelling 1-2 sentence description that captures what makes this company investment-worthy
+    2. The CORRECT CEO/founder name (check Specter executives first, then other sources)
+    3. Their unique technology/market edge
+    4. The MOST RECENT achievement (prioritize 2024, then late 2023) - BE SPECIFIC with amounts/dates
+    5. The MOST IMPRESSIVE metric with actual numbers
+
+    CRITICAL ACCURACY RULES:
+    - If Serper found funding info (e.g., "$2B from Google"), use that EXACT amount
+    - If Specter lists executives, use those EXACT names
+    - For achievements, be HYPER-SPECIFIC: dates, amounts, partner names
+    - NEVER make up information - only use what's provided
+
+    Respond by calling record_company_profile with every field filled in.
+""")
+
+INTRO_SYSTEM_PROMPT = """You are Tahseen Rashid, an investor at HOF Capital, writing the opening of a personalized outreach email. Your writing should be:
+
+1. AUTHENTIC: Sound like a real person who has genuinely researched the company, not a template
+2. SPECIFIC: Reference exact metrics, dates, product names, funding amounts - no generic statements
+3. INSIGHTFUL: Show you understand not just what they do, but why it matters in the market
+4. CONCISE: Maximum 2-3 sentences that pack a punch
+5. CONVERSATIONAL: Professional but warm, like reaching out to a potential partner, not cold sales
+
+Remember: This is just the intro. The HOF Capital context and call-to-action come later."""
+
+INTRO_INSTRUCTIONS = compact("""
+    Write ONLY a brief 2-3 sentence personalized intro paragraph for a VC outreach email from Tahseen Rashid to the founder described at the end.
+
+    REQUIREMENTS:
+    1. Start with the greeting given at the end
+    2. In 2-3 sentences MAX, show genuine interest by:
+       - Mentioning a SPECIFIC recent achievement, news, or impressive metric
+       - Briefly showing you understand what they do
+       - Being authentic and conversational
+    3. DO NOT include any HOF Capital context - that comes later
+    4. DO NOT include call-to-action - that comes later
+    5. Just write the greeting and 2-3 sentences of personalized interest
+
+    CRITICAL ACCURACY RULES:
+    - If recent news mentions a funding round, use the EXACT amount (e.g., "$150M Series D")
+    - Be specific about dates when available (e.g., "your January 2024 announcement")
+    - Name specific products, partnerships, or people when mentioned
+    - Avoid generic phrases like "impressive growth" without specifics
+    - If a metric is provided, use the exact number
+
+    WINNING FORMULAS:
+    - Achievement + Impact: "[Specific achievement] is [adjective]. [How this impacts industry] - that's [connection to HOF thesis]."
+    - Metric + Vision: "[Impressive metric] while [broader mission] is [adjective]. [Strategic insight] [what HOF values]."
+    - Category Creation: "[What they're doing differently] shows you're [creating/redefining category]. [Why this matters] - that's the kind of [transformation] [HOF connection]."
+
+    BAD EXAMPLES (NEVER WRITE LIKE THIS):
+    "Hi [Name], I've been impressed by your company's growth." (Too generic)
+    "Hi [Name], Congrats on your recent funding!" (Not specific enough)
+    "Hi [Name], Your company is doing great things in the industry." (No substance)
+    "Hi [Name], I wanted to reach out about investment opportunities." (Too salesy)
+
+    SPECIFIC PATTERNS TO FOLLOW:
+    - Funding: "your $150M Series D at a $2B valuation"
+    - Metrics: "reaching 10 million active users" or "growing revenue 300% YoY to $50M ARR"
+    - Product launches: "the launch of [Product Name] which already has 100K users"
+    - Partnerships: "your partnership with Microsoft to integrate [specific feature]"
+    - Market position: "becoming the de facto standard for [specific use case]"
+""")
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens for similarity scoring, without stopwords"""
+    return [t for t in re.findall(r'[a-z0-9$]+', (text or '').lower()) if t not in STOPWORDS and len(t) > 1]
+
+
+class ExampleIndex:
+    """Training examples indexed by category with TF-IDF vectors for cheap similarity lookup"""
+
+    def __init__(self, examples: List[Dict[str, Any]]):
+        self.examples = [ex for ex in examples if ex.get('perfect_intro')]
+        self.by_category: Dict[str, List[int]] = {}
+        for i, ex in enumerate(self.examples):
+            self.by_category.setdefault(ex.get('category') or 'Other', []).append(i)
+
+        term_lists = [tokenize(self._example_text(ex)) for ex in self.examples]
+        doc_freq = Counter(term for terms in term_lists for term in set(terms))
+        total = len(self.examples) or 1
+        self.idf = {term: math.log(1 + total / df) for term, df in doc_freq.items()}
+        self.vectors = [self._vectorize(terms) for terms in term_lists]
+
+    @classmethod
+    def load(cls, path: str = TRAINING_EXAMPLES_FILE) -> 'ExampleIndex':
+        """Load training examples from disk, returning an empty index if unavailable"""
+        try:
+            examples = read_json(path)
+            log.info("Loaded %d training examples from %s", len(examples), os.path.basename(path))
+            return cls(examples)
+        except Exception as e:
+            log.warning("Could not load training examples from %s: %s", path, e)
+            return cls([])
+
+    @staticmethod
+    def _example_text(example: Dict[str, Any]) -> str:
+        """Fields that describe what an example is about (not how it is written)"""
+        category = (example.get('category') or '').replace('/', ' ')
+        return ' '.join(filter(None, [example.get('company'), category, example.get('recent_achievement'),
+                                      example.get('key_metric'), example.get('notes')]))
+
+    def _vectorize(self, terms: List[str]) -> Dict[str, float]:
+        counts = Counter(terms)
+        vector = {term: count * self.idf.get(term, 0.0) for term, count in counts.items()}
+        norm = math.sqrt(sum(v * v for v in vector.values())) or 1.0
+        return {term: v / norm for term, v in vector.items()}
+
+    @staticmethod
+    def _cosine(a: Dict[str, float], b: Dict[str, float]) -> float:
+        if len(a) > len(b):
+            a, b = b, a
+        return sum(v * b.get(term, 0.0) for term, v in a.items())
+
+    def select(self, company_data: Dict[str, Any], k: int = FEW_SHOT_EXAMPLES) -> List[Dict[str, Any]]:
+        """Pick the k examples most relevant to a company, preferring its closest category"""
+        if not self.examples or k <= 0:
+            return []
+        query_text = ' '.join(clean_field(company_data.get(field)) for field in
+                              ('company_name', 'description', 'technology_focus', 'recent_news', 'impressive_metric'))
+        query = self._vectorize(tokenize(query_text))
+        scores = [self._cosine(query, vector) for vector in self.vectors]
+
+        if not any(scores):
+            # Nothing in common - fall back to the first (curated) examples
+            return self.examples[:k]
+
+        # Best category is the one whose examples are most similar on average
+        best_category = max(self.by_category, key=lambda c: sum(scores[i] for i in self.by_category[c]) / len(self.by_category[c]))
+        in_category = sorted(self.by_category[best_category], key=lambda i: -scores[i])
+        others = sorted((i for i in range(len(self.examples)) if i not in in_category), key=lambda i: -scores[i])
+        return [self.examples[i] for i in (in_category + others)[:k]]
+
+
+# Loaded once at startup - restart the service after running add_training_example.py
+EXAMPLE_INDEX = ExampleIndex.load()
+
+
+def build_enhance_prompt(company_data: Dict[str, Any], specter_data: Optional[Dict[str, Any]], model: str) -> PromptBuilder:
+    """Static synthesis instructions first, then the data gathered for this company"""
+    builder = PromptBuilder(model)
+    builder.add_static(ENHANCE_INSTRUCTIONS)
+
+    builder.add_fields("1. WEB SCRAPING DATA:", [
+        ('Company', company_data['company_name'], PROMPT_BUDGETS['name']),
+        ('Description', company_data.get('description'), PROMPT_BUDGETS['description']),
+        ('CEO/Founder', company_data.get('ceo_name') or company_data.get('founder_name'), PROMPT_BUDGETS['name'])
+    ])
+
+    # Serper results land in recent_news/impressive_metric, so list them once
+    builder.add_fields("2. SERPER API SEARCH RESULTS:", [
+        ('Recent news/funding', company_data.get('recent_news'), PROMPT_BUDGETS['news']),
+        ('Key metric', company_data.get('impressive_metric'), PROMPT_BUDGETS['metric'])
+    ], empty='No recent funding or metrics found via search')
+
+    specter_fields = []
+    if specter_data and specter_data.get('company_info'):
+        company_info = specter_data['company_info']
+        specter_fields = [
+            ('Official Company Name', company_info.get('organization_name'), PROMPT_BUDGETS['name']),
+            ('Company Description', company_info.get('description'), PROMPT_BUDGETS['description']),
+            ('Company Rank', company_info.get('organization_rank'), None),
+            ('Primary Role', company_info.get('primary_role'), None),
+            ('Domain', specter_data.get('domain'), None)
+        ]
+        for exec in specter_data.get('executives', [])[:PROMPT_BUDGETS['max_executives']]:
+            title = exec.get('title') or 'Unknown Title'
+            if exec.get('is_founder'):
+                title += " (Founder)"
+            specter_fields.append(('Executive', f"{exec.get('full_name', 'Unknown')} - {title}", PROMPT_BUDGETS['executive']))
+        # Cached records keep only the count, not the people list
+        people_count = specter_data.get('people_count') or len(specter_data.get('people') or [])
+        if people_count:
+            specter_fields.append(('Total Employees in Database', people_count, None))
+    builder.add_fields("3. SPECTER DATABASE:", specter_fields, empty='No Specter data available')
+    return builder
+
+
+def build_intro_prompt(company_data: Dict[str, Any], first_name: str, ceo_name: str,
+                       examples: List[Dict[str, Any]], model: str) -> PromptBuilder:
+    """Static writing instructions first, then selected examples and the company details"""
+    builder = PromptBuilder(model)
+    builder.add_static(INTRO_INSTRUCTIONS)
+    if examples:
+        builder.add("PERFECT EXAMPLES FROM TRAINING DATA:\n" +
+                    '\n'.join(f'"{clean_field(ex["perfect_intro"])}"' for ex in examples))
+    builder.add_fields("COMPANY DETAILS:", [
+        ('Company', company_data['company_name'], PROMPT_BUDGETS['name']),
+        ('CEO/Founder', ceo_name, PROMPT_BUDGETS['name']),
+        ('What they do', company_data.get('description'), PROMPT_BUDGETS['description']),
+        ('Recent achievement', company_data.get('recent_news'), PROMPT_BUDGETS['news']),
+        ('Key metric', company_data.get('impressive_metric'), PROMPT_BUDGETS['metric'])
+    ])
+    builder.add(f'Start with "Hi {clean_field(first_name)}," and write ONLY the intro paragraph now:')
+    return builder
+
+
+def prompt_hash(prompt: str) -> str:
+    """Short fingerprint of a built prompt - equal hashes mean the model saw the same inputs"""
+    return hashlib.sha1(prompt.encode('utf-8')).hexdigest()[:16]
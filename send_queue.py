@@ -0,0 +1,403 @@
+"""
+Persistent, scheduled Gmail send queue
+
+Outbound emails - bulk sends and drafts staged for later - are written to a
+SQLite queue (send_queue.db) with a send time, and drained by background
+workers in Gmail batch HTTP requests. Sending is throttled twice: a token
+bucket per user keeps each mailbox inside its Gmail quota, and messages to the same
+recipient domain are spaced out so one company never gets a burst.
+
+Every message has an idempotency key (supplied by the client, or derived from
+recipient, subject and body): queueing the same key twice from one mailbox is
+a no-op, and the key becomes the email's Message-ID, so before re-sending
+anything whose first attempt may have gone through (a 5xx, a dropped
+connection, a worker killed mid-send) the queue asks Gmail whether that
+Message-ID is already in the mailbox. Retries never double-send.
+"""
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from email.utils import parseaddr
+from typing import Callable, Dict, List, Optional, Any
+
+from credential_store import DEFAULT_USER
+from rate_limit import TokenBucket
+from app_logging import get_logger
+
+log = get_logger(__name__)
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+SEND_QUEUE_DB = os.getenv('SEND_QUEUE_DB', os.path.join(BASE_DIR, 'send_queue.db'))
+
+# Gmail allows ~250 quota units/s per user and a send costs 100 - stay under that
+SEND_RATE_PER_SECOND = float(os.getenv('GMAIL_SEND_RATE_PER_SECOND', '2'))
+# Minimum gap between two emails to the same recipient domain
+DOMAIN_SPACING_SECONDS = float(os.getenv('SEND_DOMAIN_SPACING_SECONDS', '60'))
+SEND_WORKERS = int(os.getenv('SEND_QUEUE_WORKERS', '2'))
+SEND_BATCH_SIZE = 20
+MAX_ATTEMPTS = 5
+RETRY_BASE_SECONDS = 5
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+# How long a worker sleeps when nothing is due, unless woken by an enqueue
+POLL_SECONDS = 5
+# Due messages scanned per claim, so domain spacing can skip past a busy domain
+CLAIM_SCAN_FACTOR = 10
+# A message left 'sending' this long belongs to a worker that died - well past the slowest batch send
+SENDING_LEASE_SECONDS = float(os.getenv('SEND_LEASE_SECONDS', '300'))
+MESSAGE_ID_DOMAIN = 'hof-outreach'
+
+QUEUED = 'queued'
+SENDING = 'sending'
+SENT = 'sent'
+FAILED = 'failed'
+CANCELLED = 'cancelled'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS messages (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    batch_id TEXT NOT NULL,
+    recipient TEXT NOT NULL,
+    subject TEXT NOT NULL,
+    body TEXT NOT NULL,
+    cc TEXT,
+    bcc TEXT,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at REAL NOT NULL,
+    message_id TEXT,
+    error TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS domains (
+    domain TEXT PRIMARY KEY,
+    last_sent_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS messages_due ON messages (status, next_attempt_at);
+CREATE INDEX IF NOT EXISTS messages_batch ON messages (batch_id);
+"""
+# Which messages each bulk request asked for - a duplicate belongs to its new batch as well as the one that queued it
+BATCH_SCHEMA = """
+CREATE TABLE batch_messages (
+    batch_id TEXT NOT NULL,
+    message_id INTEGER NOT NULL,
+    PRIMARY KEY (batch_id, message_id)
+);
+INSERT INTO batch_messages (batch_id, message_id) SELECT batch_id, id FROM messages;
+"""
+# Columns added after the first release of the queue - (name, definition)
+MIGRATIONS = [
+    ('send_at', 'REAL'),
+    ('domain', "TEXT NOT NULL DEFAULT ''"),
+    ('idempotency_key', 'TEXT'),
+    ('needs_check', 'INTEGER NOT NULL DEFAULT 0'),
+    ('user_id', f"TEXT NOT NULL DEFAULT '{DEFAULT_USER}'"),
+]
+
+
+def is_retryable(result: Dict[str, Any]) -> bool:
+    """Throttling, server errors and failures with no HTTP status (network) are worth retrying"""
+    return result.get('status_code') is None or result['status_code'] in RETRYABLE_STATUS
+
+
+def may_have_sent(result: Dict[str, Any]) -> bool:
+    """A 5xx or a lost connection doesn't prove Gmail didn't send it; a 429 does"""
+    return result.get('status_code') != 429
+
+
+def parse_send_at(value: Any) -> Optional[float]:
+    """Epoch seconds or an ISO 8601 timestamp (naive means UTC); None means now"""
+    if value is None or value == '':
+        return None
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value)
+    if isinstance(value, str):
+        try:
+            return float(value)
+        except ValueError:
+            parsed = datetime.fromisoformat(value.strip().replace('Z', '+00:00'))
+            if parsed.tzinfo is None:
+                parsed = parsed.replace(tzinfo=timezone.utc)
+            return parsed.timestamp()
+    raise ValueError(f"send_at must be epoch seconds or an ISO 8601 timestamp, got {value!r}")
+
+
+def recipient_domain(recipient: str) -> str:
+    return parseaddr(recipient)[1].rsplit('@', 1)[-1].lower()
+
+
+def idempotency_key(message: Dict[str, Any], user_id: str = DEFAULT_USER) -> str:
+    """The client's key, or a hash of what makes the email the same email from the same mailbox"""
+    if message.get('idempotency_key'):
+        return str(message['idempotency_key'])
+    content = '\x00'.join([user_id] + [str(message.get(field) or '') for field in ('to', 'cc', 'bcc', 'subject', 'body')])
+    return hashlib.sha256(content.encode('utf-8')).hexdigest()[:32]
+
+
+def message_id_header(key: str) -> str:
+    """RFC 822 Message-ID for an idempotency key, used to find the email in Gmail later"""
+    return f"<{hashlib.sha1(key.encode('utf-8')).hexdigest()}@{MESSAGE_ID_DOMAIN}>"
+
+
+class SendQueue:
+    """SQLite-backed queue of scheduled outbound emails, sent in throttled Gmail batches
+
+    send_batch(messages, user_id) and find_sent(message_id_header, user_id) act on the sending user's mailbox.
+    """
+
+    def __init__(self, send_batch: Callable[[List[Dict[str, Any]], str], List[Dict[str, Any]]],
+                 find_sent: Callable[[str, str], Optional[str]] = None,
+                 path: str = SEND_QUEUE_DB, rate_per_second: float = SEND_RATE_PER_SECOND,
+                 batch_size: int = SEND_BATCH_SIZE, domain_spacing: float = DOMAIN_SPACING_SECONDS):
+        self.send_batch = send_batch
+        self.find_sent = find_sent
+        self.path = path
+        self.batch_size = batch_size
+        self.domain_spacing = domain_spacing
+        self.rate_per_second = rate_per_second
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._buckets_lock = threading.Lock()
+        self._wake = threading.Event()
+        # Earliest time something queued can go out - scheduled, backing off or waiting on its domain
+        self._next_due = 0.0
+        self._threads: List[threading.Thread] = []
+        with self._connect() as db:
+            db.executescript(SCHEMA)
+            if not db.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'batch_messages'").fetchone():
+                db.executescript(BATCH_SCHEMA)
+            columns = {row['name'] for row in db.execute("PRAGMA table_info(messages)")}
+            for name, definition in MIGRATIONS:
+                if name not in columns:
+                    db.execute(f"ALTER TABLE messages ADD COLUMN {name} {definition}")
+            # Keys are only unique per mailbox - two users may well pick the same one
+            db.execute("DROP INDEX IF EXISTS messages_idempotency")
+            db.execute("CREATE UNIQUE INDEX IF NOT EXISTS messages_user_idempotency ON messages "
+                       "(user_id, idempotency_key) WHERE idempotency_key IS NOT NULL")
+            self._reclaim_expired(db, time.time())
+
+    @contextmanager
+    def _connect(self, immediate: bool = False):
+        db = sqlite3.connect(self.path, timeout=10)
+        db.row_factory = sqlite3.Row
+        try:
+            with db:
+                if immediate:
+                    # Take the write lock up front so concurrent workers never claim the same rows
+                    db.execute("BEGIN IMMEDIATE")
+                yield db
+        finally:
+            db.close()
+
+    def enqueue(self, messages: List[Dict[str, Any]], user_id: str = DEFAULT_USER) -> Dict[str, Any]:
+        """Queue {to, subject, body, cc, bcc, send_at, idempotency_key} messages from user_id's mailbox
+
+        Returns the batch id to poll (duplicates included) and, per message, its queue id and whether the same
+        idempotency key was already queued (in which case nothing new is sent).
+        """
+        batch_id = uuid.uuid4().hex
+        now = time.time()
+        results = []
+        with self._connect() as db:
+            for m in messages:
+                send_at = parse_send_at(m.get('send_at'))
+                key = idempotency_key(m, user_id)
+                cursor = db.execute(
+                    "INSERT OR IGNORE INTO messages (batch_id, user_id, recipient, subject, body, cc, bcc, status, "
+                    "next_attempt_at, send_at, domain, idempotency_key, created_at, updated_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (batch_id, user_id, m['to'], m['subject'], m['body'], m.get('cc'), m.get('bcc'), QUEUED,
+                     max(send_at or now, now), send_at, recipient_domain(m['to']), key, now, now))
+                row = db.execute("SELECT id, status FROM messages WHERE user_id = ? AND idempotency_key = ?",
+                                 (user_id, key)).fetchone()
+                db.execute("INSERT OR IGNORE INTO batch_messages (batch_id, message_id) VALUES (?, ?)",
+                           (batch_id, row['id']))
+                results.append({'id': row['id'], 'idempotency_key': key, 'status': row['status'],
+                                'duplicate': cursor.rowcount == 0})
+        self._wake.set()
+        queued = sum(1 for result in results if not result['duplicate'])
+        return {'batch_id': batch_id, 'queued': queued, 'duplicates': len(results) - queued, 'messages': results}
+
+    def cancel(self, message_id: int, user_id: str = DEFAULT_USER) -> bool:
+        """Cancel one of the user's messages that hasn't been sent yet"""
+        with self._connect() as db:
+            cursor = db.execute("UPDATE messages SET status = ?, updated_at = ? WHERE id = ? AND user_id = ? AND status = ?",
+                                (CANCELLED, time.time(), message_id, user_id, QUEUED))
+        return cursor.rowcount > 0
+
+    @staticmethod
+    def _reclaim_expired(db: sqlite3.Connection, now: float) -> None:
+        """Requeue messages whose sender died mid-send, checked against the mailbox before they're sent again
+
+        Only rows past the lease - other live workers and processes share the database and may still be sending.
+        """
+        cursor = db.execute("UPDATE messages SET status = ?, needs_check = 1, updated_at = ? "
+                            "WHERE status = ? AND updated_at < ?", (QUEUED, now, SENDING, now - SENDING_LEASE_SECONDS))
+        if cursor.rowcount:
+            log.warning("Requeued %d messages left sending for over %gs", cursor.rowcount, SENDING_LEASE_SECONDS)
+
+    def _claim(self, limit: int) -> List[sqlite3.Row]:
+        """Mark up to `limit` due messages as sending, at most one per domain that isn't in its spacing window"""
+        now = time.time()
+        with self._connect(immediate=True) as db:
+            self._reclaim_expired(db, now)
+            due = db.execute(
+                "SELECT * FROM messages WHERE status = ? AND next_attempt_at <= ? ORDER BY next_attempt_at, id LIMIT ?",
+                (QUEUED, now, limit * CLAIM_SCAN_FACTOR)).fetchall()
+            domains = sorted({row['domain'] for row in due})
+            last_sent = {domain: sent_at for domain, sent_at in db.execute(
+                f"SELECT domain, last_sent_at FROM domains WHERE domain IN ({','.join('?' * len(domains))})", domains)}
+            rows = []
+            next_due = db.execute("SELECT MIN(next_attempt_at) FROM messages WHERE status = ? AND next_attempt_at > ?",
+                                  (QUEUED, now)).fetchone()[0] or float('inf')
+            for row in due:
+                if len(rows) >= limit:
+                    break
+                domain_free_at = last_sent.get(row['domain'], 0) + self.domain_spacing
+                if domain_free_at > now:
+                    next_due = min(next_due, domain_free_at)
+                    continue
+                last_sent[row['domain']] = now
+                rows.append(row)
+            self._next_due = next_due
+            db.executemany("UPDATE messages SET status = ?, updated_at = ? WHERE id = ?",
+                           [(SENDING, now, row['id']) for row in rows])
+            db.executemany("INSERT OR REPLACE INTO domains (domain, last_sent_at) VALUES (?, ?)",
+                           [(row['domain'], now) for row in rows])
+        return rows
+
+    def _already_sent(self, row: sqlite3.Row) -> Optional[Dict[str, Any]]:
+        """A sent result if an earlier attempt of this message reached the mailbox"""
+        if not row['needs_check'] or not row['idempotency_key'] or self.find_sent is None:
+            return None
+        gmail_id = self.find_sent(message_id_header(row['idempotency_key']), row['user_id'])
+        return {'success': True, 'message_id': gmail_id} if gmail_id else None
+
+    def _record(self, rows: List[sqlite3.Row], results: List[Dict[str, Any]]) -> None:
+        now = time.time()
+        updates = []
+        for row, result in zip(rows, results):
+            attempts = row['attempts'] + 1
+            if result.get('success'):
+                updates.append((SENT, attempts, now, result.get('message_id'), None, 0, now, row['id']))
+            elif is_retryable(result) and attempts < MAX_ATTEMPTS:
+                retry_at = now + RETRY_BASE_SECONDS * 2 ** (attempts - 1)
+                updates.append((QUEUED, attempts, retry_at, None, result.get('error'),
+                                int(may_have_sent(result)), now, row['id']))
+            else:
+                updates.append((FAILED, attempts, now, None, result.get('error'), 0, now, row['id']))
+        with self._connect() as db:
+            db.executemany("UPDATE messages SET status = ?, attempts = ?, next_attempt_at = ?, message_id = ?, "
+                           "error = ?, needs_check = ?, updated_at = ? WHERE id = ?", updates)
+
+    def _bucket(self, user_id: str) -> TokenBucket:
+        """Gmail quotas are per mailbox, so each sending user gets their own bucket"""
+        with self._buckets_lock:
+            if user_id not in self._buckets:
+                self._buckets[user_id] = TokenBucket(self.rate_per_second, capacity=self.batch_size)
+            return self._buckets[user_id]
+
+    def run_once(self) -> int:
+        """Send one batch of due messages; returns how many were claimed"""
+        rows = self._claim(self.batch_size)
+        if not rows:
+            return 0
+        by_user: Dict[str, List[sqlite3.Row]] = {}
+        for row in rows:
+            by_user.setdefault(row['user_id'], []).append(row)
+        sent = 0
+        for user_id, user_rows in by_user.items():
+            results = self._send(user_id, user_rows)
+            self._record(user_rows, results)
+            sent += sum(1 for r in results if r.get('success'))
+        log.info("Sent %d/%d queued emails", sent, len(rows))
+        return len(rows)
+
+    def _send(self, user_id: str, rows: List[sqlite3.Row]) -> List[Dict[str, Any]]:
+        """Send one user's claimed messages as a single batch, skipping any already in their mailbox"""
+        results: List[Optional[Dict[str, Any]]] = [None] * len(rows)
+        for index, row in enumerate(rows):
+            try:
+                results[index] = self._already_sent(row)
+            except Exception as e:
+                # Can't tell whether it went out - don't risk a duplicate, try again later
+                results[index] = {'success': False, 'error': f'Could not check for an earlier send: {e}',
+                                  'status_code': None}
+        pending = [index for index, result in enumerate(results) if result is None]
+        if pending:
+            self._bucket(user_id).acquire(len(pending))
+            messages = [{'to': rows[i]['recipient'], 'subject': rows[i]['subject'], 'body': rows[i]['body'],
+                         'cc': rows[i]['cc'], 'bcc': rows[i]['bcc'],
+                         'message_id_header': message_id_header(rows[i]['idempotency_key'])
+                         if rows[i]['idempotency_key'] else None} for i in pending]
+            try:
+                sent = self.send_batch(messages, user_id)
+            except Exception as e:
+                sent = [{'success': False, 'error': str(e), 'status_code': None} for _ in pending]
+            for index, result in zip(pending, sent):
+                results[index] = result
+        return results
+
+    def _loop(self) -> None:
+        while True:
+            try:
+                if self.run_once():
+                    continue
+            except Exception as e:
+                log.exception("Send queue worker error: %s", e)
+            self._wake.wait(min(POLL_SECONDS, max(self._next_due - time.time(), 0.05)))
+            self._wake.clear()
+
+    def start(self, workers: int = SEND_WORKERS) -> None:
+        if not self._threads:
+            for index in range(max(workers, 1)):
+                thread = threading.Thread(target=self._loop, name=f'send-queue-{index}', daemon=True)
+                thread.start()
+                self._threads.append(thread)
+            log.info("Send queue started - %d workers, %g emails/s per user, %gs between emails to one domain",
+                     len(self._threads), self.rate_per_second, self.domain_spacing)
+
+    @staticmethod
+    def _message_status(row: sqlite3.Row) -> Dict[str, Any]:
+        return {
+            'id': row['id'],
+            'user_id': row['user_id'],
+            'to': row['recipient'],
+            'subject': row['subject'],
+            'status': row['status'],
+            'send_at': row['send_at'],
+            'attempts': row['attempts'],
+            'message_id': row['message_id'],
+            'idempotency_key': row['idempotency_key'],
+            'error': row['error']
+        }
+
+    def status(self, batch_id: str, user_id: str = DEFAULT_USER) -> Optional[Dict[str, Any]]:
+        """Per-message status of one of the user's bulk sends, or None for a batch id they don't own"""
+        with self._connect() as db:
+            rows = db.execute("SELECT m.* FROM batch_messages b JOIN messages m ON m.id = b.message_id "
+                              "WHERE b.batch_id = ? AND m.user_id = ? ORDER BY m.id", (batch_id, user_id)).fetchall()
+        if not rows:
+            return None
+        counts = {QUEUED: 0, SENDING: 0, SENT: 0, FAILED: 0, CANCELLED: 0}
+        for row in rows:
+            counts[row['status']] += 1
+        return {
+            'batch_id': batch_id,
+            'total': len(rows),
+            **counts,
+            'done': counts[QUEUED] + counts[SENDING] == 0,
+            'messages': [self._message_status(row) for row in rows]
+        }
+
+    def upcoming(self, user_id: str = DEFAULT_USER, limit: int = 100) -> List[Dict[str, Any]]:
+        """The user's queued messages in send order"""
+        with self._connect() as db:
+            rows = db.execute("SELECT * FROM messages WHERE user_id = ? AND status IN (?, ?) "
+                              "ORDER BY next_attempt_at, id LIMIT ?", (user_id, QUEUED, SENDING, limit)).fetchall()
+        return [self._message_status(row) for row in rows]
@@ -0,0 +1,65 @@
+"""
+JSON serialization backed by orjson
+
+API responses (through Flask's JSON provider), the knowledge base and training
+example files, cached records and batch result files all go through here.
+orjson serializes the nested outreach payloads several times faster than the
+stdlib json module (see benchmark_serialization.py); without it everything
+falls back to json with the same output.
+"""
+
+import json
+from typing import Any, Callable, Optional
+
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def dumps(obj: Any, indent: bool = False, default: Optional[Callable[[Any], Any]] = None) -> bytes:
+    """UTF-8 JSON bytes, compact or indented by two spaces"""
+    if orjson is not None:
+        option = orjson.OPT_NON_STR_KEYS | (orjson.OPT_INDENT_2 if indent else 0)
+        return orjson.dumps(obj, default=default, option=option)
+    return json.dumps(obj, indent=2 if indent else None, separators=None if indent else (',', ':'),
+                      ensure_ascii=False, default=default).encode('utf-8')
+
+
+def loads(data: Any) -> Any:
+    """Parse JSON from bytes or str"""
+    return orjson.loads(data) if orjson is not None else json.loads(data)
+
+
+def read_json(path: str) -> Any:
+    with open(path, 'rb') as f:
+        return loads(f.read())
+
+
+def write_json(path: str, obj: Any, indent: bool = True, default: Optional[Callable[[Any], Any]] = None) -> None:
+    with open(path, 'wb') as f:
+        f.write(dumps(obj, indent=indent, default=default))
+
+
+class JSONProvider(DefaultJSONProvider):
+    """Flask JSON provider that serializes jsonify() responses with orjson"""
+
+    # Keep keys in insertion order - success/data/metadata read better than alphabetical
+    sort_keys = False
+
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        if orjson is None or kwargs:
+            kwargs.setdefault('sort_keys', self.sort_keys)
+            return super().dumps(obj, **kwargs)
+        return dumps(obj, default=self.default).decode('utf-8')
+
+    def loads(self, s: Any, **kwargs: Any) -> Any:
+        return super().loads(s, **kwargs) if orjson is None or kwargs else loads(s)
+
+    def response(self, *args: Any, **kwargs: Any):
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = (self.compact is None and self._app.debug) or self.compact is False
+        return self._app.response_class(dumps(obj, indent=indent, default=self.default) + b'\n',
+                                        mimetype=self.mimetype)
@@ -0,0 +1,108 @@
+"""
+Speculative email drafting - start the intro while enrichment is still running
+
+As soon as the first enrichment pass has a company name, a CEO and one
+achievement, the intro is generated on a snapshot of that data in the
+background. When enrichment finishes, the draft is kept unless the facts it
+was written from (first name, funding, series, valuation, headline metric)
+materially changed, in which case it is regenerated from the final data.
+"""
+
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Optional, Any, Tuple
+
+from local_intro import extract_facts
+from metrics import submit
+from app_logging import get_logger
+
+log = get_logger(__name__)
+
+# Separate pool so speculative drafts never wait behind enrichment work
+SPECULATION_EXECUTOR = ThreadPoolExecutor(max_workers=4, thread_name_prefix='speculation')
+
+SPECULATION_STATS = {'started': 0, 'kept': 0, 'regenerated': 0, 'failed': 0}
+_stats_lock = threading.Lock()
+
+MATERIAL_FACTS = ('first_name', 'funding', 'series', 'valuation', 'metric_number')
+
+
+def _count(outcome: str) -> None:
+    with _stats_lock:
+        SPECULATION_STATS[outcome] += 1
+
+
+def speculation_stats() -> Dict[str, Any]:
+    """Counters plus the share of speculative drafts that were kept"""
+    with _stats_lock:
+        stats = dict(SPECULATION_STATS)
+    resolved = stats['kept'] + stats['regenerated'] + stats['failed']
+    stats['keep_rate'] = round(stats['kept'] / resolved, 3) if resolved else None
+    return stats
+
+
+def has_minimal_facts(company_data: Dict[str, Any]) -> bool:
+    """Company name, a CEO/founder and at least one achievement"""
+    return bool(company_data.get('company_name') and
+                (company_data.get('ceo_name') or company_data.get('founder_name')) and
+                (company_data.get('recent_news') or company_data.get('impressive_metric')))
+
+
+def material_facts(company_data: Dict[str, Any]) -> Dict[str, Optional[str]]:
+    """The facts an intro is built around - if these hold, the draft still holds"""
+    facts = extract_facts(company_data)
+    numbers = re.findall(r'\d[\d.,]*', facts.get('metric', ''))
+    facts['metric_number'] = numbers[0] if numbers else None
+    return {key: (facts.get(key) or '').lower() or None for key in MATERIAL_FACTS}
+
+
+class SpeculativeDraft:
+    """An intro generated early from a snapshot of partially enriched data"""
+
+    def __init__(self, snapshot: Dict[str, Any], generate: Callable[[Dict[str, Any]], str],
+                 draft: Optional[Callable[[Dict[str, Any]], str]] = None):
+        self.generate = generate
+        self.facts = material_facts(snapshot)
+        # Keeps the request's timing context, so the speculative intro shows up in its timings
+        self.future = submit(SPECULATION_EXECUTOR, draft or generate, snapshot, stage='email_generation.speculative')
+        _count('started')
+
+    @classmethod
+    def start(cls, company_data: Dict[str, Any], generate: Callable[[Dict[str, Any]], str],
+              draft: Optional[Callable[[Dict[str, Any]], str]] = None) -> Optional['SpeculativeDraft']:
+        """Start drafting if the minimal fact set is available, otherwise return None
+
+        `draft` writes the speculative intro and should raise rather than fall back, so a
+        failed draft is regenerated with `generate` instead of being kept.
+        """
+        if not has_minimal_facts(company_data):
+            return None
+        log.info("Speculatively drafting intro for %s", company_data['company_name'])
+        return cls(dict(company_data), generate, draft)
+
+    def changed_facts(self, final_data: Dict[str, Any]) -> Dict[str, Tuple[Optional[str], Optional[str]]]:
+        """Material facts that differ between the snapshot and the final data"""
+        final_facts = material_facts(final_data)
+        return {key: (self.facts[key], final_facts[key]) for key in MATERIAL_FACTS
+                if self.facts[key] != final_facts[key]}
+
+    def resolve(self, final_data: Dict[str, Any], timeout: Optional[float] = None) -> Tuple[str, Dict[str, Any]]:
+        """Return the speculative draft if still valid, otherwise regenerate from the final data"""
+        changed = self.changed_facts(final_data)
+        if changed:
+            self.future.cancel()
+            _count('regenerated')
+            log.info("Speculative draft discarded - facts changed: %s", ', '.join(changed))
+            return self.generate(final_data), {'kept': False, 'changed_facts': sorted(changed)}
+
+        try:
+            email = self.future.result(timeout=timeout)
+        except Exception as e:
+            _count('failed')
+            log.warning("Speculative draft failed, regenerating: %s", e)
+            return self.generate(final_data), {'kept': False, 'error': str(e)}
+
+        _count('kept')
+        log.info("Speculative draft kept")
+        return email, {'kept': True}
@@ -1,11 +1,35 @@
 #!/usr/bin/env python3
-"""Test multiple companies to ensure stability and measure performance"""
+"""Test multiple companies to ensure stability and measure performance
 
+With --load, runs a load test instead: open-loop arrival rates (--rates) or a
+closed-loop concurrency sweep (--concurrency), against never-seen (cold) and
+pre-warmed (warm) companies, checked against a p95/error-rate SLO. Results go
+to load_results_<timestamp>.json and .csv, tagged with the git commit. Cold
+companies are made-up names, so point the service at upstream_simulator.py.
+
+Usage:
+  python test_companies.py                                  # Stability check of TEST_COMPANIES
+  python test_companies.py --load --concurrency 1,4,8,16 --duration 60
+  python test_companies.py --load --rates 0.5,1,2,4 --scenarios cold --slo-p95 15
+  python test_companies.py --load --rates 1,2 --compare load_results_20250701_101500.json
+"""
+
+import argparse
+import csv
+import random
 import requests
 import json
+import statistics
+import subprocess
+import sys
+import threading
 import time
 import concurrent.futures
-from typing import List, Dict, Tuple
+from datetime import datetime
+from typing import List, Dict, Tuple, Optional
+
+from company_names import dedupe_company_names
+from serialization import read_json, write_json
 
 # Configuration
 LOCAL_URL = "http://localhost:5001/api/generate-outreach"
@@ -36,9 +60,10 @@ TEST_COMPANIES = [
     "Replit"
 ]
 
-def test_company(company: str, use_deployed: bool = False) -> Tuple[str, Dict, float]:
+def test_company(company: str, use_deployed: bool = False, url: Optional[str] = None,
+                 draft_mode: Optional[str] = None) -> Tuple[str, Dict, float]:
     """Test a single company and return results"""
-    url = DEPLOYED_URL if use_deployed else LOCAL_URL
+    url = url or (DEPLOYED_URL if use_deployed else LOCAL_URL)
     headers = {
         "Content-Type": "application/json",
         "X-API-Key": API_KEY
@@ -50,7 +75,7 @@ def test_company(company: str, use_deployed: bool = False) -> Tuple[str, Dict, f
         response = requests.post(
             url,
             headers=headers,
-            json={"company_name": company},
+            json={"company_name": company, **({"draft_mode": draft_mode} if draft_mode else {})},
             timeout=35  # 35s timeout to catch 30s timeouts
         )
         
@@ -64,6 +89,7 @@ def test_company(company: str, use_deployed: bool = False) -> Tuple[str, Dict, f
                 "email": data.get("data", {}).get("ceo_email"),
                 "has_news": bool(data.get("data", {}).get("company_details", {}).get("recent_news")),
                 "processing_time": data.get("metadata", {}).get("processing_time_seconds", elapsed),
+                "cache_hit": data.get("metadata", {}).get("cache_hit", False),
                 "status_code": response.status_code
             }, elapsed)
         else:
@@ -92,6 +118,8 @@ def test_company(company: str, use_deployed: bool = False) -> Tuple[str, Dict, f
 
 def test_all_companies(companies: List[str], use_deployed: bool = False, parallel: bool = False):
     """Test all companies and print results"""
+    # "Scale AI" and "scale.ai" are one company - testing both would just hit the cache
+    companies = dedupe_company_names(companies)
     print(f"\n{'='*60}")
     print(f"Testing {len(companies)} companies on {'DEPLOYED' if use_deployed else 'LOCAL'} server")
     print(f"Parallel: {parallel}")
@@ -157,7 +185,249 @@ def test_all_companies(companies: List[str], use_deployed: bool = False, paralle
         for company, _, elapsed in sorted(slow_requests, key=lambda x: -x[2]):
             print(f"  - {company}: {elapsed:.2f}s")
 
+# Load-test mode - meant to run against a service started with upstream_simulator.py's environment
+DEFAULT_SLO_P95_SECONDS = 20.0
+DEFAULT_SLO_ERROR_RATE = 0.01
+SYLLABLES = ['ka', 'zen', 'tri', 'vo', 'lux', 'mar', 'qui', 'sol', 'dra', 'nex', 'pel', 'ori', 'bex', 'tav',
+             'run', 'ilo', 'gar', 'fyn', 'hal', 'mos', 'cur', 'ved', 'ost', 'yam', 'pra', 'lin', 'dor', 'wex']
+
+
+class CompanyNames:
+    """Thread-safe stream of company names - a fixed pool cycled (warm) or never-seen names (cold)"""
+
+    def __init__(self, pool: Optional[List[str]] = None):
+        self.pool = pool
+        self.position = 0
+        self._random = random.Random()
+        self._lock = threading.Lock()
+
+    def unique(self) -> str:
+        # Random syllables rather than "Loadtest 17"/"Loadtest 18", which the fuzzy name matcher would merge
+        words = [''.join(self._random.choice(SYLLABLES) for _ in range(self._random.randint(2, 3))) for _ in range(2)]
+        return ' '.join(word.title() for word in words)
+
+    def next(self) -> str:
+        with self._lock:
+            if self.pool:
+                self.position += 1
+                return self.pool[(self.position - 1) % len(self.pool)]
+            return self.unique()
+
+
+def percentiles(values: List[float]) -> Dict[str, Optional[float]]:
+    if not values:
+        return {'p50': None, 'p95': None, 'p99': None, 'max': None}
+    if len(values) == 1:
+        return {'p50': values[0], 'p95': values[0], 'p99': values[0], 'max': values[0]}
+    cuts = statistics.quantiles(values, n=100, method='inclusive')
+    return {'p50': cuts[49], 'p95': cuts[94], 'p99': cuts[98], 'max': max(values)}
+
+
+def load_request(url: str, company: str, draft_mode: Optional[str], scheduled: float) -> Dict:
+    """One request; latency counts from when it was due, so a backed-up client can't hide server slowness"""
+    started = time.perf_counter()
+    _, result, _ = test_company(company, url=url, draft_mode=draft_mode)
+    result.update(company=company, latency=time.perf_counter() - scheduled, lag=started - scheduled)
+    return result
+
+
+def run_open_loop(url: str, names: CompanyNames, rate: float, duration: float, draft_mode: Optional[str],
+                  max_in_flight: int, poisson: bool, seed: Optional[int]) -> Tuple[List[Dict], float]:
+    """Send `rate` requests per second for `duration` seconds regardless of how fast they complete"""
+    arrivals = random.Random(seed)
+    futures = []
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_in_flight) as executor:
+        start = time.perf_counter()
+        offset = 0.0
+        while True:
+            offset += arrivals.expovariate(rate) if poisson else 1 / rate
+            if offset >= duration:
+                break
+            delay = start + offset - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            futures.append(executor.submit(load_request, url, names.next(), draft_mode, start + offset))
+        results = [future.result() for future in futures]
+    return results, time.perf_counter() - start
+
+
+def run_closed_loop(url: str, names: CompanyNames, concurrency: int, duration: float,
+                    draft_mode: Optional[str]) -> Tuple[List[Dict], float]:
+    """`concurrency` clients sending back-to-back requests for `duration` seconds"""
+    start = time.perf_counter()
+    stop_at = start + duration
+
+    def client() -> List[Dict]:
+        results = []
+        while time.perf_counter() < stop_at:
+            results.append(load_request(url, names.next(), draft_mode, time.perf_counter()))
+        return results
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = [r for batch in executor.map(lambda _: client(), range(concurrency)) for r in batch]
+    return results, time.perf_counter() - start
+
+
+def summarize(results: List[Dict], wall: float, slo_p95: float, slo_error_rate: float) -> Dict:
+    """Latency percentiles, throughput, error breakdown and SLO verdict for one level"""
+    successes = [r for r in results if r['success']]
+    errors: Dict[str, int] = {}
+    for r in results:
+        if not r['success']:
+            kind = r['error'] if r['error'] == 'Timeout' or 'status_code' in r else 'Exception'
+            errors[kind] = errors.get(kind, 0) + 1
+    latency = percentiles([r['latency'] for r in successes])
+    error_rate = (len(results) - len(successes)) / len(results) if results else 0.0
+    return {
+        'requests': len(results),
+        'successes': len(successes),
+        'error_rate': round(error_rate, 4),
+        'errors': errors,
+        'throughput_rps': round(len(successes) / wall, 3) if wall else 0.0,
+        'wall_seconds': round(wall, 2),
+        'latency_seconds': {key: round(value, 3) if value is not None else None for key, value in latency.items()},
+        'server_p50_seconds': percentiles([r['processing_time'] for r in successes])['p50'],
+        'cache_hit_rate': round(sum(1 for r in successes if r.get('cache_hit')) / len(successes), 3) if successes else 0.0,
+        'max_client_lag_seconds': round(max((r['lag'] for r in results), default=0.0), 3),
+        'slo_pass': bool(successes) and latency['p95'] <= slo_p95 and error_rate <= slo_error_rate,
+    }
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def warm_cache(url: str, companies: List[str], draft_mode: Optional[str]):
+    """Request each pool company once so the measured requests are cache hits"""
+    print(f"Warming the cache with {len(companies)} companies...", flush=True)
+    with concurrent.futures.ThreadPoolExecutor(max_workers=4) as executor:
+        results = list(executor.map(lambda company: test_company(company, url=url, draft_mode=draft_mode), companies))
+    failed = [company for company, data, _ in results if not data['success']]
+    if failed:
+        print(f"⚠️  Warm-up failed for: {', '.join(failed)}")
+
+
+def print_level(level: Dict):
+    latency = level['latency_seconds']
+    fmt = lambda value: f"{value:.2f}s" if value is not None else '-'
+    print(f"  {level['scenario']:<5} {level['mode']:<6} {level['level']:>6g}  {level['requests']:>5} req  "
+          f"{level['throughput_rps']:>6.2f} ok/s  p50 {fmt(latency['p50'])}  p95 {fmt(latency['p95'])}  "
+          f"p99 {fmt(latency['p99'])}  errors {level['error_rate']:.1%}  cache hits {level['cache_hit_rate']:.0%}  "
+          f"{'✓' if level['slo_pass'] else '✗ SLO'}")
+
+
+def compare_with(previous_path: str, levels: List[Dict]):
+    """Print throughput and p95 changes against a previous load_results_*.json"""
+    report = read_json(previous_path)
+    previous = {(l['scenario'], l['mode'], l['level']): l for l in report['levels']}
+    print(f"\n📊 Compared with {previous_path} ({report.get('commit') or 'unknown commit'}):")
+    for level in levels:
+        before = previous.get((level['scenario'], level['mode'], level['level']))
+        if not before:
+            continue
+        p95, p95_before = level['latency_seconds']['p95'], before['latency_seconds']['p95']
+        p95_change = f"{p95 - p95_before:+.2f}s" if p95 is not None and p95_before is not None else '-'
+        print(f"  {level['scenario']:<5} {level['mode']:<6} {level['level']:>6g}  "
+              f"throughput {level['throughput_rps'] - before['throughput_rps']:+.2f} ok/s  p95 {p95_change}")
+
+
+def run_load_test(args) -> Dict:
+    url = args.url or (DEPLOYED_URL if args.deployed else LOCAL_URL)
+    mode, levels = ('open', args.rates) if args.rates else ('closed', args.concurrency)
+    slo = {'p95_seconds': args.slo_p95, 'error_rate': args.slo_error_rate}
+    print(f"\n{'='*60}")
+    print(f"Load test against {url} - {mode}-loop {', '.join(f'{l:g}' for l in levels)}"
+          f"{' req/s' if mode == 'open' else ' clients'}, {args.duration:g}s per level")
+    print(f"SLO: p95 <= {args.slo_p95:g}s, errors <= {args.slo_error_rate:.1%}")
+    print(f"{'='*60}\n")
+
+    results = []
+    for scenario in args.scenarios:
+        if scenario == 'warm':
+            pool = dedupe_company_names(args.companies) if args.companies else \
+                [CompanyNames().unique() for _ in range(args.warm_pool)]
+            warm_cache(url, pool, args.draft_mode)
+            names = CompanyNames(pool)
+        else:
+            names = CompanyNames()
+        for level in levels:
+            if mode == 'open':
+                samples, wall = run_open_loop(url, names, level, args.duration, args.draft_mode,
+                                              args.max_in_flight, args.arrivals == 'poisson', args.seed)
+            else:
+                samples, wall = run_closed_loop(url, names, int(level), args.duration, args.draft_mode)
+            summary = {'scenario': scenario, 'mode': mode, 'level': level,
+                       **summarize(samples, wall, args.slo_p95, args.slo_error_rate)}
+            results.append(summary)
+            print_level(summary)
+
+    sustained = {scenario: max((l['throughput_rps'] for l in results if l['scenario'] == scenario and l['slo_pass']),
+                               default=0.0) for scenario in args.scenarios}
+    print("\n✅ Highest throughput within SLO: " +
+          ', '.join(f"{scenario} {rps:.2f} req/s" for scenario, rps in sustained.items()))
+
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    report = {'commit': git_commit(), 'generated_at': timestamp, 'url': url, 'mode': mode,
+              'duration_seconds': args.duration, 'draft_mode': args.draft_mode, 'arrivals': args.arrivals,
+              'slo': slo, 'sustained_rps': sustained, 'levels': results}
+    filename = f"load_results_{timestamp}"
+    write_json(f"{filename}.json", report)
+    with open(f"{filename}.csv", 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['commit', 'scenario', 'mode', 'level', 'requests', 'successes', 'error_rate',
+                         'throughput_rps', 'p50_s', 'p95_s', 'p99_s', 'max_s', 'cache_hit_rate', 'slo_pass'])
+        for l in results:
+            latency = l['latency_seconds']
+            writer.writerow([report['commit'], l['scenario'], l['mode'], l['level'], l['requests'], l['successes'],
+                             l['error_rate'], l['throughput_rps'], latency['p50'], latency['p95'], latency['p99'],
+                             latency['max'], l['cache_hit_rate'], l['slo_pass']])
+    print(f"Results saved to: {filename}.json, {filename}.csv")
+
+    if args.compare:
+        compare_with(args.compare, results)
+    return report
+
+
+def parse_args(argv=None):
+    numbers = lambda value: [float(n) for n in value.split(',')]
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0].strip())
+    parser.add_argument('--load', action='store_true', help='run a load test instead of the company checks')
+    parser.add_argument('--url', help=f'endpoint to load (default {LOCAL_URL})')
+    parser.add_argument('--deployed', action='store_true', help=f'load {DEPLOYED_URL}')
+    parser.add_argument('--rates', type=numbers, help='open-loop arrival rates in req/s, e.g. 0.5,1,2,4')
+    parser.add_argument('--concurrency', type=numbers, default=[1, 2, 4, 8],
+                        help='closed-loop client counts when --rates is not given (default 1,2,4,8)')
+    parser.add_argument('--duration', type=float, default=60, help='seconds per level (default 60)')
+    parser.add_argument('--scenarios', type=lambda value: value.split(','), default=['cold', 'warm'],
+                        help='cold (never-seen companies), warm (a pre-warmed pool) or both (default cold,warm)')
+    parser.add_argument('--warm-pool', type=int, default=20, help='companies in the warm pool (default 20)')
+    parser.add_argument('--companies', type=lambda value: [c.strip() for c in value.split(',')],
+                        help='comma-separated warm pool instead of generated names')
+    parser.add_argument('--arrivals', choices=('poisson', 'uniform'), default='poisson')
+    parser.add_argument('--max-in-flight', type=int, default=256, help='open-loop client thread cap')
+    parser.add_argument('--draft-mode', choices=('llm', 'local'))
+    parser.add_argument('--slo-p95', type=float, default=DEFAULT_SLO_P95_SECONDS)
+    parser.add_argument('--slo-error-rate', type=float, default=DEFAULT_SLO_ERROR_RATE)
+    parser.add_argument('--seed', type=int, default=None, help='seed for open-loop arrival times')
+    parser.add_argument('--compare', metavar='LOAD_RESULTS_JSON', help='print changes against an earlier run')
+    args = parser.parse_args(argv)
+    for scenario in args.scenarios:
+        if scenario not in ('cold', 'warm'):
+            parser.error(f"unknown scenario {scenario!r}")
+    return args
+
+
 if __name__ == "__main__":
+    args = parse_args()
+    if args.load:
+        report = run_load_test(args)
+        # Non-zero when any level missed the SLO, so CI can gate on it
+        sys.exit(0 if all(level['slo_pass'] for level in report['levels']) else 1)
+
     # Test locally first
     print("\n🏠 LOCAL TESTING")
     test_all_companies(TEST_COMPANIES[:5], use_deployed=False, parallel=False)
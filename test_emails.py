@@ -5,10 +5,10 @@ This script helps you test and refine the email generation quality
 """
 
 import os
-import json
 import time
 from datetime import datetime
 from app import CompanyDataScraper, generate_email
+from serialization import write_json
 
 # Test companies with known good data
 TEST_COMPANIES = [
@@ -190,8 +190,7 @@ def run_full_test_suite():
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
     filename = f"test_results_{timestamp}.json"
     
-    with open(filename, 'w') as f:
-        json.dump(results, f, indent=2, default=str)
+    write_json(filename, results, default=str)
     
     print(f"\nResults saved to: {filename}")
     
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Print a request trace from traces.jsonl as a waterfall
+
+Spans are nested under their parents and drawn on a shared time axis, so
+the stages on the critical path - the ones the root span waited for - stand
+out from the work that overlapped them.
+
+Usage:
+  python trace_view.py                 # Most recent trace
+  python trace_view.py <request_id>    # A specific request (X-Request-Id / metadata.request_id)
+  python trace_view.py --list          # Recent traces
+"""
+
+import sys
+from collections import defaultdict
+
+from serialization import loads
+from tracing import TRACE_FILE
+
+BAR_WIDTH = 50
+
+
+def load_spans(path: str = TRACE_FILE):
+    spans = []
+    with open(path, 'rb') as f:
+        for line in f:
+            if line.strip():
+                spans.append(loads(line))
+    return spans
+
+
+def roots(spans):
+    """Root spans, oldest first"""
+    return sorted((s for s in spans if not s['parent_id']), key=lambda s: s['start'])
+
+
+def print_waterfall(spans, trace_id: str):
+    trace_spans = [s for s in spans if s['trace_id'] == trace_id]
+    if not trace_spans:
+        print(f"No spans for trace {trace_id}")
+        return
+    children = defaultdict(list)
+    for s in trace_spans:
+        children[s['parent_id']].append(s)
+    origin = min(s['start'] for s in trace_spans)
+    total_ms = max((s['start'] - origin) * 1000 + (s['duration_ms'] or 0) for s in trace_spans) or 1
+
+    print(f"Trace {trace_id} - {total_ms:.0f}ms")
+    def walk(parent_id, depth):
+        for s in sorted(children.get(parent_id, []), key=lambda s: s['start']):
+            offset_ms = (s['start'] - origin) * 1000
+            begin = int(offset_ms / total_ms * BAR_WIDTH)
+            width = max(1, int((s['duration_ms'] or 0) / total_ms * BAR_WIDTH))
+            bar = ' ' * begin + ('█' if s['status'] == 'ok' else '▒') * width
+            attrs = s['attributes']
+            detail = ' '.join(f"{key}={attrs[key]}" for key in
+                              ('host', 'status', 'bytes', 'model', 'total_tokens', 'error') if key in attrs)
+            label = ('  ' * depth + s['name'])[:40]
+            print(f"{label:<40} {offset_ms:>8.0f} {s['duration_ms'] or 0:>8.0f}ms |{bar:<{BAR_WIDTH}}| "
+                  f"{s['thread'][:20]:<20} {detail}")
+            walk(s['span_id'], depth + 1)
+    walk(None, 0)
+
+
+def main(args):
+    try:
+        spans = load_spans()
+    except FileNotFoundError:
+        print(f"No trace file at {TRACE_FILE} - is TRACING_ENABLED on?")
+        return
+    if args and args[0] == '--list':
+        for s in roots(spans)[-20:]:
+            print(f"{s['trace_id']}  {s['name']:<20} {s['duration_ms'] or 0:>8.0f}ms  {s['attributes'].get('company', '')}")
+        return
+    if args:
+        print_waterfall(spans, args[0])
+    elif roots(spans):
+        print_waterfall(spans, roots(spans)[-1]['trace_id'])
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
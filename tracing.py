@@ -0,0 +1,190 @@
+"""
+Request tracing - spans across pool threads and upstream calls
+
+Each request (and each background refresh or warm-up) is a trace identified
+by a request ID. Spans - pipeline stages, every HTTP call with its host,
+status and size, every OpenAI call with its token counts - record their
+parent, thread and timing, so interleaved work from concurrent requests can
+be told apart and laid out as a waterfall (see trace_view.py). The current
+span lives in a context variable, which metrics.submit copies into pool
+threads. Finished traces are appended to a local JSONL file, one span per
+line - no collector needed.
+"""
+
+import contextvars
+import logging
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, List, Optional
+from urllib.parse import urlparse
+
+from serialization import dumps
+
+TRACING_ENABLED = os.getenv('TRACING_ENABLED', 'true').lower() == 'true'
+TRACE_FILE = os.getenv('TRACE_FILE', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'traces.jsonl'))
+# The trace file is rotated to TRACE_FILE.1 past this size
+TRACE_MAX_BYTES = int(os.getenv('TRACE_MAX_BYTES', str(50 * 1024 * 1024)))
+
+# Plain stdlib logger - app_logging builds on this module
+log = logging.getLogger(__name__)
+
+_current: contextvars.ContextVar[Optional['Span']] = contextvars.ContextVar('current_span', default=None)
+
+
+def new_request_id() -> str:
+    return uuid.uuid4().hex[:16]
+
+
+class JSONLExporter:
+    """Appends finished spans to a JSONL file, rotating it when it grows too large"""
+
+    def __init__(self, path: str = TRACE_FILE, max_bytes: int = TRACE_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+    def export(self, spans: List['Span']) -> None:
+        if not spans:
+            return
+        lines = b''.join(dumps(span.to_dict()) + b'\n' for span in spans)
+        try:
+            with self._lock:
+                if self.max_bytes and os.path.exists(self.path) and os.path.getsize(self.path) > self.max_bytes:
+                    os.replace(self.path, self.path + '.1')
+                with open(self.path, 'ab') as f:
+                    f.write(lines)
+        except OSError as e:
+            log.warning("Could not write traces to %s: %s", self.path, e)
+
+
+EXPORTER = JSONLExporter()
+
+
+class Trace:
+    """Spans of one request, exported together when its root span ends"""
+
+    def __init__(self, trace_id: str, exporter: Optional[JSONLExporter]):
+        self.trace_id = trace_id
+        self.exporter = exporter
+        self.spans: List['Span'] = []
+        self.finished = False
+        self._lock = threading.Lock()
+
+    def add(self, span: 'Span') -> None:
+        with self._lock:
+            if not self.finished:
+                self.spans.append(span)
+                return
+        # A branch abandoned at the deadline can finish after the response - export it on its own
+        if self.exporter:
+            self.exporter.export([span])
+
+    def finish(self) -> None:
+        with self._lock:
+            self.finished = True
+            spans, self.spans = self.spans, []
+        if self.exporter:
+            self.exporter.export(spans)
+
+
+@dataclass(slots=True)
+class Span:
+    name: str
+    trace: Optional[Trace] = None
+    parent_id: Optional[str] = None
+    span_id: str = field(default_factory=lambda: uuid.uuid4().hex[:16])
+    start: float = field(default_factory=time.time)
+    duration_ms: Optional[float] = None
+    thread: str = field(default_factory=lambda: threading.current_thread().name)
+    status: str = 'ok'
+    attributes: Dict[str, Any] = field(default_factory=dict)
+    _started: float = field(default_factory=time.perf_counter)
+
+    def set(self, **attributes: Any) -> 'Span':
+        self.attributes.update(attributes)
+        return self
+
+    def fail(self, error: BaseException) -> None:
+        self.status = 'error'
+        self.attributes['error'] = f"{type(error).__name__}: {error}"[:300]
+
+    def end(self) -> None:
+        self.duration_ms = round((time.perf_counter() - self._started) * 1000, 2)
+        if self.trace is not None:
+            self.trace.add(self)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'trace_id': self.trace.trace_id if self.trace else None,
+            'span_id': self.span_id,
+            'parent_id': self.parent_id,
+            'name': self.name,
+            'start': round(self.start, 6),
+            'duration_ms': self.duration_ms,
+            'thread': self.thread,
+            'status': self.status,
+            'attributes': self.attributes,
+        }
+
+
+def current_span() -> Optional[Span]:
+    return _current.get()
+
+
+def current_request_id() -> Optional[str]:
+    span = _current.get()
+    return span.trace.trace_id if span is not None and span.trace is not None else None
+
+
+@contextmanager
+def _activate(span: Span) -> Iterator[Span]:
+    token = _current.set(span)
+    try:
+        yield span
+    except BaseException as e:
+        span.fail(e)
+        raise
+    finally:
+        _current.reset(token)
+        span.end()
+
+
+@contextmanager
+def trace(name: str, request_id: Optional[str] = None, **attributes: Any) -> Iterator[Span]:
+    """Root span of a new trace; its spans are exported when it ends"""
+    current = Trace(request_id or new_request_id(), EXPORTER if TRACING_ENABLED else None)
+    root = Span(name, current, attributes=attributes)
+    try:
+        with _activate(root):
+            yield root
+    finally:
+        current.finish()
+
+
+@contextmanager
+def span(name: str, **attributes: Any) -> Iterator[Span]:
+    """Child of the current span; outside a trace it records nothing"""
+    parent = _current.get()
+    child = Span(name, parent.trace if parent else None, parent.span_id if parent else None,
+                 attributes=attributes)
+    with _activate(child):
+        yield child
+
+
+def http_attributes(method: str, url: str, response: Any) -> Dict[str, Any]:
+    """Host, status and body size of an HTTP call, as span attributes"""
+    return {'kind': 'http', 'method': method, 'host': urlparse(url).netloc,
+            'status': response.status_code, 'bytes': len(response.content or b'')}
+
+
+def llm_usage(response: Any) -> Dict[str, int]:
+    """Token counts reported with an OpenAI response, as span attributes"""
+    try:
+        usage = response.get('usage') or {}
+    except AttributeError:
+        return {}
+    return {key: usage[key] for key in ('prompt_tokens', 'completion_tokens', 'total_tokens') if key in usage}
@@ -0,0 +1,477 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the external upstreams, for load testing the service
+
+Serves Serper search, Specter companies/people/email, OpenAI chat
+completions, Google search pages and any company website with synthetic but
+well-formed responses, generated deterministically from the company name so
+every name "exists". Each upstream has its own latency distribution, error
+rate, 429 rate and optional requests-per-second quota (429 with Retry-After
+once exceeded), so a load test can find where the service's workers and
+thread pools saturate without spending API credits.
+
+Start it, then start app.py with the environment it prints (the base-URL
+variables in app.py, placeholder API keys, and learning switched off so
+synthetic companies stay out of the knowledge base). GET /_simulator shows the
+profiles and per-upstream counts, including peak concurrent calls; POST
+{"openai": "errors=0.2"} to /_simulator/profiles changes a profile mid-run.
+
+Usage:
+  python upstream_simulator.py                                   # Port 8900, default profiles
+  python upstream_simulator.py --port 9000 --latency-scale 0.5   # All upstreams twice as fast
+  python upstream_simulator.py --profile openai=lognormal:2500:0.5,errors=0.02,rps=5
+  python upstream_simulator.py --profile serper=throttle=0.1 --profile website=fixed:50
+"""
+
+import argparse
+import logging
+import math
+import random
+import re
+import threading
+import time
+import zlib
+from dataclasses import asdict, dataclass, replace
+from typing import Any, Dict, List, Optional
+
+from flask import Flask, Response, jsonify, request
+
+from app_logging import configure_logging, get_logger
+from rate_limit import TokenBucket
+from serialization import JSONProvider, dumps
+
+log = get_logger(__name__)
+
+DEFAULT_PORT = 8900
+DISTRIBUTIONS = ('fixed', 'uniform', 'lognormal')
+
+
+@dataclass
+class UpstreamProfile:
+    """How one simulated upstream behaves"""
+    distribution: str = 'lognormal'
+    median_ms: float = 300.0
+    spread: float = 0.5         # lognormal sigma, or +/- fraction for uniform
+    error_rate: float = 0.0     # share of calls answered 500
+    throttle_rate: float = 0.0  # share of calls answered 429
+    rps: float = 0.0            # quota - calls over it are answered 429 (0 = unlimited)
+
+    def parse(self, spec: str) -> 'UpstreamProfile':
+        """Copy with a spec like "lognormal:700:0.35,errors=0.02,throttle=0.05,rps=10" applied"""
+        options = {}
+        for part in filter(None, spec.split(',')):
+            if '=' in part:
+                key, value = part.split('=', 1)
+                key = {'errors': 'error_rate', 'throttle': 'throttle_rate'}.get(key.strip(), key.strip())
+                if key not in ('error_rate', 'throttle_rate', 'rps', 'median_ms', 'spread'):
+                    raise ValueError(f"Unknown profile option: {key}")
+                options[key] = float(value)
+                continue
+            distribution, *numbers = part.split(':')
+            if distribution not in DISTRIBUTIONS:
+                raise ValueError(f"Unknown distribution {distribution!r} - use one of {', '.join(DISTRIBUTIONS)}")
+            options['distribution'] = distribution
+            if numbers:
+                options['median_ms'] = float(numbers[0])
+            if len(numbers) > 1:
+                options['spread'] = float(numbers[1])
+        return replace(self, **options)
+
+
+# Roughly what the real upstreams look like from a Render instance
+DEFAULT_PROFILES = {
+    'serper': UpstreamProfile(median_ms=700, spread=0.35),
+    'specter': UpstreamProfile(median_ms=450, spread=0.4),
+    'openai': UpstreamProfile(median_ms=1800, spread=0.45),
+    'google': UpstreamProfile(median_ms=400, spread=0.4),
+    'website': UpstreamProfile(median_ms=250, spread=0.6),
+}
+
+FIRST_NAMES = ['Dana', 'Marco', 'Priya', 'Elena', 'Samuel', 'Aisha', 'Lucas', 'Mei', 'Jonah', 'Sofia', 'Arjun', 'Nora']
+LAST_NAMES = ['Whitfield', 'Ruiz', 'Nair', 'Kowalski', 'Okafor', 'Lindqvist', 'Haddad', 'Tanaka', 'Brennan',
+              'Moreau', 'Castillo', 'Iyer']
+# (what they build, technology edge, metric unit)
+SECTORS = [
+    ('autonomous picking robots for e-commerce warehouses', 'vision-guided grasping that handles unseen items',
+     'million items picked a month'),
+    ('an AI copilot for hospital revenue-cycle teams', 'models trained on billions of claims', 'hospitals live'),
+    ('payments infrastructure for cross-border marketplaces', 'a ledger that settles in 40 currencies',
+     'billion dollars processed a year'),
+    ('developer tooling that tests cloud infrastructure changes', 'a simulator of the major cloud APIs',
+     'thousand engineering teams'),
+    ('battery analytics for electric vehicle fleets', 'cell-level degradation models', 'thousand vehicles monitored'),
+    ('a security platform that finds leaked credentials', 'continuous scanning of public code and paste sites',
+     'million credentials flagged'),
+]
+ROUNDS = ['Seed', 'Series A', 'Series B', 'Series C']
+INVESTORS = ['Founders Fund', 'Index Ventures', 'Accel', 'General Catalyst', 'Lightspeed', 'Sequoia Capital']
+
+# The search queries app.py sends are "<company> <purpose words>"
+QUERY_RE = re.compile(r'^(?P<company>.+?)\s+(?P<kind>official website|company what do they do|founder CEO|'
+                      r'CEO founder|funding round|announcement partnership)\b', re.IGNORECASE)
+PROMPT_COMPANY_RE = re.compile(r'^- Company: (.+)$', re.MULTILINE)
+PROMPT_GREETING_RE = re.compile(r'Start with "Hi ([^,"]+),')
+
+
+def _slug(name: str) -> str:
+    return re.sub(r'[^a-z0-9]', '', name.lower())
+
+
+def company(name: str) -> Dict[str, Any]:
+    """Synthetic facts for a company - the same on every call and every upstream for the same name"""
+    slug = _slug(name) or 'unknown'
+    rng = random.Random(zlib.crc32(slug.encode('utf-8')))
+    display = name if _slug(name) != name else name.title()
+    product, technology, unit = rng.choice(SECTORS)
+    ceo, cto = rng.sample([f"{first} {last}" for first in FIRST_NAMES for last in LAST_NAMES], 2)
+    round_index = rng.randrange(len(ROUNDS))
+    amount = [6, 18, 45, 110][round_index] + rng.randrange(10)
+    return {
+        'name': display,
+        'slug': slug,
+        'domain': f"{slug}.{rng.choice(['com', 'com', 'com', 'io', 'ai'])}",
+        'id': f"{slug}-{zlib.crc32(slug.encode('utf-8')) % 10000:04d}",
+        'description': f"{display} builds {product}.",
+        'technology': technology[0].upper() + technology[1:],
+        'ceo': ceo,
+        'cto': cto,
+        'founded': rng.randint(2012, 2023),
+        'employees': rng.randint(12, 900),
+        'round': ROUNDS[round_index],
+        'amount': amount,
+        'valuation': amount * rng.randint(5, 12),
+        'investor': rng.choice(INVESTORS),
+        'metric': f"{rng.randint(3, 400)} {unit}",
+    }
+
+
+def funding_sentence(c: Dict[str, Any]) -> str:
+    return (f"{c['name']} raised ${c['amount']} million {c['round']} led by {c['investor']} "
+            f"at a ${c['valuation']} million valuation")
+
+
+class Simulator:
+    """Per-upstream profiles, quotas and call counts"""
+
+    def __init__(self, profiles: Dict[str, UpstreamProfile], latency_scale: float = 1.0, seed: Optional[int] = None):
+        self.latency_scale = latency_scale
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.profiles: Dict[str, UpstreamProfile] = {}
+        self._quotas: Dict[str, Optional[TokenBucket]] = {}
+        self.stats: Dict[str, Dict[str, int]] = {}
+        for upstream, profile in profiles.items():
+            self.configure(upstream, profile)
+
+    def configure(self, upstream: str, profile: UpstreamProfile) -> None:
+        with self._lock:
+            self.profiles[upstream] = profile
+            self._quotas[upstream] = TokenBucket(profile.rps, capacity=profile.rps) if profile.rps > 0 else None
+            self.stats.setdefault(upstream, {'calls': 0, 'ok': 0, 'throttled': 0, 'errors': 0,
+                                             'in_flight': 0, 'peak_in_flight': 0})
+
+    def reset_stats(self) -> None:
+        with self._lock:
+            for counts in self.stats.values():
+                counts.update({key: 0 for key in counts if key != 'in_flight'})
+
+    def latency(self, upstream: str) -> float:
+        """Seconds to wait before answering one call"""
+        profile = self.profiles[upstream]
+        with self._lock:
+            if profile.distribution == 'fixed':
+                ms = profile.median_ms
+            elif profile.distribution == 'uniform':
+                ms = profile.median_ms * (1 + self._random.uniform(-profile.spread, profile.spread))
+            else:
+                ms = profile.median_ms * math.exp(self._random.gauss(0, profile.spread))
+        return max(0.0, ms * self.latency_scale / 1000)
+
+    def outcome(self, upstream: str) -> Optional[int]:
+        """Status to fail this call with, or None to answer it"""
+        profile = self.profiles[upstream]
+        quota = self._quotas[upstream]
+        if quota is not None and not quota.try_acquire():
+            return 429
+        with self._lock:
+            roll = self._random.random()
+        if roll < profile.throttle_rate:
+            return 429
+        if roll < profile.throttle_rate + profile.error_rate:
+            return 500
+        return None
+
+    def count(self, upstream: str, key: str, delta: int = 1) -> None:
+        with self._lock:
+            counts = self.stats[upstream]
+            counts[key] += delta
+            if key == 'in_flight':
+                counts['peak_in_flight'] = max(counts['peak_in_flight'], counts['in_flight'])
+
+    def call(self, upstream: str, respond) -> Response:
+        """Answer a call to `upstream` after its simulated latency, failing it per its profile"""
+        self.count(upstream, 'calls')
+        self.count(upstream, 'in_flight')
+        try:
+            time.sleep(self.latency(upstream))
+            status = self.outcome(upstream)
+            if status == 429:
+                self.count(upstream, 'throttled')
+                quota = self._quotas[upstream]
+                retry_after = math.ceil(quota.wait_time()) if quota is not None else 1
+                response = _error(upstream, 429, 'Rate limit exceeded')
+                response.headers['Retry-After'] = str(max(1, retry_after))
+                return response
+            if status == 500:
+                self.count(upstream, 'errors')
+                return _error(upstream, 500, 'Simulated upstream failure')
+            # A 404 for a domain that doesn't exist is still an answer, not a failure
+            self.count(upstream, 'ok')
+            return respond()
+        finally:
+            self.count(upstream, 'in_flight', -1)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'latency_scale': self.latency_scale,
+                'profiles': {upstream: asdict(profile) for upstream, profile in self.profiles.items()},
+                'stats': {upstream: dict(counts) for upstream, counts in self.stats.items()},
+            }
+
+
+def _error(upstream: str, status: int, message: str) -> Response:
+    if upstream == 'openai':
+        # Shaped like OpenAI's errors so the client raises RateLimitError / APIError
+        body = {'error': {'message': message, 'type': 'rate_limit_error' if status == 429 else 'server_error',
+                          'code': None, 'param': None}}
+    else:
+        body = {'error': message}
+    response = jsonify(body)
+    response.status_code = status
+    return response
+
+
+def _html(body: str, status: int = 200) -> Response:
+    return Response(f"<html><body>{body}</body></html>", status=status, mimetype='text/html')
+
+
+# -- Upstream handlers -----------------------------------------------------------------------------
+
+def serper_search() -> Response:
+    match = QUERY_RE.match((request.get_json(silent=True) or {}).get('q', ''))
+    if not match:
+        return jsonify({'organic': []})
+    c = company(match.group('company'))
+    return jsonify({
+        'knowledgeGraph': {
+            'title': c['name'],
+            'description': c['description'],
+            'attributes': [{'CEO': c['ceo']}, {'Founded': str(c['founded'])}],
+        },
+        'organic': [
+            {'title': f"{c['name']} raises ${c['amount']}M {c['round']}",
+             'link': f"https://techcrunch.com/{c['slug']}-{c['round'].lower().replace(' ', '-')}",
+             'snippet': f"{funding_sentence(c)}, as CEO {c['ceo']} expands the team."},
+            {'title': f"{c['name']} - About", 'link': f"https://www.{c['domain']}/about",
+             'snippet': f"{c['description']} Founded in {c['founded']} by {c['ceo']} and {c['cto']}."},
+            {'title': f"{c['name']} passes {c['metric']}", 'link': f"https://www.{c['domain']}/blog/milestone",
+             'snippet': f"{c['name']} now counts {c['metric']}."},
+        ],
+    })
+
+
+def google_search() -> Response:
+    match = QUERY_RE.match(request.args.get('q', ''))
+    if not match:
+        return _html('<div>No results</div>')
+    c = company(match.group('company'))
+    kind = match.group('kind').lower()
+    if kind == 'official website':
+        body = f'<a href="https://www.{c["domain"]}">{c["name"]} - Official Site</a><div>https://www.{c["domain"]}</div>'
+    elif kind == 'company what do they do':
+        body = f"<div>{c['description']} {c['technology']}.</div>"
+    elif kind == 'founder ceo':
+        body = f"<div>{c['ceo']} is the CEO and co-founder of {c['name']}.</div>"
+    elif kind == 'funding round':
+        body = f"<div>{funding_sentence(c)}, bringing total funding to ${c['amount'] * 2} million.</div>"
+    else:
+        body = f"<div>{c['name']} announces partnership with {c['investor']} portfolio companies.</div>"
+    return _html(body)
+
+
+def specter_company() -> Response:
+    domain = (request.get_json(silent=True) or {}).get('domain', '')
+    c = company(domain.split('.')[0])
+    if domain != c['domain']:
+        return jsonify([])
+    return jsonify([{
+        'id': c['id'],
+        'organization_name': c['name'],
+        'domain': c['domain'],
+        'description': c['description'],
+        'organization_rank': int(c['employees'] * 37 % 50000),
+        'primary_role': 'company',
+        'founded_year': c['founded'],
+        'employee_count': c['employees'],
+        'funding': {'total_funding_usd': c['amount'] * 2_000_000, 'last_funding_type': c['round']},
+    }])
+
+
+def specter_people(company_id: str) -> Response:
+    c = company(company_id.rsplit('-', 1)[0])
+    return jsonify([
+        {'person_id': f"{c['id']}-ceo", 'full_name': c['ceo'], 'title': 'CEO & Co-Founder',
+         'is_founder': True, 'seniority': 'Executive'},
+        {'person_id': f"{c['id']}-cto", 'full_name': c['cto'], 'title': 'CTO & Co-Founder',
+         'is_founder': True, 'seniority': 'Executive'},
+    ])
+
+
+def specter_email(person_id: str) -> Response:
+    company_id, role = person_id.rsplit('-', 1)
+    c = company(company_id.rsplit('-', 1)[0])
+    first = (c['ceo'] if role == 'ceo' else c['cto']).split()[0].lower()
+    return jsonify({'email': f"{first}@{c['domain']}", 'type': 'professional'})
+
+
+def openai_chat_completion() -> Response:
+    body = request.get_json(silent=True) or {}
+    prompt = '\n'.join(str(m.get('content') or '') for m in body.get('messages', []))
+    names = PROMPT_COMPANY_RE.findall(prompt)
+    c = company(names[-1] if names else 'Unknown')
+    message: Dict[str, Any] = {'role': 'assistant'}
+    functions: List[Dict[str, Any]] = body.get('functions') or []
+    if functions:
+        values = {
+            'description': c['description'],
+            'ceo_name': c['ceo'],
+            'technology': c['technology'],
+            'recent_news': f"closing a ${c['amount']}M {c['round']} led by {c['investor']}",
+            'impressive_metric': c['metric'],
+        }
+        required = functions[0].get('parameters', {}).get('required', list(values))
+        message['content'] = None
+        message['function_call'] = {'name': functions[0]['name'],
+                                    'arguments': dumps({field: values.get(field, '') for field in required}).decode()}
+        completion = message['function_call']['arguments']
+    else:
+        greeting = PROMPT_GREETING_RE.search(prompt)
+        first_name = greeting.group(1) if greeting else c['ceo'].split()[0]
+        message['content'] = (f"Hi {first_name}, congrats on closing {c['name']}'s ${c['amount']}M {c['round']} "
+                              f"led by {c['investor']} - reaching {c['metric']} is a remarkable proof point.")
+        completion = message['content']
+    prompt_tokens, completion_tokens = len(prompt) // 4, len(completion) // 4
+    return jsonify({
+        'id': f"chatcmpl-sim-{zlib.crc32(prompt.encode('utf-8')):08x}",
+        'object': 'chat.completion',
+        'created': int(time.time()),
+        'model': body.get('model', 'gpt-3.5-turbo'),
+        'choices': [{'index': 0, 'finish_reason': 'stop', 'message': message}],
+        'usage': {'prompt_tokens': prompt_tokens, 'completion_tokens': completion_tokens,
+                  'total_tokens': prompt_tokens + completion_tokens},
+    })
+
+
+def website(host: str, path: str = '') -> Response:
+    bare = host[4:] if host.startswith('www.') else host
+    c = company(bare.split('.')[0])
+    if bare != c['domain']:
+        return _html('<h1>Not Found</h1>', 404)
+    return Response(f"""<html><head><title>{c['name']}</title>
+<meta name="description" content="{c['description']}"></head>
+<body><section class="about"><h2>Leadership</h2>
+<p>{c['ceo']}, CEO and Co-Founder of {c['name']}, started the company in {c['founded']}.</p>
+<p>{c['cto']}, CTO and Co-Founder, leads engineering.</p></section></body></html>""", mimetype='text/html')
+
+
+def create_app(simulator: Simulator) -> Flask:
+    server = Flask(__name__)
+    server.json = JSONProvider(server)
+
+    def route(rule: str, upstream: str, handler, methods=('GET',)):
+        server.add_url_rule(rule, f"{upstream}:{rule}", lambda **kw: simulator.call(upstream, lambda: handler(**kw)),
+                            methods=list(methods))
+
+    route('/serper/search', 'serper', serper_search, ('POST',))
+    route('/specter/api/v1/companies', 'specter', specter_company, ('POST',))
+    route('/specter/api/v1/companies/<company_id>/people', 'specter', specter_people)
+    route('/specter/api/v1/people/<person_id>/email', 'specter', specter_email)
+    route('/openai/v1/chat/completions', 'openai', openai_chat_completion, ('POST',))
+    route('/google/search', 'google', google_search)
+    route('/sites/<host>', 'website', website)
+    route('/sites/<host>/', 'website', website)
+    route('/sites/<host>/<path:path>', 'website', website)
+
+    @server.route('/_simulator')
+    def status():
+        return jsonify(simulator.snapshot())
+
+    @server.route('/_simulator/profiles', methods=['POST'])
+    def update_profiles():
+        try:
+            for upstream, spec in (request.get_json(silent=True) or {}).items():
+                if upstream not in simulator.profiles:
+                    return jsonify({'error': f"Unknown upstream: {upstream}"}), 400
+                profile = simulator.profiles[upstream]
+                simulator.configure(upstream, replace(profile, **spec) if isinstance(spec, dict) else profile.parse(spec))
+        except (TypeError, ValueError) as e:
+            return jsonify({'error': str(e)}), 400
+        return jsonify(simulator.snapshot())
+
+    @server.route('/_simulator/reset', methods=['POST'])
+    def reset():
+        simulator.reset_stats()
+        return jsonify(simulator.snapshot())
+
+    return server
+
+
+def simulator_env(base_url: str) -> Dict[str, str]:
+    """Environment that points app.py at a simulator listening on base_url"""
+    return {
+        'SERPER_BASE_URL': f"{base_url}/serper",
+        'SPECTER_BASE_URL': f"{base_url}/specter/api/v1",
+        'OPENAI_API_BASE': f"{base_url}/openai/v1",
+        'GOOGLE_SEARCH_URL': f"{base_url}/google/search",
+        'WEBSITE_BASE_URL': f"{base_url}/sites",
+        'SERPER_API_KEY': 'simulated',
+        'SPECTER_API_KEY': 'simulated',
+        'OPENAI_API_KEY': 'simulated',
+        'KNOWLEDGE_BASE_LEARNING': 'false',
+    }
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0].strip())
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--latency-scale', type=float, default=1.0, help='multiply every simulated latency')
+    parser.add_argument('--seed', type=int, default=None, help='seed for latencies and failures')
+    parser.add_argument('--profile', action='append', default=[], metavar='UPSTREAM=SPEC',
+                        help=f"override an upstream ({', '.join(DEFAULT_PROFILES)}), e.g. "
+                             "openai=lognormal:2500:0.5,errors=0.02,throttle=0.05,rps=5")
+    args = parser.parse_args(argv)
+    args.profiles = dict(DEFAULT_PROFILES)
+    for override in args.profile:
+        upstream, _, spec = override.partition('=')
+        if upstream not in args.profiles:
+            parser.error(f"unknown upstream {upstream!r}")
+        try:
+            args.profiles[upstream] = args.profiles[upstream].parse(spec)
+        except ValueError as e:
+            parser.error(str(e))
+    return args
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    configure_logging()
+    logging.getLogger('werkzeug').setLevel(logging.WARNING)  # One access log line per simulated call is noise
+    simulator = Simulator(args.profiles, args.latency_scale, args.seed)
+    print("Start app.py with:")
+    for key, value in simulator_env(f"http://{args.host}:{args.port}").items():
+        print(f"  export {key}={value}")
+    for upstream, profile in args.profiles.items():
+        log.info("Simulating %s: %s", upstream, asdict(profile))
+    create_app(simulator).run(host=args.host, port=args.port, threaded=True)